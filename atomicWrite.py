@@ -0,0 +1,20 @@
+#           atomicWrite.py
+#
+#   Files rewritten while other processes read them (live window counts,
+#   sniffer metrics, OUI list and its mmap'd table) are written to a
+#   temporary file next to the target, then renamed over it: os.replace is
+#   atomic, so readers never see a partial file.
+#
+
+import os
+
+
+def atomic_write(filepath, data):
+    # 'data': str (written as UTF-8) or bytes
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+
+    temporary_filepath = filepath + ".tmp"
+    with open(temporary_filepath, "wb") as file:
+        file.write(data)
+    os.replace(temporary_filepath, filepath)
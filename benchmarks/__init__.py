@@ -0,0 +1,5 @@
+#           benchmarks
+#
+#   Benchmarks of the sensor pipeline (see sensorBenchmark.py), run from
+#   the directory containing benchmarks/ so the sensor modules are found.
+#
@@ -0,0 +1,134 @@
+#           frameGenerator.py
+#
+#   Synthetic 802.11 frames for the benchmarks, as captured on the
+#   monitor interface (radiotap header + 802.11 frame):
+#   (1) Probe requests -> Information Elements of a few device profiles
+#       (rates, HT/VHT/HE capabilities, extended capabilities, vendor IEs),
+#       so random MAC devices share fingerprints as real phones do;
+#   (2) Data frames    -> to-DS data and QoS data frames;
+#   (3) Other frames   -> beacons, which the sniffer doesn't count.
+#   Devices get vendor MACs (OUIs of the mobile manufacturers list) or
+#   randomized MACs (locally administered); random MAC devices rotate
+#   their address from time to time.
+#
+#   Frames are generated from a seed, so runs can be compared.
+#
+#   Usage (from the directory containing benchmarks/):
+#   python3 -m benchmarks.frameGenerator output.pcap [frames] [devices]
+#
+
+import random
+import struct
+import sys
+
+LINKTYPE_IEEE802_11_RADIO = 127
+
+# Radiotap header: Flags + dBm antenna signal
+RADIOTAP_PRESENT = 0x00000022
+RADIOTAP_LEN = 10
+
+# (element ID, length) of the IEs of each profile, in transmission order; 221 -> vendor IE
+PROBE_PROFILES = [
+    ((0, 0), (1, 8), (50, 4), (3, 1), (45, 26), (127, 10), (191, 12), (255, 35), (221, 9)),
+    ((0, 0), (1, 8), (50, 4), (3, 1), (45, 26), (127, 8), (107, 7), (221, 7), (221, 10)),
+    ((0, 0), (1, 4), (50, 8), (3, 1), (45, 26), (127, 11), (59, 18)),
+    ((0, 0), (1, 8), (3, 1), (45, 26), (70, 5), (127, 9), (191, 12), (221, 24)),
+    ((0, 0), (1, 8), (50, 4), (45, 26), (127, 8), (221, 8), (221, 7), (221, 30)),
+]
+
+PROBE_SHARE = 0.6                   # Share of probe requests among the frames
+DATA_SHARE = 0.35                   # Share of data frames (the rest are beacons)
+RANDOM_MAC_SHARE = 0.7              # Share of devices with a randomized MAC
+MAC_ROTATION = 0.02                 # Probability that a random MAC device changes its address at each probe request
+
+
+def random_mac(rng, locally_administered):
+    mac = bytearray(rng.randbytes(6))
+    mac[0] &= 0xFC                  # Unicast
+    if locally_administered:
+        mac[0] |= 0x02
+    return bytes(mac)
+
+def vendor_mac(rng, ouis):
+    return bytes.fromhex(rng.choice(ouis).replace(':', '')) + rng.randbytes(3)
+
+def radiotap_header(signal):
+    return struct.pack("<BBHIBb", 0, 0, RADIOTAP_LEN, RADIOTAP_PRESENT, 0, signal)
+
+def profile_elements(rng, profile):
+    # Fixed IE contents of a device model
+    return b''.join(bytes((ie_id, length)) + rng.randbytes(length) for ie_id, length in profile)
+
+def probe_request(mac, seq, elements, signal):
+    header = struct.pack("<BBH", 0x40, 0, 0) + b'\xff' * 6 + mac + b'\xff' * 6 + struct.pack("<H", (seq & 0xFFF) << 4)
+    return radiotap_header(signal) + header + elements
+
+def data_frame(rng, mac, bssid, seq, signal):
+    subtype = rng.choice((0, 8))                        # Data / QoS data
+    header = struct.pack("<BBH", 0x08 | (subtype << 4), 0x01, 0) + bssid + mac + bssid + struct.pack("<H", (seq & 0xFFF) << 4)
+    if subtype == 8:
+        header += b'\x00\x00'
+    return radiotap_header(signal) + header + rng.randbytes(rng.randrange(0, 120))
+
+def beacon(rng, bssid, seq, signal):
+    header = struct.pack("<BBH", 0x80, 0, 0) + b'\xff' * 6 + bssid + bssid + struct.pack("<H", (seq & 0xFFF) << 4)
+    body = rng.randbytes(8) + struct.pack("<HH", 100, 0x0431) + b'\x00\x04WIFI' + b'\x01\x08' + rng.randbytes(8)
+    return radiotap_header(signal) + header + body
+
+def synthetic_frames(n_frames, n_devices, ouis, seed=1, start_time=1700000000, rate=1000):
+    # Returns [(frame bytes, capture time)], 'rate' frames per second from 'start_time'
+    rng = random.Random(seed)
+
+    profiles = [profile_elements(rng, profile) for profile in PROBE_PROFILES]
+    bssids = [random_mac(rng, False) for _ in range(16)]
+
+    devices = []
+    for _ in range(n_devices):
+        randomized = rng.random() < RANDOM_MAC_SHARE or not ouis
+        devices.append([random_mac(rng, True) if randomized else vendor_mac(rng, ouis), randomized, rng.choice(profiles), rng.randrange(4096)])
+
+    frames = []
+    for i in range(n_frames):
+        device = rng.choice(devices)
+        mac, randomized, elements, seq = device
+        device[3] = seq + 1
+        signal = -rng.randrange(30, 90)
+
+        kind = rng.random()
+        if kind < PROBE_SHARE:
+            if randomized and rng.random() < MAC_ROTATION:
+                mac = device[0] = random_mac(rng, True)
+            frame = probe_request(mac, seq, elements, signal)
+        elif kind < PROBE_SHARE + DATA_SHARE:
+            frame = data_frame(rng, mac, rng.choice(bssids), seq, signal)
+        else:
+            frame = beacon(rng, rng.choice(bssids), seq, signal)
+
+        frames.append((frame, start_time + i / rate))
+
+    return frames
+
+def write_pcap(filepath, frames):
+    with open(filepath, 'wb') as file:
+        file.write(struct.pack("<IHHiIII", 0xA1B2C3D4, 2, 4, 0, 0, 65535, LINKTYPE_IEEE802_11_RADIO))
+        for frame, timestamp in frames:
+            sec = int(timestamp)
+            file.write(struct.pack("<IIII", sec, int((timestamp - sec) * 1000000), len(frame), len(frame)))
+            file.write(frame)
+
+def load_ouis(filepath):
+    # 24-bit OUIs only ("AA:BB:CC"), MA-M / MA-S blocks "AA:BB:CC:D0:00:00/28" are skipped
+    with open(filepath, 'r') as file:
+        return [line.split('\t')[0].strip() for line in file if '\t' in line and '/' not in line.split('\t')[0]]
+
+
+if __name__ == "__main__":
+
+    if len(sys.argv) < 2:
+        print("Argument not provided. Please specify the pcap file to write.")
+        exit(0)
+
+    n_frames = int(sys.argv[2]) if len(sys.argv) > 2 else 100000
+    n_devices = int(sys.argv[3]) if len(sys.argv) > 3 else 2000
+
+    write_pcap(sys.argv[1], synthetic_frames(n_frames, n_devices, load_ouis("/home/kali/Desktop/wireshark-oui-list.txt")))
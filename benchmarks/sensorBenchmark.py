@@ -0,0 +1,351 @@
+#           sensorBenchmark.py
+#
+#   End-to-end benchmark of the sensor pipeline, on synthetic frames
+#   (frameGenerator.py) and temporary databases:
+#   (1) Frame processing -> frames/s through 'frame_processing' (Scapy
+#       dissection included, as in sniff()) and 'raw_frame_processing';
+#   (1b) Worker scaling  -> frames/s of the raw frames through the multi-process
+#       pipeline (snifferPipeline.py) with 1, 2, 4... workers (--workers),
+#       against 'raw_frame_processing' in the capture process (0 workers),
+#       until the device writer has committed the sightings; and the time the
+#       capture process spends per frame, which bounds the scaling;
+#   (2) Device writes    -> sightings/s through 'putInToProbeRequestsDB' /
+#       'putInToDataPacketsDB' until the device writer has committed them;
+#   (3) Queries          -> latency of the sendCrowdingData.py count query
+#       (sliding window and COUNT_WINDOWS, 'count_sampled_windows_devices')
+#       and of the dataRetentionManager.py delete, at several table sizes;
+#   (4) MQTT             -> cost of building the detections payload
+#       ('detections_payload', sensorFunctions.py, with the counts of (3)) and,
+#       with --mqtt-broker, of publishing it (one connection per message,
+#       as publish_detections_mqtt_message does, and a persistent one).
+#
+#   Results are written as JSON (--output), so runs can be compared.
+#
+#   Usage (from the directory containing benchmarks/):
+#   python3 -m benchmarks.sensorBenchmark [--output results.json] [--frames N] [--workers 1 2 4] [--rows 10000 100000 1000000] [--mqtt-broker HOST]
+#
+
+import argparse
+import datetime as dt
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from scapy.layers.dot11 import RadioTap
+from crowdingSniffer import *
+from sensorFunctions import detections_payload
+from benchmarks.frameGenerator import synthetic_frames, load_ouis
+
+OUI_LIST_FILEPATH = "/home/kali/Desktop/wireshark-oui-list.txt"
+
+COUNT_WINDOW = 5                    # Minutes (sendCrowdingData.py sliding window)
+RETENTION_PERIOD = 60               # Minutes (dataRetentionManager.py retention period)
+ROWS_TIME_SPAN = 24 * 3600          # Seconds over which the rows of the query benchmark are spread
+QUERY_REPEATS = 5
+PIPELINE_BLOCK_FRAMES = 64          # Frames copied to the workers between publications (as one capture block)
+PAYLOAD_REPEATS = 10000
+
+
+def create_database(filepath):
+    con = sqlite3.connect(filepath, timeout=30)
+    create_device_records_schema(con)
+    con.close()
+
+def start_writer(db_filepath):
+    # Blocking writer: the benchmark measures the writes, not the drops
+    start_device_writer(
+        db_filepath,
+        WRITER_QUEUE_SIZE,
+        WRITER_MAX_BATCH,
+        DEVICE_FLUSH_INTERVAL,
+        DEVICE_FLUSH_CHANGES,
+        DEVICE_IDLE_EXPIRY,
+        blocking=True)
+
+def benchmark_frame_processing(frames, db_filepath, raw):
+    create_database(db_filepath)
+    start_writer(db_filepath)
+
+    start = time.perf_counter()
+    if raw:
+        for frame, timestamp in frames:
+            raw_frame_processing(frame, int(timestamp))
+    else:
+        for frame, timestamp in frames:
+            packet = RadioTap(frame)
+            packet.time = timestamp
+            frame_processing(packet)
+    elapsed = time.perf_counter() - start
+
+    stop_device_writer()
+
+    return {
+        "frames": len(frames),
+        "seconds": elapsed,
+        "frames_per_second": len(frames) / elapsed,
+    }
+
+def reset_frame_state():
+    # Fingerprint cache, hot MACs and probe bursts of the previous run would make the next one cheaper
+    set_fingerprint_cache_size(FINGERPRINT_CACHE_SIZE)
+    set_hot_mac_refresh(HOT_MAC_REFRESH)
+    set_probe_burst_coalescing(PROBE_BURST_WINDOW, PROBE_BURST_SEQ_GAP)
+
+def benchmark_pipeline(frames, db_filepath, n_workers):
+    # Raw frames through the pipeline with 'n_workers' workers (0 -> processed in this process), until the writer has committed them
+    create_database(db_filepath)
+    reset_frame_state()
+    frame_views = [(memoryview(frame), int(timestamp)) for frame, timestamp in frames]
+
+    if n_workers:
+        start_pipeline(n_workers, PIPELINE_RING_SIZE, (db_filepath, WRITER_QUEUE_SIZE, WRITER_MAX_BATCH, DEVICE_FLUSH_INTERVAL, DEVICE_FLUSH_CHANGES, DEVICE_IDLE_EXPIRY, True))
+    else:
+        start_writer(db_filepath)
+
+    start = time.perf_counter()
+    if n_workers:
+        for i, (frame, timestamp) in enumerate(frame_views):
+            pipeline_frame(frame, timestamp, blocking=True)
+            if i % PIPELINE_BLOCK_FRAMES == PIPELINE_BLOCK_FRAMES - 1:
+                pipeline_publish()
+    else:
+        for frame, timestamp in frame_views:
+            raw_frame_processing(frame, timestamp)
+    capture = time.perf_counter() - start
+
+    if n_workers:
+        stop_pipeline()
+    else:
+        stop_device_writer()
+    elapsed = time.perf_counter() - start
+
+    return {
+        "workers": n_workers,
+        "frames": len(frames),
+        "capture_seconds_per_frame": capture / len(frames),
+        "seconds": elapsed,
+        "frames_per_second": len(frames) / elapsed,
+    }
+
+def benchmark_device_writes(n_sightings, n_devices, db_filepath):
+    rng = random.Random(1)
+    devices = [rng.getrandbits(64) for _ in range(n_devices)]
+    start_time = int(time.time())
+
+    create_database(db_filepath)
+    start_writer(db_filepath)
+
+    start = time.perf_counter()
+    for i in range(n_sightings):
+        footprint = devices[i % n_devices]
+        if footprint & 1:
+            putInToProbeRequestsDB(footprint, "Unknown", start_time + i // 1000)
+        else:
+            putInToDataPacketsDB(footprint, "Unknown", start_time + i // 1000)
+    queued = time.perf_counter() - start
+
+    # Pending sightings are written before the writer stops
+    stop_device_writer()
+    elapsed = time.perf_counter() - start
+
+    return {
+        "sightings": n_sightings,
+        "devices": n_devices,
+        "queue_seconds": queued,
+        "seconds": elapsed,
+        "sightings_per_second": n_sightings / elapsed,
+        "writer": writer_stats(),
+    }
+
+def fill_device_tables(con, n_rows, now):
+    rng = random.Random(n_rows)
+    cur = con.cursor()
+    manuf_ids = [manufacturer_id(cur, f"Manufacturer {i}") for i in range(50)]
+
+    for table in ("Data_Packet_Devices", "Probe_Request_Devices"):
+        rows = []
+        for _ in range(n_rows // 2):
+            first_seen = now - rng.randrange(ROWS_TIME_SPAN)
+            rows.append((footprint_to_db(rng.getrandbits(64)), first_seen, min(now, first_seen + rng.randrange(600)), rng.choice(manuf_ids)))
+        cur.executemany(upsert_device_sql(table), rows)
+
+        # Minute buckets of the first and last sightings
+        cur.executemany(upsert_sighting_sql(SIGHTING_TABLES[table]), [
+            (sighting // 60, footprint, sighting, sighting) for footprint, first_seen, last_seen, _ in rows for sighting in (first_seen, last_seen)])
+
+    con.commit()
+    cur.close()
+
+def benchmark_queries(n_rows, db_filepath):
+    now = int(time.time())
+
+    create_database(db_filepath)
+    con = sqlite3.connect(db_filepath, timeout=30)
+    fill_device_tables(con, n_rows, now)
+
+    # Same windows and query as sendCrowdingData.py (exact counting mode)
+    windows = upload_windows(COUNT_WINDOW, COUNT_WINDOWS)
+
+    cur = con.cursor()
+    count_latencies = []
+    for _ in range(QUERY_REPEATS):
+        start = time.perf_counter()
+        counts = count_sampled_windows_devices(cur, [now - window * 60 for window in windows], now)
+        count_latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    delete_expired_devices(cur, now - RETENTION_PERIOD * 60, now)
+    con.commit()
+    delete_latency = time.perf_counter() - start
+
+    remaining = sum(cur.execute("SELECT COUNT(*) FROM " + table + ";").fetchone()[0] for table in ("Data_Packet_Devices", "Probe_Request_Devices"))
+    cur.close()
+    con.close()
+
+    return {
+        "rows": n_rows,
+        "count_windows_minutes": windows,
+        "devices_counted": [data_packets + probe_requests for data_packets, probe_requests, _ in counts],
+        "count_seconds_min": min(count_latencies),
+        "count_seconds_median": statistics.median(count_latencies),
+        "retention_minutes": RETENTION_PERIOD,
+        "rows_deleted": n_rows - remaining,
+        "delete_seconds": delete_latency,
+    }
+
+def benchmark_mqtt(broker, port, username, password, n_messages, query):
+    # Payload of the counts of the query benchmark, as sendCrowdingData.py publishes them
+    devices_detected = query["devices_counted"][0]
+    window_counts = dict(zip(query["count_windows_minutes"][1:], query["devices_counted"][1:]))
+
+    def payload(unix_timestamp):
+        return detections_payload(unix_timestamp, devices_detected, 1, None, window_counts)
+
+    start = time.perf_counter()
+    for i in range(PAYLOAD_REPEATS):
+        payload(1700000000 + i)
+    result = {"payload_seconds": (time.perf_counter() - start) / PAYLOAD_REPEATS}
+
+    if broker is None:
+        return result
+
+    from paho.mqtt import client as mqtt_client
+
+    def client():
+        mqtt = mqtt_client.Client(client_id=f'benchmark-{random.randint(0, 1000)}', callback_api_version=mqtt_client.CallbackAPIVersion.VERSION2)
+        if username:
+            mqtt.username_pw_set(username, password)
+        return mqtt
+
+    topic = "sttoolkit-test/mqtt/wifi/numdetections/benchmark"
+
+    # One connection per message, as in sendCrowdingData.py
+    latencies = []
+    for i in range(n_messages):
+        start = time.perf_counter()
+        mqtt = client()
+        mqtt.connect(broker, port)
+        mqtt.loop_start()
+        mqtt.publish(topic, payload(int(time.time()))).wait_for_publish()
+        mqtt.disconnect()
+        mqtt.loop_stop()
+        latencies.append(time.perf_counter() - start)
+
+    result["connect_publish_seconds_median"] = statistics.median(latencies)
+    result["connect_publish_seconds_max"] = max(latencies)
+
+    # Persistent connection
+    mqtt = client()
+    mqtt.connect(broker, port)
+    mqtt.loop_start()
+
+    latencies = []
+    for i in range(n_messages):
+        start = time.perf_counter()
+        mqtt.publish(topic, payload(int(time.time()))).wait_for_publish()
+        latencies.append(time.perf_counter() - start)
+
+    mqtt.disconnect()
+    mqtt.loop_stop()
+
+    result["publish_seconds_median"] = statistics.median(latencies)
+    result["publish_seconds_max"] = max(latencies)
+    return result
+
+
+parser = argparse.ArgumentParser(description="Benchmark of the sensor pipeline on synthetic frames.")
+parser.add_argument("--output", default="benchmark-results.json", help="JSON file for the results (default: benchmark-results.json)")
+parser.add_argument("--frames", type=int, default=50000, help="synthetic frames processed (default: 50000)")
+parser.add_argument("--devices", type=int, default=2000, help="synthetic devices sending the frames (default: 2000)")
+parser.add_argument("--workers", type=int, nargs="*", default=[1, 2, 4], help="pipeline worker counts of the scaling run, besides 0 (default: 1 2 4)")
+parser.add_argument("--sightings", type=int, default=200000, help="sightings written through putInTo*DB (default: 200000)")
+parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000, 1000000], help="device table sizes of the query benchmark (default: 10000 100000 1000000)")
+parser.add_argument("--workdir", default=None, help="directory of the temporary databases, e.g. the RAM disk (default: system temporary directory)")
+parser.add_argument("--oui", default=OUI_LIST_FILEPATH, help=f"OUI list of the mobile manufacturers (default: {OUI_LIST_FILEPATH})")
+parser.add_argument("--mqtt-broker", default=None, help="MQTT broker to publish to (default: payload cost only)")
+parser.add_argument("--mqtt-port", type=int, default=1883)
+parser.add_argument("--mqtt-username", default=None)
+parser.add_argument("--mqtt-password", default=None)
+parser.add_argument("--mqtt-messages", type=int, default=50)
+args = parser.parse_args()
+
+# The MQTT payload is built from the counts of the last query benchmark
+if not args.rows or min(args.rows) < 1:
+    parser.error("--rows needs at least one device table size, all >= 1")
+
+load_oui_list(args.oui)
+
+results = {
+    "date": dt.datetime.now(dt.timezone.utc).isoformat(),
+    "host": platform.node(),
+    "machine": platform.machine(),
+    "python": platform.python_version(),
+    "native_fingerprint": NATIVE_FINGERPRINT,
+    "cpus": os.cpu_count(),
+    "settings": {
+        "frames": args.frames,
+        "devices": args.devices,
+        "writer_queue_size": WRITER_QUEUE_SIZE,
+        "writer_max_batch": WRITER_MAX_BATCH,
+        "device_flush_interval": DEVICE_FLUSH_INTERVAL,
+        "device_flush_changes": DEVICE_FLUSH_CHANGES,
+    },
+}
+
+frames = synthetic_frames(args.frames, args.devices, load_ouis(args.oui))
+
+with tempfile.TemporaryDirectory(dir=args.workdir) as workdir:
+
+    results["frame_processing"] = benchmark_frame_processing(frames, os.path.join(workdir, "scapy.db"), False)
+    print(f"frame_processing: {results['frame_processing']['frames_per_second']:.0f} frames/s")
+
+    results["raw_frame_processing"] = benchmark_frame_processing(frames, os.path.join(workdir, "raw.db"), True)
+    print(f"raw_frame_processing: {results['raw_frame_processing']['frames_per_second']:.0f} frames/s")
+
+    results["pipeline"] = []
+    for n_workers in [0] + sorted(set(args.workers) - {0}):
+        run = benchmark_pipeline(frames, os.path.join(workdir, f"pipeline_{n_workers}.db"), n_workers)
+        results["pipeline"].append(run)
+        print(f"pipeline, {n_workers} workers: {run['frames_per_second']:.0f} frames/s (capture process {run['capture_seconds_per_frame'] * 1e6:.2f} us/frame)")
+
+    results["device_writes"] = benchmark_device_writes(args.sightings, args.devices * 10, os.path.join(workdir, "writes.db"))
+    print(f"putInTo*DB: {results['device_writes']['sightings_per_second']:.0f} sightings/s")
+
+    results["queries"] = []
+    for n_rows in args.rows:
+        query = benchmark_queries(n_rows, os.path.join(workdir, f"queries_{n_rows}.db"))
+        results["queries"].append(query)
+        print(f"{n_rows} rows: count {query['count_seconds_median'] * 1000:.2f} ms, delete {query['delete_seconds'] * 1000:.2f} ms")
+
+results["mqtt"] = benchmark_mqtt(args.mqtt_broker, args.mqtt_port, args.mqtt_username, args.mqtt_password, args.mqtt_messages, results["queries"][-1])
+print(f"MQTT payload: {results['mqtt']['payload_seconds'] * 1e6:.2f} us")
+
+with open(args.output, "w") as file:
+    json.dump(results, file, indent=2)
+
+print(f"Results written to '{args.output}'.")
@@ -1,177 +1,166 @@
 from t1ha0 import ffi, lib
 from scapy.all import *
+from snifferSettings import *
+from deviceFootprint import *
+from deviceWriter import *
+from snifferPipeline import *
+from deviceRecordsDB import *
+from snifferFilter import *
 import sqlite3
 import signal
 import sys
 
 PID_FILE = "/home/kali/Desktop/sniffer.pid"
+OUI_LIST_FILEPATH = "/home/kali/Desktop/wireshark-oui-list.txt"
+OUI_DATABASE_FILEPATH = "/home/kali/Desktop/wireshark-oui-list.bin"      # Written by macOUIupdater.py
 
-dr_con = sqlite3.connect('/home/kali/Desktop/MemoryDB/DeviceRecords.db', timeout=30)
-dr_cur = dr_con.cursor()
+# Pipeline mode: frames are processed by worker processes (only with the ring backend)
+PIPELINE_MODE = False
 
-dr_con.execute("PRAGMA journal_mode = WAL")
-dr_con.execute("PRAGMA cache_size = -64000")  # 64MB cache
+# Socket whose BPF program is replaced when the mobile manufacturers list is reloaded (Scapy backend)
+capture_socket = None
 
-sc_con = sqlite3.connect('/home/kali/Desktop/DB/SensorConfiguration.db', timeout=30)
-sc_cur = sc_con.cursor()
+def frame_processing(frame):
 
-PACKET_POWER_FILTRATION = sc_cur.execute("Select Power_Filtration from SensorConfiguration;").fetchone()[0]
-sc_con.close()
+    footprint = frame_footprint(frame)
 
-OUI_DICT = {}
-with open("/home/kali/Desktop/wireshark-oui-list.txt", 'r') as file:
-    for line in file:
-        splits = line.split('\t')
-        OUI_DICT[splits[0].strip()] = splits[1].strip()
+    if footprint:
+        putInToDB(footprint, int(frame.time))
 
-def frame_processing(frame):
+def raw_frame_processing(frame_view, timestamp):
 
-    mac = frame[Dot11].addr2.upper()                # (frame[Dot11].addr2" -> Transmitter/Source Address)
-    oui = mac[:8]
-
-    result, manuf = isMobileManufacturer(oui)
-
-    if(result):
-
-        if(frame[Dot11].type == 0):                 # MANAGEMENT FRAMES
-
-            if(int(mac[1],16) & 0x2 == 0):          # Check if 3rd bit from 2nd byte is '0' to verify if MAC isn't randomized
-                
-                footprint_mac = hex(lib.t1ha0(mac.encode('ASCII'), len(mac), 11))[2:].upper()
-                putInToProbeRequestsDB(footprint_mac, manuf)
-                #print("Probe Request | Source: " + mac + " | Footprint: " + footprint_mac + " | SEQ: " + str(frame[Dot11].SC >> 4) + " | Power: " + str(frame[RadioTap].dBm_AntSignal) + " dBm | Manuf: " + manuf )
-                return
-
-            else:
-
-                ie = frame.getlayer(Dot11Elt)
-                array_v = []
-
-                while ie:
-                    if(ie.ID == 1):                 # Supported Rates
-                        array_v.append(ie.ID)
-                        array_v.append(ie.len)
-                        for c in ie.info:
-                            array_v.append(c)
-                    
-                    elif(ie.ID == 50):              # Extended Supported Rates
-                        array_v.append(ie.ID)
-                        array_v.append(ie.len)
-                        for c in ie.info:
-                            array_v.append(c)
-                    
-                    elif(ie.ID == 3):               # DS Parameter Set
-                        array_v.append(ie.ID)
-                        #array_v.append(ie.len)
-                    
-                    elif(ie.ID == 45):              # HT Capabilities
-                        array_v.append(ie.ID)
-                        array_v.append(ie.len)
-                        for i, c in enumerate(ie.info):
-                            if(i != 4):
-                                array_v.append(c)
-                            else:
-                                array_v.append(ord('0'))
-                    
-                    elif(ie.ID == 127):             # Extended Capabilities
-                        array_v.append(ie.ID)
-                        #array_v.append(ie.len)
-                        for c in ie.info:
-                            array_v.append(c)
-                    
-                    elif(ie.ID == 191):             # VHT Capabilities
-                        array_v.append(ie.ID)
-                        array_v.append(ie.len)
-                        for c in ie.info:
-                            array_v.append(c)
-                    
-                    elif(ie.ID == 70):              # RM Enabled Capabilities 
-                        array_v.append(ie.ID)
-                        array_v.append(ie.len)
-                        for c in ie.info:
-                            array_v.append(c)
-                    
-                    elif(ie.ID == 107):             # Interworking
-                        array_v.append(ie.ID)
-                        array_v.append(ie.len)
-                        for c in ie.info:
-                            array_v.append(c)
-                    
-                    elif(ie.ID == 59):              # Supported Operating Classes
-                        array_v.append(ie.ID)
-                        array_v.append(ie.len)
-                        for c in ie.info:
-                            array_v.append(c)
-                    
-                    elif(ie.ID == 221):             # Vendor Specific
-                        array_v.append(ie.ID)
-                        array_v.append(ie.len)
-                        for i, c in enumerate(ie.info):
-                            if(i != 5 and i != 7):
-                                array_v.append(c)
-                            else:
-                                array_v.append(ord('0'))
-                    
-                    ie = ie.payload
-                
-                footprint_mac = hex(lib.t1ha0(bytes(array_v), len(array_v), 3))[2:].upper()
-                putInToProbeRequestsDB(footprint_mac, manuf)
-                #print("Probe Request | Source: " + mac + " | Footprint: " + footprint_mac + " | SEQ: " + str(frame[Dot11].SC >> 4) + " | Power: " + str(frame[RadioTap].dBm_AntSignal) + " dBm | Manuf: " + manuf )
-                return
-        else:                                       # DATA FRAMES
-            
-            if("to-DS" in str(frame[Dot11].FCfield)):
-
-                footprint_mac = hex(lib.t1ha0(mac.encode('ASCII'), len(mac), 11))[2:].upper()
-                putInToDataPacketsDB(footprint_mac, manuf)
-                #print("Data Packet   | Source: " + mac + " | Footprint: " + footprint_mac + " | SEQ: " + str(frame[Dot11].SC >> 4) + " | Power: " + str(frame[RadioTap].dBm_AntSignal) + " dBm | Manuf: " + manuf )
-                return
-
-def putInToProbeRequestsDB(id, manuf):
-    res = dr_cur.execute("SELECT * FROM Probe_Requests WHERE ID='" + id + "';")
-    if res.fetchone():
-        dr_cur.execute("UPDATE Probe_Requests SET Last_Time_Found=current_timestamp WHERE ID='" + id + "';")
-    else:
-        dr_cur.execute("INSERT INTO Probe_Requests VALUES( 'Probe Request' , '" + id + "' , current_timestamp , current_timestamp , '" + manuf + "');")
-    dr_con.commit()
+    footprint = raw_frame_footprint(frame_view, timestamp)
+
+    if footprint:
+        putInToDB(footprint, timestamp)
+
+def putInToDB(footprint, timestamp):
+    frame_kind, footprint_mac, manuf = footprint
 
-def putInToDataPacketsDB(id, manuf):
-    res = dr_cur.execute("SELECT * FROM Data_Packets WHERE ID='" + id + "';")
-    if res.fetchone():
-        dr_cur.execute("UPDATE Data_Packets SET Last_Time_Found=current_timestamp WHERE ID='" + id + "';")
+    if frame_kind == PROBE_REQUEST:
+        putInToProbeRequestsDB(footprint_mac, manuf, timestamp)
     else:
-        dr_cur.execute("INSERT INTO Data_Packets VALUES( 'Data Packet' , '" + id + "' , current_timestamp , current_timestamp , '" + manuf + "');")
-    dr_con.commit()
+        putInToDataPacketsDB(footprint_mac, manuf, timestamp)
 
-def isMobileManufacturer(oui):
-    manuf = "Unknown"
-    result = OUI_DICT.get(oui)
+def putInToProbeRequestsDB(id, manuf, timestamp):
+    put_sighting(PROBE_REQUEST, id, manuf, timestamp)
 
-    if result:
-        manuf = result
-        return True, manuf
-    elif(int(oui[1],16) & 0x2 != 0):                # In case the manufacturer isn't found, check if the MAC is randomized
-        return True, manuf
-    return False, manuf
+def putInToDataPacketsDB(id, manuf, timestamp):
+    put_sighting(DATA_PACKET, id, manuf, timestamp)
 
 def signal_term_handler(signal, frame):
+    if PIPELINE_MODE:
+        stop_pipeline()
+    else:
+        stop_device_writer()
     open(PID_FILE, "w").close()
-    dr_con.close()
     sys.exit(0)
 
-signal.signal(signal.SIGTERM, signal_term_handler)
+def signal_hup_handler(signal, frame):
+    # New mobile manufacturers list (macOUIupdater.py): the tables are swapped, devices and caches are kept
+    if not reload_mobile_manufacturers():
+        return
+
+    if PIPELINE_MODE:
+        reload_pipeline()
+
+    if CAPTURE_BACKEND == "ring":
+        from ringCapture import RING_CAPTURE
+        sock = RING_CAPTURE["socket"]
+    else:
+        sock = capture_socket
+
+    if BPF_OUI_FILTER and sock is not None:
+        attach_bpf_program(sock, capture_program(PACKET_POWER_FILTRATION, oui_prefixes()))
+
+# The processing functions above are also used by the offline replay (snifferReplay.py)
+if __name__ == "__main__":
+
+    sc_con = sqlite3.connect('/home/kali/Desktop/DB/SensorConfiguration.db', timeout=30)
+    sc_cur = sc_con.cursor()
+
+    PACKET_POWER_FILTRATION = sc_cur.execute("Select Power_Filtration from SensorConfiguration;").fetchone()[0]
+    SLIDING_WINDOW = sc_cur.execute("Select Sliding_Window from SensorConfiguration;").fetchone()[0]
+    sc_con.close()
+
+    load_mobile_manufacturers(OUI_LIST_FILEPATH, OUI_DATABASE_FILEPATH)
+
+    WRITER_ARGS = (
+        DEVICE_RECORDS_DB_FILEPATH,
+        WRITER_QUEUE_SIZE,
+        WRITER_MAX_BATCH,
+        DEVICE_FLUSH_INTERVAL,
+        DEVICE_FLUSH_CHANGES,
+        DEVICE_IDLE_EXPIRY)
+
+    PIPELINE_MODE = CAPTURE_BACKEND == "ring" and PIPELINE_WORKERS > 0
+
+    # Before the pipeline starts, so the workers inherit it
+    set_fingerprint_cache_size(FINGERPRINT_CACHE_SIZE)
+    set_hot_mac_refresh(HOT_MAC_REFRESH)
+    set_probe_burst_coalescing(PROBE_BURST_WINDOW, PROBE_BURST_SEQ_GAP)
+
+    # Not in the sketch counting mode, whose memory doesn't grow with the devices: the live counters keep every device of the windows
+    if LIVE_WINDOW_COUNTER and COUNT_MODE == "sketch":
+        print("Live window counters are disabled in the sketch counting mode.")
+    elif LIVE_WINDOW_COUNTER:
+        enable_live_window([window * 60 for window in upload_windows(SLIDING_WINDOW, COUNT_WINDOWS)], LIVE_WINDOW_FILEPATH, LIVE_WINDOW_PUBLISH_INTERVAL)
+
+    if COUNT_MODE == "sketch":
+        enable_sketch_counting(COUNT_SKETCH_PRECISION)
+
+    # Not in the sketch counting mode: a sketch update costs the same at any load, and sketches
+    # recorded at different sampling rates can't be merged into one window count
+    if OVERLOAD_SHEDDING and COUNT_MODE != "sketch":
+        enable_load_shedding(
+            OVERLOAD_CHECK_INTERVAL,
+            OVERLOAD_QUEUE_HIGH,
+            OVERLOAD_QUEUE_LOW,
+            OVERLOAD_CPU_HIGH,
+            OVERLOAD_CPU_LOW,
+            OVERLOAD_MAX_RATE)
+
+    if PIPELINE_MODE:
+        start_pipeline(PIPELINE_WORKERS, PIPELINE_RING_SIZE, WRITER_ARGS)
+    else:
+        start_device_writer(*WRITER_ARGS)
+
+    if METRICS_ENABLED:
+        from snifferMetrics import install_metrics
+
+        install_metrics(globals(), METRICS_FILEPATH, METRICS_INTERVAL, {"pipeline": lambda: PIPELINE_STATS} if PIPELINE_MODE else {"writer": writer_stats, "fingerprint_cache": lambda: FINGERPRINT_CACHE_STATS, "hot_macs": lambda: HOT_MAC_STATS, "probe_bursts": lambda: PROBE_BURST_STATS})
+
+    signal.signal(signal.SIGTERM, signal_term_handler)
+    signal.signal(signal.SIGHUP, signal_hup_handler)
+
+    #conf.layers.filter([RadioTap, Dot11, Dot11Elt])    # Enable filtering: only RadioTap, Dot11 and Dot11Elt will be dissected
 
-#conf.layers.filter([RadioTap, Dot11, Dot11Elt])    # Enable filtering: only RadioTap, Dot11 and Dot11Elt will be dissected
+    # Only data frames sent to the DS and probe requests, from mobile manufacturers or randomized MACs
+    bpf_program = capture_program(PACKET_POWER_FILTRATION, oui_prefixes() if BPF_OUI_FILTER else [])
 
-filter_str = "(wlan type data) || (wlan type mgt subtype probe-req)"
+    if CAPTURE_BACKEND == "ring":
+
+        from ringCapture import ring_sniff
+
+        ring_sniff(
+            pipeline_frame if PIPELINE_MODE else raw_frame_processing,
+            SNIFFER_INTERFACE,
+            bpf_program,
+            RING_BLOCK_SIZE,
+            RING_BLOCK_NR,
+            RING_FRAME_SIZE,
+            RING_BLOCK_TIMEOUT_MS,
+            pipeline_publish if PIPELINE_MODE else None)
+
+    else:
 
-if PACKET_POWER_FILTRATION != 0:
-    filter_str += f" && radio [22] > {256 + PACKET_POWER_FILTRATION}"
+        # The frame type filter is attached before binding, then replaced by the generated program
+        sniff_socket = conf.L2listen(iface=SNIFFER_INTERFACE, filter=frame_filter(PACKET_POWER_FILTRATION), monitor=True)
+        attach_bpf_program(sniff_socket.ins, bpf_program)
+        capture_socket = sniff_socket.ins
 
-sniff(
-    count=0,
-    filter=filter_str,
-    prn=frame_processing,
-    iface="wlan1",
-    store=0,
-    monitor=True)
\ No newline at end of file
+        sniff(
+            count=0,
+            opened_socket=sniff_socket,
+            prn=frame_processing,
+            store=0)
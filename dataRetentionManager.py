@@ -3,6 +3,9 @@ import datetime as dt
 import pytz
 import sys
 
+from deviceRecordsDB import DEVICE_RECORDS_DB_FILEPATH, retention_period, delete_expired_devices
+from snifferSettings import COUNT_WINDOWS
+
 
 if(len(sys.argv) < 2 ) :
     print("Argument not provided. Please specify an argument with the 'data retention period' time in minutes.")
@@ -17,16 +20,23 @@ if not sys.argv[1].isdigit():
     exit(0)
 else:
 
-    dataAtual = dt.datetime.now(pytz.utc).replace(tzinfo=None)
-    dataAnalizar= dataAtual - dt.timedelta(minutes=int(sys.argv[1]))
+    # Never shorter than the windows counted by sendCrowdingData.py (COUNT_WINDOWS)
+    retentionPeriod = retention_period(sys.argv[1], COUNT_WINDOWS)
+    if retentionPeriod > int(sys.argv[1]):
+        print(f"WARNING: The data retention period ({sys.argv[1]} minutes) is shorter than the largest count window. Keeping {retentionPeriod} minutes of data.")
+
+    dataAtual = dt.datetime.now(pytz.utc)
+    dataAnalizar= dataAtual - dt.timedelta(minutes=retentionPeriod)
+
+    # Retention limits in epoch seconds, as stored by the sniffer
+    retentionStart = int(dataAnalizar.timestamp())
+    retentionEnd = int(dataAtual.timestamp())
     
     #Delele old and unnecessary data from the local database
 
-    connwifi = sqlite3.connect('/home/kali/Desktop/MemoryDB/DeviceRecords.db', timeout=30)
+    connwifi = sqlite3.connect(DEVICE_RECORDS_DB_FILEPATH, timeout=30)
     cwifi = connwifi.cursor()
-    cwifi.execute("""DELETE FROM Data_Packets WHERE NOT ((First_Record >= ? and First_Record <= ?) or (Last_Time_Found > ? and Last_Time_Found <= ?))""", (dataAnalizar, dataAtual, dataAnalizar, dataAtual))
-    connwifi.commit()
-    cwifi.execute("""DELETE FROM Probe_Requests WHERE NOT ((First_Record >= ? and First_Record <= ?) or (Last_Time_Found > ? and Last_Time_Found <= ?))""", (dataAnalizar, dataAtual, dataAnalizar, dataAtual))
+    delete_expired_devices(cwifi, retentionStart, retentionEnd)
     connwifi.commit()
 
     cwifi.close()
@@ -0,0 +1,421 @@
+#           deviceFootprint.py
+#
+#   Computation of the footprint (64-bit t1ha0 hash) that identifies
+#   each device detected by the sniffer:
+#   (1) Probe requests with a global MAC  -> hash of the MAC address;
+#   (2) Probe requests with a random MAC  -> hash of the Information Elements fingerprint;
+#   (3) Data frames sent to the DS        -> hash of the MAC address.
+#
+#   Two equivalent paths are available: 'frame_footprint' works on a
+#   Scapy packet and 'raw_frame_footprint' works on the raw frame bytes
+#   through frameDissector.py and the fingerprint table compiled in
+#   fingerprintSpec.py. Both return (frame kind, footprint,
+#   manufacturer), or None if the frame is not counted: only probe
+#   requests and data frames sent to the DS are, whatever frames the
+#   capture filter let through.
+#
+#   Manufacturers are looked up by longest prefix of the 48-bit source
+#   address (integer, from the raw bytes): 36-bit (MA-S) and 28-bit (MA-M)
+#   blocks first, for the few OUIs split in such blocks, then the 24-bit
+#   OUI (MA-L). Each lookup is one to three dictionary gets. When the binary
+#   database of macOUIupdater.py is loaded instead (ouiDatabase.py), the
+#   lookups binary search its mmap'd table.
+#
+#   Hot MACs: once a data frame of a source address has been turned into a
+#   sighting, its frames of the next HOT_MAC_REFRESH seconds (frame time) are
+#   only counted, without OUI lookup, hashing or queueing of a sighting.
+#   Last_Seen has a one-second resolution, so a refresh of 1 second doesn't
+#   change the device records.
+#
+#   Probe bursts: a device sends its probe requests in bursts of frames with
+#   consecutive sequence numbers. A probe request from the source address of
+#   a burst started less than PROBE_BURST_WINDOW seconds ago, with a sequence
+#   number at most PROBE_BURST_SEQ_GAP after the last one of the burst, is
+#   folded into the burst before any lookup or hashing.
+#
+#   Fingerprint hashes are memoized in an LRU cache keyed by the raw
+#   Information Elements of the probe request (shared by both paths), so
+#   repeated probes of a device cost a dictionary lookup.
+#
+
+import os
+from collections import OrderedDict
+from t1ha0 import ffi, lib
+from scapy.layers.dot11 import Dot11, Dot11Elt
+from frameDissector import *
+from fingerprintSpec import *
+from ouiDatabase import OuiDatabase, parse_oui_prefix
+
+PROBE_REQUEST = 0
+DATA_PACKET = 1
+
+# Mobile manufacturers (load_oui_list): 24-bit OUI -> manufacturer
+OUI_INDEX = {}
+# OUIs split in MA-M / MA-S blocks: 24-bit OUI -> ({28-bit prefix: manufacturer}, {36-bit prefix: manufacturer})
+OUI_BLOCKS = {}
+# Binary OUI database (load_oui_database), used instead of the dicts above once loaded
+OUI_DATABASE = None
+OUI_LIST_VERSION = 0                # Update time stamped by macOUIupdater.py (0 -> unknown)
+MANUFACTURERS_SOURCE = []           # [list filepath, database filepath] of load_mobile_manufacturers, for reloads
+
+# Fingerprint cache: probe requests of random MAC devices repeat the same Information Elements
+FINGERPRINT_CACHE = OrderedDict()
+FINGERPRINT_CACHE_STATS = {
+    "hits": 0,
+    "misses": 0,
+    "evictions": 0,
+}
+fingerprint_cache_size = 4096
+
+# Hot MACs: source address of the data frames -> frame time of their last sighting
+HOT_MACS = {}
+HOT_MAC_STATS = {
+    "short_circuited": 0,
+}
+HOT_MAC_MAX = 100000                # Source addresses remembered before the hot MACs are reset
+hot_mac_refresh = 0                 # Seconds (0 -> disabled, e.g. offline replay and benchmarks)
+
+# Probe bursts: source address of the probe requests -> [last sequence number, frame time of the burst start]
+PROBE_BURSTS = {}
+PROBE_BURST_STATS = {
+    "folded": 0,
+}
+PROBE_BURST_MAX = 100000            # Source addresses remembered before the bursts are reset
+probe_burst_window = 0              # Seconds (0 -> disabled)
+probe_burst_seq_gap = 16
+
+# IE walk, masking and hashing in C, if the t1ha0 module was built with ie_fingerprint.c
+NATIVE_FINGERPRINT = hasattr(lib, "t1ha0_ie_fingerprint")
+if NATIVE_FINGERPRINT:
+    NATIVE_FINGERPRINT_RULES = ffi.new("uint8_t[]", compile_native_rules(FINGERPRINT_TABLE))
+
+
+def load_oui_list(filepath):
+    # The new tables are built aside and swapped in at once, so a reload never exposes a partial list
+    global OUI_INDEX, OUI_BLOCKS, OUI_DATABASE, OUI_LIST_VERSION
+
+    oui_index = {}
+    oui_blocks = {}
+    list_version = 0
+
+    with open(filepath, 'r') as file:
+        for line in file:
+            if line.startswith('#'):                # "# version <update time>" of macOUIupdater.py
+                if line.startswith("# version "):
+                    list_version = int(line.split()[2])
+                continue
+
+            splits = line.split('\t')
+            bits, prefix = parse_oui_prefix(splits[0].strip())
+            manuf = splits[1].strip()
+
+            if bits == 24:
+                oui_index[prefix] = manuf
+            elif bits in (28, 36):
+                blocks = oui_blocks.setdefault(prefix >> (bits - 24), ({}, {}))
+                blocks[bits == 36][prefix] = manuf
+
+    OUI_INDEX, OUI_BLOCKS, OUI_DATABASE, OUI_LIST_VERSION = oui_index, oui_blocks, None, list_version
+
+def load_oui_database(filepath):
+    global OUI_DATABASE, OUI_LIST_VERSION
+    database = OuiDatabase(filepath)
+    OUI_DATABASE, OUI_LIST_VERSION = database, database.list_version
+
+def load_mobile_manufacturers(list_filepath, database_filepath):
+    # Binary database of macOUIupdater.py, unless it's missing or older than the text list
+    MANUFACTURERS_SOURCE[:] = [list_filepath, database_filepath]
+
+    if os.path.exists(database_filepath) and os.path.getmtime(database_filepath) >= os.path.getmtime(list_filepath):
+        try:
+            load_oui_database(database_filepath)
+            return
+        except (OSError, ValueError) as error:
+            print("Failed to load the binary OUI database. Loading the text list.", error)
+
+    load_oui_list(list_filepath)
+
+def reload_mobile_manufacturers():
+    # SIGHUP (macOUIupdater.py): swaps to the new list, the rest of the sniffer state is kept
+    try:
+        load_mobile_manufacturers(*MANUFACTURERS_SOURCE)
+    except (OSError, ValueError, IndexError) as error:
+        print("Failed to reload the mobile manufacturers list. Keeping the current one.", error)
+        return False
+
+    print(f"Mobile manufacturers list reloaded (version {OUI_LIST_VERSION}).")
+    return True
+
+def oui_prefixes():
+    # 24-bit OUIs with a mobile manufacturer (whole OUI or blocks of it), for the capture filter
+    if OUI_DATABASE is not None:
+        return sorted(OUI_DATABASE.prefixes24())
+    return sorted(OUI_INDEX.keys() | OUI_BLOCKS.keys())
+
+def isMobileManufacturer(mac):
+    # 'mac': 48-bit source address
+    if OUI_DATABASE is not None:
+        manuf = OUI_DATABASE.lookup(mac)
+    else:
+        manuf = None
+        blocks = OUI_BLOCKS.get(mac >> 24)
+        if blocks is not None:
+            manuf = blocks[1].get(mac >> 12) or blocks[0].get(mac >> 20)
+        if not manuf:
+            manuf = OUI_INDEX.get(mac >> 24)
+
+    if manuf:
+        return True, manuf
+    elif((mac >> 40) & 0x2 != 0):                   # In case the manufacturer isn't found, check if the MAC is randomized
+        return True, "Unknown"
+    return False, "Unknown"
+
+def frame_footprint(frame):
+
+    if not is_sniffed_frame(frame[Dot11].type, frame[Dot11].subtype):     # Probe requests and data frames only (beacons, other management and control frames aren't counted)
+        return None
+
+    mac = frame[Dot11].addr2.upper()                # (frame[Dot11].addr2" -> Transmitter/Source Address)
+
+    hot_key = None
+    if(hot_mac_refresh and frame[Dot11].type == DOT11_TYPE_DATA):
+        hot_key = mac
+        if(is_hot_mac(hot_key, int(frame.time))):
+            return None
+
+    if(probe_burst_window and frame[Dot11].type == DOT11_TYPE_MANAGEMENT):
+        if(is_probe_burst(mac, frame[Dot11].SC >> 4, int(frame.time))):
+            return None
+
+    result, manuf = isMobileManufacturer(int(mac.replace(':', ''), 16))
+
+    if(result):
+
+        if(frame[Dot11].type == 0):                 # MANAGEMENT FRAMES
+
+            if(int(mac[1],16) & 0x2 == 0):          # Check if 3rd bit from 2nd byte is '0' to verify if MAC isn't randomized
+
+                footprint_mac = lib.t1ha0(mac.encode('ASCII'), len(mac), 11)
+                #print("Probe Request | Source: " + mac + " | Footprint: " + "%X" % footprint_mac + " | SEQ: " + str(frame[Dot11].SC >> 4) + " | Power: " + str(frame[RadioTap].dBm_AntSignal) + " dBm | Manuf: " + manuf )
+                return PROBE_REQUEST, footprint_mac, manuf
+
+            else:
+
+                footprint_mac = cached_fingerprint(scapy_ie_bytes(frame), scapy_fingerprint_hash, frame)
+                #print("Probe Request | Source: " + mac + " | Footprint: " + "%X" % footprint_mac + " | SEQ: " + str(frame[Dot11].SC >> 4) + " | Power: " + str(frame[RadioTap].dBm_AntSignal) + " dBm | Manuf: " + manuf )
+                return PROBE_REQUEST, footprint_mac, manuf
+
+        else:                                       # DATA FRAMES
+
+            if(frame[Dot11].FCfield & DOT11_FLAG_TO_DS):
+
+                footprint_mac = lib.t1ha0(mac.encode('ASCII'), len(mac), 11)
+                if hot_key is not None:
+                    refresh_hot_mac(hot_key, int(frame.time))
+                #print("Data Packet   | Source: " + mac + " | Footprint: " + "%X" % footprint_mac + " | SEQ: " + str(frame[Dot11].SC >> 4) + " | Power: " + str(frame[RadioTap].dBm_AntSignal) + " dBm | Manuf: " + manuf )
+                return DATA_PACKET, footprint_mac, manuf
+
+    return None
+
+def scapy_fingerprint_hash(frame):
+
+    ie = frame.getlayer(Dot11Elt)
+    array_v = []
+
+    while ie:
+        if(ie.ID == 1):                 # Supported Rates
+            array_v.append(ie.ID)
+            array_v.append(ie.len)
+            for c in ie.info:
+                array_v.append(c)
+
+        elif(ie.ID == 50):              # Extended Supported Rates
+            array_v.append(ie.ID)
+            array_v.append(ie.len)
+            for c in ie.info:
+                array_v.append(c)
+
+        elif(ie.ID == 3):               # DS Parameter Set
+            array_v.append(ie.ID)
+            #array_v.append(ie.len)
+
+        elif(ie.ID == 45):              # HT Capabilities
+            array_v.append(ie.ID)
+            array_v.append(ie.len)
+            for i, c in enumerate(ie.info):
+                if(i != 4):
+                    array_v.append(c)
+                else:
+                    array_v.append(ord('0'))
+
+        elif(ie.ID == 127):             # Extended Capabilities
+            array_v.append(ie.ID)
+            #array_v.append(ie.len)
+            for c in ie.info:
+                array_v.append(c)
+
+        elif(ie.ID == 191):             # VHT Capabilities
+            array_v.append(ie.ID)
+            array_v.append(ie.len)
+            for c in ie.info:
+                array_v.append(c)
+
+        elif(ie.ID == 70):              # RM Enabled Capabilities
+            array_v.append(ie.ID)
+            array_v.append(ie.len)
+            for c in ie.info:
+                array_v.append(c)
+
+        elif(ie.ID == 107):             # Interworking
+            array_v.append(ie.ID)
+            array_v.append(ie.len)
+            for c in ie.info:
+                array_v.append(c)
+
+        elif(ie.ID == 59):              # Supported Operating Classes
+            array_v.append(ie.ID)
+            array_v.append(ie.len)
+            for c in ie.info:
+                array_v.append(c)
+
+        elif(ie.ID == 221):             # Vendor Specific
+            array_v.append(ie.ID)
+            array_v.append(ie.len)
+            for i, c in enumerate(ie.info):
+                if(i != 5 and i != 7):
+                    array_v.append(c)
+                else:
+                    array_v.append(ord('0'))
+
+        ie = ie.payload
+
+    return lib.t1ha0(bytes(array_v), len(array_v), 3)
+
+def raw_frame_footprint(frame, timestamp=None):
+
+    dissection = dissect(frame)
+    if dissection is None:
+        return None
+
+    frame_type, subtype, flags, addr2, sc, body_start, body_end = dissection
+
+    if not is_sniffed_frame(frame_type, subtype):   # Probe requests and data frames only (beacons, other management and control frames aren't counted)
+        return None
+
+    hot_key = None
+    if(hot_mac_refresh and timestamp is not None and frame_type == DOT11_TYPE_DATA):
+        hot_key = bytes(frame[addr2:addr2 + 6])
+        if(is_hot_mac(hot_key, timestamp)):
+            return None
+
+    if(probe_burst_window and timestamp is not None and frame_type == DOT11_TYPE_MANAGEMENT):
+        if(is_probe_burst(bytes(frame[addr2:addr2 + 6]), sc >> 4, timestamp)):
+            return None
+
+    result, manuf = isMobileManufacturer(int.from_bytes(frame[addr2:addr2 + 6], "big"))    # Transmitter/Source Address
+
+    if(result):
+
+        if(frame_type == DOT11_TYPE_MANAGEMENT):    # MANAGEMENT FRAMES
+
+            if(frame[addr2] & 0x2 == 0):            # Locally administered bit is '0': MAC isn't randomized
+
+                mac = frame[addr2:addr2 + 6].hex(':').upper()
+                footprint_mac = lib.t1ha0(mac.encode('ASCII'), len(mac), 11)
+                return PROBE_REQUEST, footprint_mac, manuf
+
+            else:
+
+                footprint_mac = cached_fingerprint(bytes(frame[body_start:body_end]), raw_fingerprint_hash, frame, body_start, body_end)
+                return PROBE_REQUEST, footprint_mac, manuf
+
+        else:                                       # DATA FRAMES
+
+            if(flags & DOT11_FLAG_TO_DS):
+
+                mac = frame[addr2:addr2 + 6].hex(':').upper()
+                footprint_mac = lib.t1ha0(mac.encode('ASCII'), len(mac), 11)
+                if hot_key is not None:
+                    refresh_hot_mac(hot_key, timestamp)
+                return DATA_PACKET, footprint_mac, manuf
+
+    return None
+
+def raw_fingerprint_hash(frame, body_start, body_end):
+
+    if(NATIVE_FINGERPRINT):
+        return lib.t1ha0_ie_fingerprint(ffi.from_buffer(frame) + body_start, body_end - body_start, NATIVE_FINGERPRINT_RULES, FINGERPRINT_MASK_BYTE, 3)
+
+    array_v = ie_fingerprint(frame, body_start, body_end)
+    return lib.t1ha0(bytes(array_v), len(array_v), 3)
+
+def scapy_ie_bytes(frame):
+    # Raw Information Elements of a dissected Scapy frame (the same cache key as the raw path)
+    dissection = dissect(frame.original)
+    if dissection is None:
+        return None
+    body_start, body_end = dissection[5:]
+    return bytes(frame.original[body_start:body_end])
+
+def set_fingerprint_cache_size(size):
+    global fingerprint_cache_size
+    fingerprint_cache_size = size
+    FINGERPRINT_CACHE.clear()
+
+def cached_fingerprint(ie_bytes, fingerprint_hash, *args):
+    # LRU cache: raw Information Elements -> fingerprint hash
+    if ie_bytes is None or fingerprint_cache_size == 0:
+        return fingerprint_hash(*args)
+
+    footprint = FINGERPRINT_CACHE.get(ie_bytes)
+    if footprint is not None:
+        FINGERPRINT_CACHE.move_to_end(ie_bytes)
+        FINGERPRINT_CACHE_STATS["hits"] += 1
+        return footprint
+
+    FINGERPRINT_CACHE_STATS["misses"] += 1
+    footprint = fingerprint_hash(*args)
+
+    FINGERPRINT_CACHE[ie_bytes] = footprint
+    if len(FINGERPRINT_CACHE) > fingerprint_cache_size:
+        FINGERPRINT_CACHE.popitem(last=False)
+        FINGERPRINT_CACHE_STATS["evictions"] += 1
+
+    return footprint
+
+def set_hot_mac_refresh(refresh):
+    global hot_mac_refresh
+    hot_mac_refresh = refresh
+    HOT_MACS.clear()
+
+def is_hot_mac(hot_key, timestamp):
+    # True if the source address got a sighting less than 'hot_mac_refresh' seconds ago: the frame is only counted
+    refreshed = HOT_MACS.get(hot_key)
+    if refreshed is not None and timestamp - refreshed < hot_mac_refresh:
+        HOT_MAC_STATS["short_circuited"] += 1
+        return True
+    return False
+
+def refresh_hot_mac(hot_key, timestamp):
+    if len(HOT_MACS) >= HOT_MAC_MAX:
+        HOT_MACS.clear()
+    HOT_MACS[hot_key] = timestamp
+
+def set_probe_burst_coalescing(window, seq_gap):
+    global probe_burst_window, probe_burst_seq_gap
+    probe_burst_window = window
+    probe_burst_seq_gap = seq_gap
+    PROBE_BURSTS.clear()
+
+def is_probe_burst(burst_key, seq, timestamp):
+    # True if the probe request continues a recent burst of its source address (folded), otherwise it starts a new burst
+    burst = PROBE_BURSTS.get(burst_key)
+    if burst is not None and timestamp - burst[1] < probe_burst_window and (seq - burst[0]) % 4096 <= probe_burst_seq_gap:
+        burst[0] = seq
+        PROBE_BURST_STATS["folded"] += 1
+        return True
+
+    if burst is None and len(PROBE_BURSTS) >= PROBE_BURST_MAX:
+        PROBE_BURSTS.clear()
+    PROBE_BURSTS[burst_key] = [seq, timestamp]
+    return False
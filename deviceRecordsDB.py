@@ -0,0 +1,250 @@
+#           deviceRecordsDB.py
+#
+#   Schema of the device records database (DeviceRecords.db, on the
+#   RAM disk), written by the sniffer and read by sendCrowdingData.py
+#   and dataRetentionManager.py.
+#
+#   Devices are stored in compact integer form, one table per frame type:
+#   (1) Data_Packet_Devices / Probe_Request_Devices -> ID (64-bit footprint, primary key),
+#       First_Seen and Last_Seen (epoch seconds, UTC), Manufacturer_ID;
+#   (2) Manufacturers -> interned manufacturer names.
+#   Last_Seen is indexed for the sliding window queries.
+#   (3) Sampling_Rate -> changes of the overload sampling rate (loadShedding.py):
+#       from Time on, only devices with ID & (Rate - 1) = 0 are recorded.
+#       Counts scaled by a rate > 1 come with an error bound of COUNT_ERROR_BOUND
+#       standard errors of the sampling ('sampling_error_bound').
+#   (4) Data_Packet_Sightings / Probe_Request_Sightings -> per-minute buckets of the
+#       devices sighted: Minute (epoch seconds // 60), ID, First and Last sighting
+#       in that minute. Primary key (Minute, ID), so a sliding window count only
+#       reads the buckets of the window and retention drops whole old minutes.
+#   (5) Data_Packet_Sketches / Probe_Request_Sketches -> sketch counting mode
+#       (COUNT_MODE = "sketch"): one HyperLogLog sketch (hyperLogLog.py) of the
+#       devices sighted per minute, instead of the device and sightings tables.
+#       Window counts merge the sketches of the minutes of the window, so the
+#       window starts at the beginning of its first minute; they come with an
+#       error bound of COUNT_ERROR_BOUND standard errors. The sketches are
+#       recorded without overload sampling (crowdingSniffer.py), so their
+#       counts are never scaled by a sampling rate.
+#
+#   Several windows ending at the same time (COUNT_WINDOWS) are counted in a
+#   single statement by 'count_windows_devices': the last sighting of each
+#   device within the largest window is taken once (one pass over its
+#   buckets), then compared with the start of each window.
+#
+#   With the window ending at the time of the query, as in sendCrowdingData.py,
+#   the device count of the buckets is the same as the original predicate on the
+#   device tables: (First_Seen in [start, end]) or (Last_Seen in (start, end]) is
+#   "sighted after start", plus the devices seen only once, exactly at start.
+#
+#   The Data_Packets and Probe_Requests views convert the rows back to
+#   the original text format (hex footprint, DATETIME strings, frame
+#   type and manufacturer names), so existing SQL readers keep working.
+#   Databases created by older versions (text tables) are migrated in
+#   place by 'create_device_records_schema'.
+#
+
+import math
+
+from hyperLogLog import merge_sketches, estimate_cardinality, standard_error
+
+DEVICE_RECORDS_DB_FILEPATH = '/home/kali/Desktop/MemoryDB/DeviceRecords.db'
+
+# View: (table, frame type)
+DEVICE_RECORD_TABLES = {
+    "Data_Packets": ("Data_Packet_Devices", "Data Packet"),
+    "Probe_Requests": ("Probe_Request_Devices", "Probe Request"),
+}
+
+# Device table: per-minute sightings table
+SIGHTING_TABLES = {
+    "Data_Packet_Devices": "Data_Packet_Sightings",
+    "Probe_Request_Devices": "Probe_Request_Sightings",
+}
+
+# Device table: per-minute sketches table
+SKETCH_TABLES = {
+    "Data_Packet_Devices": "Data_Packet_Sketches",
+    "Probe_Request_Devices": "Probe_Request_Sketches",
+}
+
+COUNT_ERROR_BOUND = 2               # Standard errors (~95% of the sketch or sampled counts are within the bound)
+
+
+def footprint_to_db(footprint):
+    # SQLite integers are signed 64-bit
+    return footprint - (1 << 64) if footprint >= (1 << 63) else footprint
+
+def create_device_records_schema(con):
+    cur = con.cursor()
+
+    cur.execute("BEGIN")
+
+    cur.execute("CREATE TABLE IF NOT EXISTS Manufacturers (Manufacturer_ID INTEGER PRIMARY KEY, Name TEXT UNIQUE NOT NULL);")
+    cur.execute("CREATE TABLE IF NOT EXISTS Sampling_Rate (Time INTEGER NOT NULL, Rate INTEGER NOT NULL);")
+
+    for view, (table, frame_type) in DEVICE_RECORD_TABLES.items():
+
+        cur.execute("CREATE TABLE IF NOT EXISTS " + table + " (ID INTEGER PRIMARY KEY, First_Seen INTEGER NOT NULL, Last_Seen INTEGER NOT NULL, Manufacturer_ID INTEGER REFERENCES Manufacturers);")
+        cur.execute("CREATE INDEX IF NOT EXISTS " + table + "_Last_Seen ON " + table + " (Last_Seen);")
+
+        if cur.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?;", (view,)).fetchone():
+            migrate_text_table(cur, view, table)
+
+        create_sightings_table(cur, table, SIGHTING_TABLES[table])
+        cur.execute("CREATE TABLE IF NOT EXISTS " + SKETCH_TABLES[table] + " (Minute INTEGER PRIMARY KEY, Registers BLOB NOT NULL);")
+
+        cur.execute("CREATE VIEW IF NOT EXISTS " + view + " AS SELECT '" + frame_type + "' AS Frame_Type, printf('%X', d.ID) AS ID, datetime(d.First_Seen, 'unixepoch') AS First_Record, datetime(d.Last_Seen, 'unixepoch') AS Last_Time_Found, m.Name AS Manufacturer FROM " + table + " d LEFT JOIN Manufacturers m ON m.Manufacturer_ID = d.Manufacturer_ID;")
+
+    con.commit()
+    cur.close()
+
+def create_sightings_table(cur, table, sightings_table):
+    if cur.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?;", (sightings_table,)).fetchone():
+        return
+
+    cur.execute("CREATE TABLE " + sightings_table + " (Minute INTEGER NOT NULL, ID INTEGER NOT NULL, First INTEGER NOT NULL, Last INTEGER NOT NULL, PRIMARY KEY (Minute, ID)) WITHOUT ROWID;")
+
+    # Devices recorded before the buckets existed: their last sighting is enough for the window counts
+    cur.execute("INSERT INTO " + sightings_table + " SELECT Last_Seen / 60, ID, Last_Seen, Last_Seen FROM " + table + ";")
+
+def migrate_text_table(cur, view, table):
+    # Older text table (hex ID, DATETIME strings, manufacturer names): convert its rows, then replace it by the view
+    rows = cur.execute("SELECT ID, MIN(strftime('%s', First_Record)), MAX(strftime('%s', Last_Time_Found)), MAX(Manufacturer) FROM " + view + " WHERE ID IS NOT NULL GROUP BY ID;").fetchall()
+
+    cur.executemany(upsert_device_sql(table), [
+        (footprint_to_db(int(footprint, 16)), int(first_seen), int(last_seen), manufacturer_id(cur, manuf or "Unknown"))
+        for footprint, first_seen, last_seen, manuf in rows])
+
+    cur.execute("DROP TABLE " + view + ";")
+
+def manufacturer_id(cur, name):
+    cur.execute("INSERT OR IGNORE INTO Manufacturers (Name) VALUES (?);", (name,))
+    return cur.execute("SELECT Manufacturer_ID FROM Manufacturers WHERE Name=?;", (name,)).fetchone()[0]
+
+def load_manufacturer_ids(con):
+    return dict(con.execute("SELECT Name, Manufacturer_ID FROM Manufacturers;").fetchall())
+
+def count_window_devices(cur, window_start, window_end, sampling_mask=0):
+    # Devices first seen or seen again within the window (epoch seconds): (data packets, probe requests)
+    # Sighted in (start, end] (buckets of the window) + seen only once, exactly at start (Last_Seen index), in one statement (one snapshot)
+    counts = []
+    for table in ("Data_Packet_Devices", "Probe_Request_Devices"):
+        counts.append(cur.execute(
+            "SELECT (SELECT COUNT(DISTINCT ID) FROM " + SIGHTING_TABLES[table] + " WHERE Minute >= ? and Minute <= ? and Last > ? and Last <= ? and (ID & ?) = 0)"
+            " + (SELECT COUNT(*) FROM " + table + " WHERE Last_Seen = ? and First_Seen = ? and (ID & ?) = 0);",
+            (window_start // 60, window_end // 60, window_start, window_end, sampling_mask, window_start, window_start, sampling_mask)).fetchone()[0])
+    return tuple(counts)
+
+def count_windows_devices(cur, window_starts, window_end, sampling_masks):
+    # Devices of each window (same predicate as 'count_window_devices'), in one statement: [(data packets, probe requests)] per window start
+    # 'sampling_masks': sampling mask of each window
+    largest_start = min(window_starts)
+    windows_sql = ", ".join(["SUM(Last > ? and (ID & ?) = 0)"] * len(window_starts))
+    once_sql = ", ".join(["SUM(Last_Seen = ? and (ID & ?) = 0)"] * len(window_starts))
+    window_args = [arg for window_start, mask in zip(window_starts, sampling_masks) for arg in (window_start, mask)]
+
+    statements = []
+    args = []
+    for table in ("Data_Packet_Devices", "Probe_Request_Devices"):
+        statements.append(
+            "SELECT * FROM (SELECT " + windows_sql + " FROM (SELECT ID, MAX(Last) AS Last FROM " + SIGHTING_TABLES[table] + " WHERE Minute >= ? and Minute <= ? and Last <= ? GROUP BY ID)),"
+            " (SELECT " + once_sql + " FROM " + table + " WHERE Last_Seen IN (" + ", ".join(["?"] * len(window_starts)) + ") and First_Seen = Last_Seen)")
+        args += window_args + [largest_start // 60, window_end // 60, window_end] + window_args + list(window_starts)
+
+    rows = cur.execute(" UNION ALL ".join(statements) + ";", args).fetchall()
+
+    n = len(window_starts)
+    counts = [[(row[i] or 0) + (row[n + i] or 0) for i in range(n)] for row in rows]
+    return list(zip(counts[0], counts[1]))
+
+def window_sampling_rate(cur, window_start, window_end):
+    # Highest sampling rate active during the window: the rate at its start, or any later change
+    rate_at_start = cur.execute("SELECT Rate FROM Sampling_Rate WHERE Time <= ? ORDER BY Time DESC LIMIT 1;", (window_start,)).fetchone()
+    rate_changes = cur.execute("SELECT MAX(Rate) FROM Sampling_Rate WHERE Time > ? and Time <= ?;", (window_start, window_end)).fetchone()
+    return max(rate_at_start[0] if rate_at_start else 1, rate_changes[0] or 1)
+
+def count_sampled_window_devices(cur, window_start, window_end):
+    # Devices of the hash slice kept by the highest sampling rate of the window, scaled by the rate: (data packets, probe requests, rate)
+    rate = window_sampling_rate(cur, window_start, window_end)
+    data_packets, probe_requests = count_window_devices(cur, window_start, window_end, rate - 1)
+    return data_packets * rate, probe_requests * rate, rate
+
+def upload_windows(sliding_window, count_windows):
+    # Windows (minutes) counted by sendCrowdingData.py: the sliding window of the sensor configuration first, then the other COUNT_WINDOWS
+    return [int(sliding_window)] + [window for window in count_windows if window != int(sliding_window)]
+
+def sampling_error_bound(devices, rate):
+    # Error bound of a count scaled by the sampling rate: each device is in the hash slice with probability 1/rate,
+    # so the scaled count of N devices has a variance of N * (rate - 1) (binomial), estimated with the count itself
+    return math.ceil(COUNT_ERROR_BOUND * math.sqrt(devices * (rate - 1)))
+
+def count_sampled_windows_devices(cur, window_starts, window_end):
+    # Each window scaled by its own highest sampling rate: [(data packets, probe requests, rate)] per window start
+    rates = [window_sampling_rate(cur, window_start, window_end) for window_start in window_starts]
+    counts = count_windows_devices(cur, window_starts, window_end, [rate - 1 for rate in rates])
+    return [(data_packets * rate, probe_requests * rate, rate) for (data_packets, probe_requests), rate in zip(counts, rates)]
+
+def count_sketch_windows_devices(cur, window_starts, window_end, precision):
+    # Devices sighted in the minutes of each window, from the merged sketches: [(data packets, probe requests, error bound)] per window start
+    # The sketches of the largest window are read once and merged from the last minute back, estimated at the first minute of each window
+    # Sketches of another precision (written before a change of COUNT_SKETCH_PRECISION) are left out
+    first_minutes = [window_start // 60 for window_start in window_starts]
+    counts = {first_minute: [] for first_minute in first_minutes}
+
+    for table in ("Data_Packet_Devices", "Probe_Request_Devices"):
+        rows = cur.execute("SELECT Minute, Registers FROM " + SKETCH_TABLES[table] + " WHERE Minute >= ? and Minute <= ? and length(Registers) = ? ORDER BY Minute DESC;",
+                           (min(first_minutes), window_end // 60, 1 << precision)).fetchall()
+
+        registers = None
+        i = 0
+        for first_minute in sorted(counts, reverse=True):
+            sketches = [registers] if registers else []
+            while i < len(rows) and rows[i][0] >= first_minute:
+                sketches.append(rows[i][1])
+                i += 1
+
+            registers = merge_sketches(sketches)
+            counts[first_minute].append(round(estimate_cardinality(registers)) if registers else 0)
+
+    results = []
+    for first_minute in first_minutes:
+        data_packets, probe_requests = counts[first_minute]
+        error_bound = COUNT_ERROR_BOUND * standard_error(precision) * (data_packets + probe_requests)
+        results.append((data_packets, probe_requests, math.ceil(error_bound)))
+    return results
+
+def count_sketch_window_devices(cur, window_start, window_end, precision):
+    # (data packets, probe requests, error bound)
+    return count_sketch_windows_devices(cur, [window_start], window_end, precision)[0]
+
+def retention_period(requested_period, count_windows):
+    # Minutes: at least the largest window counted by sendCrowdingData.py, which would otherwise miss the devices deleted within it
+    return max([int(requested_period)] + list(count_windows))
+
+def delete_expired_devices(cur, retention_start, retention_end):
+    # Devices neither first seen nor seen again within the retention period (epoch seconds)
+    for table in ("Data_Packet_Devices", "Probe_Request_Devices"):
+        cur.execute("DELETE FROM " + table + " WHERE NOT ((First_Seen >= ? and First_Seen <= ?) or (Last_Seen > ? and Last_Seen <= ?));", (retention_start, retention_end, retention_start, retention_end))
+
+        # Whole minutes before the retention period
+        cur.execute("DELETE FROM " + SIGHTING_TABLES[table] + " WHERE Minute < ?;", (retention_start // 60,))
+        cur.execute("DELETE FROM " + SKETCH_TABLES[table] + " WHERE Minute < ?;", (retention_start // 60,))
+
+    # Sampling rate changes before the retention period, except the one still active at its start
+    cur.execute("DELETE FROM Sampling_Rate WHERE Time < (SELECT MAX(Time) FROM Sampling_Rate WHERE Time <= ?);", (retention_start,))
+
+def log_sampling_rate(con, timestamp, rate):
+    con.execute("INSERT INTO Sampling_Rate VALUES(?, ?);", (timestamp, rate))
+    con.commit()
+
+def upsert_device_sql(table):
+    # A known device only gets its Last_Seen updated (First_Seen only moves back for sightings merged out of order)
+    return "INSERT INTO " + table + " VALUES(?, ?, ?, ?) ON CONFLICT(ID) DO UPDATE SET First_Seen=MIN(First_Seen, excluded.First_Seen), Last_Seen=MAX(Last_Seen, excluded.Last_Seen);"
+
+def upsert_sighting_sql(sightings_table):
+    # (Minute, ID, First, Last): the bucket of a minute already written is widened
+    return "INSERT INTO " + sightings_table + " VALUES(?, ?, ?, ?) ON CONFLICT(Minute, ID) DO UPDATE SET First=MIN(First, excluded.First), Last=MAX(Last, excluded.Last);"
+
+def upsert_sketch_sql(sketches_table):
+    # (Minute, Registers): the writer merges the stored sketch of the minute before writing it back
+    return "INSERT INTO " + sketches_table + " VALUES(?, ?) ON CONFLICT(Minute) DO UPDATE SET Registers=excluded.Registers;"
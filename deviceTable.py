@@ -0,0 +1,204 @@
+#           deviceTable.py
+#
+#   Write-behind in-memory table of the devices detected by the sniffer.
+#
+#   Each sighting only updates the in-memory entry of the device:
+#   footprint -> [first seen, last seen, manufacturer, first seen since last flush]
+#   (footprints as 64-bit integers, times in epoch seconds)
+#   The changed entries are written to DeviceRecords.db by 'flush_devices'
+#   in a single transaction, so readers (sendCrowdingData.py) always see
+#   the tables as of the last flush.
+#
+#   Each sighting that changes Last_Seen also updates the bucket of its
+#   minute: (minute, footprint) -> [first, last] sighting in that minute,
+#   written to the per-minute sightings table in the same transaction.
+#
+#   Sightings can arrive out of order (pipeline workers): an entry keeps the
+#   earliest first sighting and the latest last sighting, and the UPSERTs
+#   of the devices and of the buckets keep the minimum First_Seen / First
+#   and the maximum Last_Seen / Last already written.
+#
+#   Each changed device is written with a single UPSERT. A device whose
+#   row is missing from the database (new device, or row deleted by
+#   dataRetentionManager.py) is inserted with First_Seen set to its
+#   first sighting since the last flush, as the sniffer did when it
+#   wrote every frame.
+#
+#   In the sketch counting mode ('enable_sketch_counting', COUNT_MODE in
+#   snifferSettings.py) no device entry is kept: each sighting is added to
+#   the HyperLogLog sketch of its minute and frame type (hyperLogLog.py),
+#   and 'flush_sketches' merges the sketches changed since the last flush
+#   into the per-minute sketches tables. Memory and database rows then
+#   grow with the time covered, not with the number of devices.
+#
+
+import sqlite3
+
+from hyperLogLog import new_sketch, add_to_sketch
+from deviceFootprint import PROBE_REQUEST, DATA_PACKET
+from deviceRecordsDB import *
+
+DEVICE_TABLES = {
+    PROBE_REQUEST: "Probe_Request_Devices",
+    DATA_PACKET: "Data_Packet_Devices",
+}
+
+DEVICE_SIGHTING_TABLES = {
+    PROBE_REQUEST: "Probe_Request_Sightings",
+    DATA_PACKET: "Data_Packet_Sightings",
+}
+
+DEVICES = {PROBE_REQUEST: {}, DATA_PACKET: {}}
+PENDING = {PROBE_REQUEST: set(), DATA_PACKET: set()}
+
+# Minute buckets changed since the last flush
+BUCKETS = {PROBE_REQUEST: {}, DATA_PACKET: {}}
+
+MANUFACTURER_IDS = {}
+
+DEVICE_SKETCH_TABLES = {
+    PROBE_REQUEST: "Probe_Request_Sketches",
+    DATA_PACKET: "Data_Packet_Sketches",
+}
+
+SKETCH_COUNTING = {
+    "enabled": False,
+    "precision": 12,
+}
+
+# Minute -> sketch of the sightings since the last flush
+SKETCHES = {PROBE_REQUEST: {}, DATA_PACKET: {}}
+
+
+def load_device_table(con):
+    # The table always starts empty: devices already in the database are only updated when seen again
+    for frame_kind in DEVICES:
+        DEVICES[frame_kind].clear()
+        PENDING[frame_kind].clear()
+        BUCKETS[frame_kind].clear()
+        SKETCHES[frame_kind].clear()
+
+    MANUFACTURER_IDS.clear()
+    MANUFACTURER_IDS.update(load_manufacturer_ids(con))
+
+def enable_sketch_counting(precision):
+    new_sketch(precision)           # Checks the precision
+    SKETCH_COUNTING.update(enabled=True, precision=precision)
+
+def pending_device_changes():
+    return len(PENDING[PROBE_REQUEST]) + len(PENDING[DATA_PACKET])
+
+def pending_sketch_changes():
+    return len(SKETCHES[PROBE_REQUEST]) + len(SKETCHES[DATA_PACKET])
+
+def record_device(frame_kind, footprint, manuf, timestamp):
+    entry = DEVICES[frame_kind].get(footprint)
+
+    if entry is None:
+        DEVICES[frame_kind][footprint] = [timestamp, timestamp, manuf, timestamp]
+        PENDING[frame_kind].add(footprint)
+
+    elif entry[1] == timestamp:                 # Last_Seen only changes once per second
+        return
+
+    else:
+        # Sightings merged out of order (pipeline workers) never move Last_Seen back or First_Seen forward
+        entry[0] = min(entry[0], timestamp)
+        entry[1] = max(entry[1], timestamp)
+
+        if entry[3] is None:
+            entry[3] = timestamp
+            PENDING[frame_kind].add(footprint)
+        else:
+            entry[3] = min(entry[3], timestamp)
+
+    bucket = BUCKETS[frame_kind].get((timestamp // 60, footprint))
+    if bucket is None:
+        BUCKETS[frame_kind][(timestamp // 60, footprint)] = [timestamp, timestamp]
+    elif timestamp > bucket[1]:
+        bucket[1] = timestamp
+    elif timestamp < bucket[0]:
+        bucket[0] = timestamp
+
+def record_sketch(frame_kind, footprint, manuf, timestamp):
+    precision = SKETCH_COUNTING["precision"]
+    registers = SKETCHES[frame_kind].get(timestamp // 60)
+
+    if registers is None:
+        registers = SKETCHES[frame_kind][timestamp // 60] = new_sketch(precision)
+
+    add_to_sketch(registers, precision, footprint)
+
+def flush_devices(con, idle_expiry, now):
+    cur = con.cursor()
+
+    try:
+        write_pending_devices(cur)
+        con.commit()
+    except sqlite3.Error:
+        # Entries stay pending; forget the manufacturer IDs of the rolled back transaction
+        con.rollback()
+        MANUFACTURER_IDS.clear()
+        MANUFACTURER_IDS.update(load_manufacturer_ids(con))
+        raise
+    finally:
+        cur.close()
+
+    # Entries are only marked as written once the transaction is committed
+    for frame_kind, devices in DEVICES.items():
+        for footprint in PENDING[frame_kind]:
+            devices[footprint][3] = None
+        PENDING[frame_kind].clear()
+        BUCKETS[frame_kind].clear()
+
+        # Forget devices not seen for a long time (their rows stay in the database)
+        idle = [footprint for footprint, entry in devices.items() if now - entry[1] > idle_expiry]
+        for footprint in idle:
+            del devices[footprint]
+
+def write_pending_devices(cur):
+    for frame_kind, table in DEVICE_TABLES.items():
+        devices = DEVICES[frame_kind]
+
+        rows = []
+        for footprint in PENDING[frame_kind]:
+            first_seen, last_seen, manuf, since = devices[footprint]
+
+            manuf_id = MANUFACTURER_IDS.get(manuf)
+            if manuf_id is None:
+                manuf_id = MANUFACTURER_IDS[manuf] = manufacturer_id(cur, manuf)
+
+            rows.append((footprint_to_db(footprint), since, last_seen, manuf_id))
+
+        cur.executemany(upsert_device_sql(table), rows)
+
+        cur.executemany(upsert_sighting_sql(DEVICE_SIGHTING_TABLES[frame_kind]), [
+            (minute, footprint_to_db(footprint), first, last)
+            for (minute, footprint), (first, last) in BUCKETS[frame_kind].items()])
+
+def flush_sketches(con):
+    cur = con.cursor()
+
+    try:
+        write_pending_sketches(cur)
+        con.commit()
+    except sqlite3.Error:
+        # Sketches stay pending, merged again at the next flush
+        con.rollback()
+        raise
+    finally:
+        cur.close()
+
+    for frame_kind in SKETCHES:
+        SKETCHES[frame_kind].clear()
+
+def write_pending_sketches(cur):
+    for frame_kind, table in DEVICE_SKETCH_TABLES.items():
+        for minute, registers in SKETCHES[frame_kind].items():
+
+            # Merged with the sketch already written for the minute (previous flushes, or before a restart)
+            row = cur.execute("SELECT Registers FROM " + table + " WHERE Minute = ?;", (minute,)).fetchone()
+            if row and len(row[0]) == len(registers):
+                registers = merge_sketches((registers, row[0]))
+
+            cur.execute(upsert_sketch_sql(table), (minute, bytes(registers)))
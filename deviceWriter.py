@@ -0,0 +1,214 @@
+#           deviceWriter.py
+#
+#   Database writer thread of the sniffer.
+#
+#   The capture callback only puts each sighting (frame kind, footprint,
+#   manufacturer, timestamp) in a bounded queue and returns. The writer
+#   thread drains the queue into the in-memory device table
+#   (deviceTable.py), which coalesces repeated sightings, and writes the
+#   changed devices in one transaction (group commit) every
+#   'flush_interval' seconds or once 'flush_changes' devices are pending.
+#
+#   A lock wait on DeviceRecords.db (dataRetentionManager.py,
+#   sendCrowdingData.py) therefore only delays the writer thread, not the
+#   capture. When the queue is full the sighting is dropped and counted,
+#   unless the writer was started in blocking mode (offline replay), where
+#   the producer waits instead so that no sighting is lost.
+#
+#   In the sketch counting mode (deviceTable.enable_sketch_counting) the
+#   sightings are added to the per-minute sketches instead, and each group
+#   commit writes the changed sketches.
+#
+#   The writer thread also keeps the live sliding window counter
+#   (liveWindow.py, once enabled) and publishes it every cycle.
+#
+#   Under overload (loadShedding.py, once enabled) the writer thread raises
+#   the sampling rate, and only the sightings of the devices in the kept
+#   hash slice are queued.
+#
+#   WRITER_STATS:
+#   queue_depth          -> sightings waiting in the queue (at the last writer cycle)
+#   drops                -> sightings dropped because the queue was full
+#   sampled_out          -> sightings dropped by the overload sampling
+#   sampling_rate        -> current overload sampling rate (1 -> every device is kept)
+#   commits              -> group commits done
+#   commit_errors        -> group commits that failed (changes are kept for the next one)
+#   last_batch_size      -> sightings coalesced into the last group commit
+#   max_batch_size       -> largest number of sightings coalesced into one group commit
+#   last_rows_written    -> devices (or sketches) written by the last group commit
+#   last_commit_latency  -> duration of the last group commit (seconds)
+#   max_commit_latency   -> longest group commit (seconds)
+#   total_commit_latency -> sum of the group commit durations (seconds)
+#
+
+import queue
+import threading
+import time
+import sqlite3
+
+from deviceTable import *
+from loadShedding import *
+from liveWindow import *
+
+WRITER_STATS = {
+    "queue_depth": 0,
+    "drops": 0,
+    "sampled_out": 0,
+    "sampling_rate": 1,
+    "commits": 0,
+    "commit_errors": 0,
+    "last_batch_size": 0,
+    "max_batch_size": 0,
+    "last_rows_written": 0,
+    "last_commit_latency": 0.0,
+    "max_commit_latency": 0.0,
+    "total_commit_latency": 0.0,
+}
+
+sightings = None
+sightings_blocking = False
+writer_thread = None
+
+
+def start_device_writer(db_filepath, queue_size, max_batch, flush_interval, flush_changes, idle_expiry, blocking=False):
+    global sightings, sightings_blocking, writer_thread
+
+    sightings = queue.Queue(queue_size)
+    sightings_blocking = blocking
+
+    writer_thread = threading.Thread(
+        target=device_writer,
+        args=(db_filepath, max_batch, flush_interval, flush_changes, idle_expiry),
+        name="DeviceWriter",
+        daemon=True)
+    writer_thread.start()
+
+def put_sighting(frame_kind, footprint, manuf, timestamp):
+    if footprint & SAMPLING["mask"]:
+        WRITER_STATS["sampled_out"] += 1
+        return
+
+    try:
+        sightings.put((frame_kind, footprint, manuf, timestamp), sightings_blocking)
+    except queue.Full:
+        WRITER_STATS["drops"] += 1
+
+def stop_device_writer():
+    # Pending sightings are written before the thread ends
+    sightings.put(None)
+    writer_thread.join()
+
+def writer_stats():
+    stats = dict(WRITER_STATS)
+    stats["queue_depth"] = sightings.qsize()
+    stats["sampling_rate"] = SAMPLING["rate"]
+    return stats
+
+def device_writer(db_filepath, max_batch, flush_interval, flush_changes, idle_expiry):
+
+    con = sqlite3.connect(db_filepath, timeout=30)
+    con.execute("PRAGMA journal_mode = WAL")
+    con.execute("PRAGMA cache_size = -64000")  # 64MB cache
+
+    load_device_table(con)
+
+    if SKETCH_COUNTING["enabled"]:
+        record, pending_changes = record_sketch, pending_sketch_changes
+    else:
+        record, pending_changes = record_device, pending_device_changes
+
+    # A restarted sniffer records every device again
+    if SHEDDING["enabled"]:
+        try:
+            log_sampling_rate(con, int(time.time()), SAMPLING["rate"])
+        except sqlite3.Error as error:
+            print("Failed to log the sampling rate to local database.", error)
+
+    if LIVE_WINDOW["enabled"]:
+        try:
+            seed_live_window(con, int(time.time()))
+        except sqlite3.Error as error:
+            print("Failed to seed the live window counters from local database.", error)
+
+    last_flush = time.monotonic()
+    now = int(time.time())
+    batch_size = 0
+    running = True
+
+    while running:
+
+        # Wait for the first sighting, then take whatever else is already queued (up to 'max_batch')
+        drained = 0
+        try:
+            sighting = sightings.get(timeout=flush_interval)
+
+            while True:
+                if sighting is None:
+                    running = False
+                    break
+
+                record(*sighting)
+                if LIVE_WINDOW["enabled"]:
+                    record_live_sighting(sighting[0], sighting[1], sighting[3])
+                now = sighting[3]
+                drained += 1
+
+                if drained >= max_batch:
+                    break
+                sighting = sightings.get_nowait()
+
+        except queue.Empty:
+            pass
+
+        batch_size += drained
+        WRITER_STATS["queue_depth"] = sightings.qsize()
+
+        if SHEDDING["enabled"]:
+            rate = check_overload(WRITER_STATS["queue_depth"] / sightings.maxsize, WRITER_STATS["drops"])
+
+            # The rate is only applied once logged, so the counts can always be scaled back
+            if rate is not None:
+                try:
+                    log_sampling_rate(con, int(time.time()), rate)
+                    set_sampling_rate(rate)
+                    live_sampling_rate_changed(int(time.time()), rate)
+                    print(f"Overload sampling rate changed to 1/{rate}.")
+                except sqlite3.Error as error:
+                    print("Failed to log the sampling rate to local database.", error)
+
+        if LIVE_WINDOW["enabled"]:
+            publish_live_window()
+
+        changes = pending_changes()
+        if changes == 0:
+            continue
+
+        if running and changes < flush_changes and time.monotonic() - last_flush < flush_interval:
+            continue
+
+        commit_start = time.monotonic()
+        try:
+            if SKETCH_COUNTING["enabled"]:
+                flush_sketches(con)
+            else:
+                flush_devices(con, idle_expiry, now)
+        except sqlite3.Error as error:
+            WRITER_STATS["commit_errors"] += 1
+            print("Failed to write devices to local database.", error)
+            last_flush = time.monotonic()
+            continue
+
+        commit_latency = time.monotonic() - commit_start
+        last_flush = time.monotonic()
+
+        WRITER_STATS["commits"] += 1
+        WRITER_STATS["last_batch_size"] = batch_size
+        WRITER_STATS["max_batch_size"] = max(WRITER_STATS["max_batch_size"], batch_size)
+        WRITER_STATS["last_rows_written"] = changes
+        WRITER_STATS["last_commit_latency"] = commit_latency
+        WRITER_STATS["max_commit_latency"] = max(WRITER_STATS["max_commit_latency"], commit_latency)
+        WRITER_STATS["total_commit_latency"] += commit_latency
+
+        batch_size = 0
+
+    con.close()
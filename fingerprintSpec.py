@@ -0,0 +1,106 @@
+#           fingerprintSpec.py
+#
+#   Specification of the probe request fingerprint used to identify
+#   devices with a random MAC address.
+#
+#   The fingerprint is the concatenation, in frame order, of the
+#   Information Elements listed in FINGERPRINT_SPEC. For each element
+#   the spec tells whether its length and its info are included, and
+#   which info bytes are masked (replaced by FINGERPRINT_MASK_BYTE)
+#   because they change between probes of the same device.
+#
+#   The spec is compiled once into a 256-entry table indexed by the
+#   element ID, which 'ie_fingerprint' applies in a single pass over
+#   the frame body. Fingerprint variants can be evaluated by compiling
+#   another spec and passing its table to 'ie_fingerprint'.
+#
+#   The same table is also packed for the C implementation in the t1ha0
+#   module ('t1ha0_ie_fingerprint', see t1ha0/ie_fingerprint.h), which
+#   walks the elements and hashes the fingerprint in a single call.
+#
+
+FINGERPRINT_MASK_BYTE = ord('0')
+
+# Layout of the rules table of t1ha0/ie_fingerprint.h
+IE_RULE_SIZE = 8
+IE_RULE_MAX_MASKS = IE_RULE_SIZE - 2
+IE_RULE_INCLUDE = 0x01
+IE_RULE_INCLUDE_LENGTH = 0x02
+IE_RULE_INCLUDE_INFO = 0x04
+
+FINGERPRINT_SPEC = (
+    # (IE ID, include length, include info, masked info bytes)
+    (1,   True,  True,  ()),                # Supported Rates
+    (50,  True,  True,  ()),                # Extended Supported Rates
+    (3,   False, False, ()),                # DS Parameter Set
+    (45,  True,  True,  (4,)),              # HT Capabilities
+    (127, False, True,  ()),                # Extended Capabilities
+    (191, True,  True,  ()),                # VHT Capabilities
+    (70,  True,  True,  ()),                # RM Enabled Capabilities
+    (107, True,  True,  ()),                # Interworking
+    (59,  True,  True,  ()),                # Supported Operating Classes
+    (221, True,  True,  (5, 7)),            # Vendor Specific
+)
+
+
+def compile_fingerprint_spec(spec):
+    table = [None] * 256
+
+    for ie_id, include_length, include_info, masked in spec:
+        table[ie_id] = (include_length, include_info, tuple(sorted(masked)))
+
+    return table
+
+def compile_native_rules(table):
+    rules = bytearray(256 * IE_RULE_SIZE)
+
+    for ie_id, rule in enumerate(table):
+        if rule is None:
+            continue
+
+        include_length, include_info, masked = rule
+
+        if len(masked) > IE_RULE_MAX_MASKS or any(i > 255 for i in masked):
+            raise ValueError(f"IE {ie_id}: the C fingerprint supports up to {IE_RULE_MAX_MASKS} masked bytes in the first 256 info bytes.")
+
+        entry = ie_id * IE_RULE_SIZE
+        rules[entry] = IE_RULE_INCLUDE | (IE_RULE_INCLUDE_LENGTH if include_length else 0) | (IE_RULE_INCLUDE_INFO if include_info else 0)
+        rules[entry + 1] = len(masked)
+        rules[entry + 2:entry + 2 + len(masked)] = bytes(masked)
+
+    return bytes(rules)
+
+FINGERPRINT_TABLE = compile_fingerprint_spec(FINGERPRINT_SPEC)
+
+def ie_fingerprint(frame, offset, end, table=FINGERPRINT_TABLE):
+    # Fingerprint bytes of the Information Elements in frame[offset:end].
+    # A truncated element keeps its declared length and only the available info bytes
+    fingerprint = bytearray()
+
+    while offset + 2 <= end:
+        ie_id = frame[offset]
+        ie_len = frame[offset + 1]
+        info_start = offset + 2
+        offset = info_start + ie_len
+
+        rule = table[ie_id]
+        if rule is None:
+            continue
+
+        include_length, include_info, masked = rule
+
+        fingerprint.append(ie_id)
+        if include_length:
+            fingerprint.append(ie_len)
+
+        if include_info:
+            info_end = offset if offset <= end else end
+            masked_start = len(fingerprint)
+            fingerprint += frame[info_start:info_end]
+
+            for i in masked:
+                if i >= info_end - info_start:
+                    break
+                fingerprint[masked_start + i] = FINGERPRINT_MASK_BYTE
+
+    return fingerprint
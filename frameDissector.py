@@ -0,0 +1,92 @@
+#           frameDissector.py
+#
+#   Lightweight radiotap / 802.11 / Information Element dissector.
+#
+#   Reads the fields needed by the sniffer straight from the raw frame
+#   bytes (bytes, bytearray or a memoryview of the capture ring), using
+#   fixed offsets instead of building a Scapy packet:
+#   (1) Radiotap header -> header length and FCS flag;
+#   (2) 802.11 header   -> frame control (type, subtype, flags), addr2 and sequence control;
+#   (3) Frame body      -> Information Elements (ID, length, info) of probe requests.
+#
+#   Works the same for frames from the live capture and from pcap files.
+#
+
+import struct
+
+RADIOTAP_PRESENT = struct.Struct("<I")
+
+RADIOTAP_PRESENT_TSFT = 0x00000001
+RADIOTAP_PRESENT_FLAGS = 0x00000002
+RADIOTAP_PRESENT_EXT = 0x80000000
+RADIOTAP_FLAGS_FCS = 0x10
+
+DOT11_HEADER_LEN = 24               # Frame Control, Duration, addr1, addr2, addr3, Sequence Control
+DOT11_ADDR2_OFFSET = 10
+DOT11_SC_OFFSET = 22
+DOT11_FCS_LEN = 4
+
+DOT11_TYPE_MANAGEMENT = 0
+DOT11_TYPE_CONTROL = 1
+DOT11_TYPE_DATA = 2
+DOT11_SUBTYPE_PROBE_REQUEST = 4
+
+DOT11_FLAG_TO_DS = 0x01
+
+
+def radiotap_has_fcs(frame):
+    present = RADIOTAP_PRESENT.unpack_from(frame, 4)[0]
+
+    if not present & RADIOTAP_PRESENT_FLAGS:
+        return False
+
+    # Skip the extended presence bitmaps
+    offset = 8
+    it_present = present
+    while it_present & RADIOTAP_PRESENT_EXT:
+        it_present = RADIOTAP_PRESENT.unpack_from(frame, offset)[0]
+        offset += 4
+
+    # TSFT (8 bytes, 8-byte aligned) is the only field before Flags
+    if present & RADIOTAP_PRESENT_TSFT:
+        offset = ((offset + 7) & ~7) + 8
+
+    return frame[offset] & RADIOTAP_FLAGS_FCS != 0
+
+def dissect(frame):
+    # Returns (type, subtype, flags, addr2 offset, sequence control, body offset, body end), or None if the frame is too short
+
+    frame_len = len(frame)
+    if frame_len < 8:
+        return None
+
+    rt_len = frame[2] | (frame[3] << 8)             # Radiotap it_len (little endian)
+    if frame_len < rt_len + DOT11_HEADER_LEN:
+        return None
+
+    body_end = frame_len
+    if radiotap_has_fcs(frame):
+        body_end -= DOT11_FCS_LEN
+
+    fc = frame[rt_len]
+
+    return ((fc >> 2) & 0x3,
+            fc >> 4,
+            frame[rt_len + 1],
+            rt_len + DOT11_ADDR2_OFFSET,
+            frame[rt_len + DOT11_SC_OFFSET] | (frame[rt_len + DOT11_SC_OFFSET + 1] << 8),
+            rt_len + DOT11_HEADER_LEN,
+            body_end)
+
+def is_sniffed_frame(frame_type, subtype):
+    # Same selection as the sniffer BPF filter: "(wlan type data) || (wlan type mgt subtype probe-req)"
+    return frame_type == DOT11_TYPE_DATA or (frame_type == DOT11_TYPE_MANAGEMENT and subtype == DOT11_SUBTYPE_PROBE_REQUEST)
+
+def information_elements(frame, offset, end):
+    # Yields (ID, length, info start, info end) for each Information Element of the frame body.
+    # As in Scapy, a truncated element keeps its declared length and only the available info bytes
+    while offset + 2 <= end:
+        ie_len = frame[offset + 1]
+        info_start = offset + 2
+        yield frame[offset], ie_len, info_start, min(info_start + ie_len, end)
+        offset = info_start + ie_len
@@ -0,0 +1,65 @@
+#           frameDissectorCheck.py
+#
+#   Differential check between the Scapy path ('frame_footprint') and
+#   the raw dissector path ('raw_frame_footprint') of deviceFootprint.py.
+#
+#   Every frame of the given pcap/pcapng files that the sniffer BPF
+#   filter would accept is processed by both paths, and the resulting
+#   (frame kind, footprint, manufacturer) are compared.
+#
+#   Usage: python3 frameDissectorCheck.py capture1.pcap [capture2.pcapng ...]
+#
+
+import sys
+
+from scapy.layers.dot11 import RadioTap
+from scapy.utils import RawPcapReader
+from scapy.data import DLT_IEEE802_11_RADIO
+from deviceFootprint import *
+
+OUI_LIST_FILEPATH = "/home/kali/Desktop/wireshark-oui-list.txt"
+
+
+if(len(sys.argv) < 2):
+    print("Argument not provided. Please specify one or more pcap/pcapng files recorded on the monitor interface.")
+    exit(0)
+
+load_oui_list(OUI_LIST_FILEPATH)
+
+checked = 0
+skipped = 0
+mismatches = 0
+
+for filepath in sys.argv[1:]:
+
+    with RawPcapReader(filepath) as reader:
+
+        if reader.linktype != DLT_IEEE802_11_RADIO:
+            print(f"'{filepath}' was not recorded with radiotap headers (linktype {reader.linktype}). Skipping file.")
+            continue
+
+        for frame, metadata in reader:
+
+            dissection = dissect(frame)
+            if dissection is None or not is_sniffed_frame(dissection[0], dissection[1]):
+                skipped += 1
+                continue
+
+            try:
+                scapy_footprint = frame_footprint(RadioTap(frame))
+            except AttributeError:
+                # Malformed frame which Scapy can't dissect (also not counted by the live sniffer)
+                skipped += 1
+                continue
+
+            raw_footprint = raw_frame_footprint(frame)
+            checked += 1
+
+            if scapy_footprint != raw_footprint:
+                mismatches += 1
+                print(f"Mismatch in '{filepath}' (frame {checked + skipped}): Scapy {scapy_footprint} | Raw {raw_footprint}")
+
+print(f"{checked} frames checked, {skipped} frames skipped, {mismatches} mismatches.")
+
+if mismatches:
+    exit(1)
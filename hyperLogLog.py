@@ -0,0 +1,75 @@
+#           hyperLogLog.py
+#
+#   HyperLogLog sketches of the devices, for the sketch counting mode
+#   (COUNT_MODE = "sketch" in snifferSettings.py).
+#
+#   A sketch is a bytearray of 2^p registers (p = precision, 4..16), so
+#   its size doesn't depend on the number of devices. The 64-bit device
+#   footprint (t1ha0) is already a uniform hash: its top p bits select the
+#   register, which keeps the highest rank (leading zeros + 1) of the
+#   remaining 64 - p bits. Sketches of the same precision are merged by
+#   taking the highest rank of each register, so the sketches of the
+#   minutes of a window give the count of the whole window.
+#
+#   The estimate has a relative standard error of 1.04 / sqrt(2^p)
+#   (p = 12 -> 4096 bytes per sketch, 1.6%). Small counts use linear
+#   counting (empty registers), as in the original algorithm; no large
+#   range correction is needed with a 64-bit hash.
+#
+#   Only the standard library is used: sendCrowdingData.py imports this
+#   module through deviceRecordsDB.py.
+#
+
+import math
+
+MIN_PRECISION = 4
+MAX_PRECISION = 16
+
+# 2^-rank, indexed by register value
+INVERSE_POWERS = [2.0 ** -rank for rank in range(65)]
+
+
+def new_sketch(precision):
+    if not MIN_PRECISION <= precision <= MAX_PRECISION:
+        raise ValueError(f"HyperLogLog precision must be in [{MIN_PRECISION}, {MAX_PRECISION}], got {precision}.")
+    return bytearray(1 << precision)
+
+def sketch_precision(registers):
+    return len(registers).bit_length() - 1
+
+def add_to_sketch(registers, precision, footprint):
+    # True if the register changed
+    remainder_bits = 64 - precision
+    index = footprint >> remainder_bits
+    rank = remainder_bits - (footprint & ((1 << remainder_bits) - 1)).bit_length() + 1
+
+    if rank > registers[index]:
+        registers[index] = rank
+        return True
+    return False
+
+def merge_sketches(sketches):
+    # Register-wise maximum of sketches of the same precision (bytearray), or None if there are none
+    merged = None
+    for registers in sketches:
+        if merged is None:
+            merged = bytearray(registers)
+        elif len(registers) == len(merged):
+            merged = bytearray(map(max, merged, registers))
+        else:
+            raise ValueError("HyperLogLog sketches of different precisions can't be merged.")
+    return merged
+
+def estimate_cardinality(registers):
+    m = len(registers)
+    alpha = 0.7213 / (1 + 1.079 / m)
+    estimate = alpha * m * m / sum(map(INVERSE_POWERS.__getitem__, registers))
+
+    zeros = registers.count(0)
+    if estimate <= 2.5 * m and zeros:
+        return m * math.log(m / zeros)
+    return estimate
+
+def standard_error(precision):
+    # Relative standard error of the estimate
+    return 1.04 / math.sqrt(1 << precision)
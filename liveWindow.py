@@ -0,0 +1,178 @@
+#           liveWindow.py
+#
+#   Live sliding window counters of the sniffer: the devices sighted in the
+#   last Sliding_Window minutes (SensorConfiguration.db) and in each of the
+#   COUNT_WINDOWS (snifferSettings.py), kept up to date by the writer thread
+#   (deviceWriter.py) and published to a small JSON file on the RAM disk
+#   (LIVE_WINDOW_FILEPATH), so sendCrowdingData.py reads the current counts
+#   without querying DeviceRecords.db.
+#
+#   Per window and frame type, the devices are kept in an OrderedDict ordered
+#   by last sighting (footprint -> last seen, oldest first): a sighting moves
+#   its device to the end, and expiry pops devices from the front until the
+#   first one sighted within the window. The count of a frame type is the
+#   size of its table, so publishing costs nothing beyond the expiry.
+#   Devices count while last seen in (now - window, now]; unlike the
+#   database counts, a device seen only once, exactly at the start of the
+#   window, has already expired.
+#   (Sightings merged slightly out of order by the pipeline only delay the
+#   expiry of a device by a few seconds.)
+#
+#   Under overload (loadShedding.py) each count is scaled like the database
+#   counts: only the devices of the hash slice of the highest sampling rate
+#   active in the window are counted, multiplied by that rate. The devices
+#   are therefore also counted per slice level (trailing zero bits of the
+#   footprint), so the count of any slice is a sum of a few counters.
+#
+#   Published file (atomicWrite.py), windows in seconds:
+#   {"timestamp": epoch seconds, "windows": {"<window>": {"data_packets": n,
+#    "probe_requests": n, "sampling_rate": rate}, ...}}
+#
+#   When the writer starts, the counters are seeded from the sightings
+#   tables of DeviceRecords.db (last sighting of each device within the
+#   largest window) and the rate changes from the Sampling_Rate table, so a
+#   restarted sniffer publishes whole windows right away.
+#
+#   The counters are only active once 'enable_live_window' has been called
+#   (crowdingSniffer.py, only with COUNT_MODE = "exact": the sketch mode
+#   keeps fixed memory): the replay and the benchmarks don't publish them.
+#
+
+import json
+import time
+from collections import OrderedDict, deque
+
+from atomicWrite import atomic_write
+from deviceFootprint import PROBE_REQUEST, DATA_PACKET
+from deviceTable import DEVICE_SIGHTING_TABLES
+
+MAX_SLICE_LEVEL = 16                # Sampling rates up to 2^16
+
+LIVE_WINDOW = {
+    "enabled": False,
+    "windows": [],                  # Seconds
+    "filepath": None,
+    "publish_interval": 1,          # Seconds
+    "last_publish": 0.0,
+}
+
+# Window -> frame kind -> (footprint -> last seen, oldest sighting first)
+LIVE_DEVICES = {}
+
+# Window -> frame kind -> devices of the table per slice level (trailing zero bits of the footprint, capped at MAX_SLICE_LEVEL)
+SLICE_COUNTS = {}
+
+# Sampling rate changes of the largest window: (time, rate), the first one active at its start
+RATE_CHANGES = deque([(0, 1)])
+
+
+def enable_live_window(windows, filepath, publish_interval):
+    windows = sorted(set(windows))
+    LIVE_WINDOW.update(enabled=True, windows=windows, filepath=filepath, publish_interval=publish_interval)
+
+    LIVE_DEVICES.clear()
+    SLICE_COUNTS.clear()
+    for window in windows:
+        LIVE_DEVICES[window] = {PROBE_REQUEST: OrderedDict(), DATA_PACKET: OrderedDict()}
+        SLICE_COUNTS[window] = {PROBE_REQUEST: [0] * (MAX_SLICE_LEVEL + 1), DATA_PACKET: [0] * (MAX_SLICE_LEVEL + 1)}
+
+def slice_level(footprint):
+    if footprint == 0:
+        return MAX_SLICE_LEVEL
+    return min((footprint & -footprint).bit_length() - 1, MAX_SLICE_LEVEL)
+
+def record_live_sighting(frame_kind, footprint, timestamp):
+    for window, window_devices in LIVE_DEVICES.items():
+        devices = window_devices[frame_kind]
+        last_seen = devices.get(footprint)
+
+        if last_seen is None:
+            devices[footprint] = timestamp
+            SLICE_COUNTS[window][frame_kind][slice_level(footprint)] += 1
+
+        elif timestamp > last_seen:
+            devices[footprint] = timestamp
+            devices.move_to_end(footprint)
+
+def seed_live_window(con, now):
+    # Writer thread, at start: devices and sampling rates of the largest window ending 'now', from the database
+    largest_window = LIVE_WINDOW["windows"][-1]
+    window_start = now - largest_window
+
+    for frame_kind, sightings_table in DEVICE_SIGHTING_TABLES.items():
+        rows = con.execute("SELECT ID, MAX(Last) FROM " + sightings_table + " WHERE Minute >= ? and Last > ? and Last <= ? GROUP BY ID ORDER BY 2;",
+                           (window_start // 60, window_start, now)).fetchall()
+
+        for window, window_devices in LIVE_DEVICES.items():
+            devices = window_devices[frame_kind]
+            devices.clear()
+            slice_counts = SLICE_COUNTS[window][frame_kind]
+            slice_counts[:] = [0] * (MAX_SLICE_LEVEL + 1)
+
+            for device_id, last_seen in rows:
+                if last_seen > now - window:
+                    footprint = device_id & 0xFFFFFFFFFFFFFFFF
+                    devices[footprint] = last_seen
+                    slice_counts[slice_level(footprint)] += 1
+
+    # The rate active at the start of the largest window, then its changes
+    rate_at_start = con.execute("SELECT Rate FROM Sampling_Rate WHERE Time <= ? ORDER BY Time DESC LIMIT 1;", (window_start,)).fetchone()
+    RATE_CHANGES.clear()
+    RATE_CHANGES.append((0, rate_at_start[0] if rate_at_start else 1))
+    RATE_CHANGES.extend(con.execute("SELECT Time, Rate FROM Sampling_Rate WHERE Time > ? and Time <= ? ORDER BY Time;", (window_start, now)).fetchall())
+
+def live_sampling_rate_changed(timestamp, rate):
+    RATE_CHANGES.append((timestamp, rate))
+
+def expire_live_window(now):
+    # Devices last seen at or before the start of each window (now - window, as in the database counts)
+    for window, window_devices in LIVE_DEVICES.items():
+        window_start = now - window
+
+        for frame_kind, devices in window_devices.items():
+            while devices:
+                footprint, last_seen = next(iter(devices.items()))
+                if last_seen > window_start:
+                    break
+                devices.popitem(last=False)
+                SLICE_COUNTS[window][frame_kind][slice_level(footprint)] -= 1
+
+    # Rate changes superseded before the start of the largest window
+    while len(RATE_CHANGES) > 1 and RATE_CHANGES[1][0] <= now - LIVE_WINDOW["windows"][-1]:
+        RATE_CHANGES.popleft()
+
+def window_rate(now, window):
+    # Highest sampling rate active during the window: the rate at its start, or any later change
+    rate = 1
+    for i, (timestamp, change_rate) in enumerate(RATE_CHANGES):
+        if timestamp > now - window or i + 1 == len(RATE_CHANGES) or RATE_CHANGES[i + 1][0] > now - window:
+            rate = max(rate, change_rate)
+    return rate
+
+def live_window_counts(now, window):
+    # (data packets, probe requests, rate): devices of the slice of the highest rate of the window, scaled by the rate
+    rate = window_rate(now, window)
+    level = rate.bit_length() - 1
+    slice_counts = SLICE_COUNTS[window]
+
+    return sum(slice_counts[DATA_PACKET][level:]) * rate, sum(slice_counts[PROBE_REQUEST][level:]) * rate, rate
+
+def publish_live_window():
+    # Called by the writer thread every cycle; written at most every 'publish_interval' seconds
+    if time.monotonic() - LIVE_WINDOW["last_publish"] < LIVE_WINDOW["publish_interval"]:
+        return
+
+    now = int(time.time())
+    expire_live_window(now)
+
+    windows = {}
+    for window in LIVE_WINDOW["windows"]:
+        data_packets, probe_requests, rate = live_window_counts(now, window)
+        windows[str(window)] = {"data_packets": data_packets, "probe_requests": probe_requests, "sampling_rate": rate}
+
+    try:
+        atomic_write(LIVE_WINDOW["filepath"], json.dumps({"timestamp": now, "windows": windows}, separators=(",", ":")))
+    except OSError as error:
+        print("Failed to publish the live window counts.", error)
+
+    LIVE_WINDOW["last_publish"] = time.monotonic()
@@ -0,0 +1,96 @@
+#           loadShedding.py
+#
+#   Overload mode of the sniffer: deterministic sampling of the devices by
+#   footprint when the device writer can't keep up.
+#
+#   With a sampling rate k (power of 2), only the sightings of devices whose
+#   footprint has its low log2(k) bits at 0 are kept (1/k of the 64-bit hash
+#   space, the same devices for as long as the rate is active). The rate is
+#   doubled when the writer queue fill, the CPU usage of the writer process
+#   or the queue drops cross the high thresholds, and halved when the load
+#   is back under the low thresholds.
+#
+#   Each rate change is logged in the Sampling_Rate table of
+#   DeviceRecords.db. sendCrowdingData.py counts the devices of the hash
+#   slice of the highest rate active during its window and multiplies the
+#   count by that rate (deviceRecordsDB.count_sampled_window_devices).
+#
+#   Load shedding is only active once 'enable_load_shedding' has been
+#   called (crowdingSniffer.py), so the offline replay and the benchmarks
+#   always keep every device. It isn't enabled in the sketch counting mode
+#   (COUNT_MODE = "sketch"): a sketch merges the devices of a whole window,
+#   whatever rate was active when each of them was added.
+#
+
+import os
+import time
+
+SAMPLING = {
+    "rate": 1,
+    "mask": 0,                      # Sightings with 'footprint & mask' != 0 are dropped
+}
+
+SHEDDING = {
+    "enabled": False,
+    "check_interval": 5,
+    "queue_high": 0.5,
+    "queue_low": 0.1,
+    "cpu_high": 95,
+    "cpu_low": 70,
+    "max_rate": 64,
+}
+
+# Load at the last check (writer thread)
+LOAD = {
+    "last_check": 0.0,
+    "last_cpu_time": 0.0,
+    "last_drops": 0,
+}
+
+
+def enable_load_shedding(check_interval, queue_high, queue_low, cpu_high, cpu_low, max_rate):
+    SHEDDING.update(
+        enabled=True,
+        check_interval=check_interval,
+        queue_high=queue_high,
+        queue_low=queue_low,
+        cpu_high=cpu_high,
+        cpu_low=cpu_low,
+        max_rate=max_rate)
+
+    LOAD.update(last_check=time.monotonic(), last_cpu_time=process_cpu_time())
+
+def set_sampling_rate(rate):
+    SAMPLING["rate"] = rate
+    SAMPLING["mask"] = rate - 1
+
+def process_cpu_time():
+    times = os.times()
+    return times.user + times.system
+
+def next_sampling_rate(rate, queue_fill, cpu_percent, new_drops):
+    # Doubled on overload, halved once the load is low again
+    if queue_fill >= SHEDDING["queue_high"] or cpu_percent >= SHEDDING["cpu_high"] or new_drops:
+        return min(rate * 2, SHEDDING["max_rate"])
+
+    if queue_fill <= SHEDDING["queue_low"] and cpu_percent < SHEDDING["cpu_low"]:
+        return max(rate // 2, 1)
+
+    return rate
+
+def check_overload(queue_fill, drops):
+    # Called by the writer thread; returns the new sampling rate (applied by the caller once logged), or None if it didn't change
+    now = time.monotonic()
+    if now - LOAD["last_check"] < SHEDDING["check_interval"]:
+        return None
+
+    cpu_time = process_cpu_time()
+    cpu_percent = 100 * (cpu_time - LOAD["last_cpu_time"]) / (now - LOAD["last_check"])
+    new_drops = drops - LOAD["last_drops"]
+
+    LOAD.update(last_check=now, last_cpu_time=cpu_time, last_drops=drops)
+
+    rate = next_sampling_rate(SAMPLING["rate"], queue_fill, cpu_percent, new_drops)
+    if rate == SAMPLING["rate"]:
+        return None
+    return rate
@@ -1,4 +1,3 @@
-
 # Script para alterar ficheiro de texto com lista de OUIs de fabricantes do Wireshark de forma a ficar com a formatacao correta para ser lido pelo airodump-ng
 
 # Passos:
@@ -7,42 +6,73 @@
 # 3 - Copiar e guardar num ficheiro de texto
 # 4 - Executar este script para deixa-lo com a formatacao correta para ser lido pelo airodump-ng
 
+# Usage: python3 macOUIupdater.py [manuf file]
+#   Without argument the manuf file is downloaded; with a local manuf file it works offline.
+#   The list and its binary table (ouiDatabase.py) are written to new files, stamped with the
+#   update time and renamed into place, then the running sniffer is told to reload them (SIGHUP).
+
 import sys
 import os
+import time
+
+from atomicWrite import atomic_write
+from ouiDatabase import parse_oui_prefix, write_oui_database
+from manufacturerMatcher import build_automaton, matches_any
+
+MANUF_FILEPATH = "/home/kali/Desktop/manuf"
+OUI_LIST_FILEPATH = "/home/kali/Desktop/wireshark-oui-list.txt"
+OUI_DATABASE_FILEPATH = "/home/kali/Desktop/wireshark-oui-list.bin"
+PID_FILE = "/home/kali/Desktop/sniffer.pid"
 
-cmd ='curl "https://www.wireshark.org/download/automated/data/manuf" > /home/kali/Desktop/wireshark-oui-list.txt'
-print(cmd)
-os.system(cmd)
 
-# fairphone_ouis = {"54:08:3B:C0", "E8:78:29:C0", "F0:12:04:C0"}
+if len(sys.argv) > 1:
+  manuf_filepath = sys.argv[1]
+else:
+  manuf_filepath = MANUF_FILEPATH
+  cmd ='curl "https://www.wireshark.org/download/automated/data/manuf" > ' + MANUF_FILEPATH
+  print(cmd)
+  os.system(cmd)
 
 MOBILE_MANUFACTURERS = set()
 with open("/home/kali/Desktop/Mobile_device_manufacturers.txt") as file:
-    MOBILE_MANUFACTURERS.update(line.strip().upper() for line in file)
+    MOBILE_MANUFACTURERS.update(line.strip().upper() for line in file if line.strip())
+
+mobile_manufacturers = build_automaton(MOBILE_MANUFACTURERS)
+
+version = int(time.time())
+
+new_file = ["# version " + str(version) + '\n']
+entries = []
+
+with open(manuf_filepath, "r", encoding='utf-8') as f:
+  for line in f:
+    splits = line.split('\t')
 
-f = open(r'/home/kali/Desktop/wireshark-oui-list.txt', "r+", encoding='utf-8')
+    if( line.startswith('#') or len(splits) < 3 ):  # Comments and header
+      continue
 
-new_file = []
+    splits_twodots = splits[0].split(':')
 
-for i in range(10):
-  next(f)
+    if( len(splits_twodots) < 4 or '/' in splits[0] ):  # 24 bits (MA-L), or 28 / 36 bits blocks "AA:BB:CC:D0:00:00/28" (MA-M / MA-S)
 
-for line in f:
-  splits = line.split('\t')
+      if(matches_any(mobile_manufacturers, splits[2].strip().upper())):
 
-  splits_twodots = splits[0].split(':')
+        new_file.append(splits[0].strip() + '\t' + splits[2].strip() + '\n')
+        entries.append((*parse_oui_prefix(splits[0].strip()), splits[2].strip()))
 
-  if( len(splits_twodots) < 4 ):  # 24 bits
+print(f"{len(entries)} OUIs of mobile manufacturers (version {version}).")
 
-    if(any(mobile_manuf in splits[2].strip().upper() for mobile_manuf in MOBILE_MANUFACTURERS)):
-    
-      new_file.append(splits[0].strip() + '\t' + splits[2].strip() + '\n')
+# The list and the binary table are replaced atomically (atomicWrite.py), the sniffer may reload them at any time
+atomic_write(OUI_LIST_FILEPATH, "".join(new_file))
 
-  # elif( splits[0][:11] in fairphone_ouis ):                           # FairPhone 28 bits
-  
-  #   new_file.append(splits[0][:11] + '\t' + splits[2].strip() + '\n')
+# Binary table of the same list, mmap'd by the sniffer (ouiDatabase.py)
+write_oui_database(OUI_DATABASE_FILEPATH, entries, version)
 
+# The running sniffer swaps to the new list on SIGHUP
+pid = ""
+if os.path.exists(PID_FILE):
+  with open(PID_FILE, "r") as f:
+    pid = f.read().strip()
 
-with open(r"/home/kali/Desktop/wireshark-oui-list.txt", "w+", encoding='utf-8') as f:
-  for i in new_file:
-    f.write(i)
\ No newline at end of file
+if pid:
+  os.system("sudo kill -HUP " + pid)
@@ -0,0 +1,55 @@
+#           manufacturerMatcher.py
+#
+#   Multi-pattern matching of the manufacturer names (macOUIupdater.py):
+#   an Aho-Corasick automaton of the mobile manufacturers list finds
+#   whether any of the names is a substring of a manufacturer in a single
+#   pass over it, instead of one substring search per name.
+#
+
+from collections import deque
+
+
+def build_automaton(patterns):
+    # Aho-Corasick automaton of the patterns: (goto transitions, failure links, match flags) per state
+    goto = [{}]
+    fail = [0]
+    match = [False]
+
+    for pattern in patterns:
+        state = 0
+        for char in pattern:
+            if char not in goto[state]:
+                goto.append({})
+                fail.append(0)
+                match.append(False)
+                goto[state][char] = len(goto) - 1
+            state = goto[state][char]
+        match[state] = True
+
+    queue = deque(goto[0].values())
+    while queue:
+        state = queue.popleft()
+        for char, next_state in goto[state].items():
+            queue.append(next_state)
+
+            link = fail[state]
+            while link and char not in goto[link]:
+                link = fail[link]
+            fail[next_state] = goto[link].get(char, 0)
+            match[next_state] = match[next_state] or match[fail[next_state]]
+
+    return goto, fail, match
+
+def matches_any(automaton, text):
+    # True if any pattern is a substring of the text (a single pass over the text)
+    goto, fail, match = automaton
+    state = 0
+
+    for char in text:
+        while state and char not in goto[state]:
+            state = fail[state]
+        state = goto[state].get(char, 0)
+        if match[state]:
+            return True
+
+    return False
@@ -0,0 +1,128 @@
+#           ouiDatabase.py
+#
+#   Binary OUI database of the mobile manufacturers, written by
+#   macOUIupdater.py next to wireshark-oui-list.txt and mmap'd by the
+#   sniffer (deviceFootprint.py), so startup doesn't parse the text list
+#   and the table pages are shared by every process reading it.
+#
+#   Layout (little endian):
+#   (1) Header          -> magic, format version, entries per prefix length (24, 28, 36 bits),
+#                          strings, list version (update time stamped by macOUIupdater.py);
+#   (2) Prefixes        -> u64 per entry, sorted, one run per prefix length;
+#   (3) Manufacturers   -> u32 per entry, index of the manufacturer in the string pool;
+#   (4) String pool     -> u32 offsets (strings + 1) and the UTF-8 manufacturer names,
+#                          each name stored once.
+#
+#   Lookups binary search the prefixes of the source address, longest
+#   prefix first (36-bit MA-S, 28-bit MA-M, then 24-bit MA-L blocks).
+#
+
+import bisect
+import mmap
+import struct
+import sys
+
+from atomicWrite import atomic_write
+
+OUI_DATABASE_MAGIC = b"MCOUIDB\x00"
+OUI_DATABASE_VERSION = 1
+OUI_DATABASE_HEADER = struct.Struct("<8s6I")        # Magic, version, n24, n28, n36, n_strings, list version (32 bytes)
+
+PREFIX_LENGTHS = (24, 28, 36)
+
+
+def parse_oui_prefix(prefix):
+    # "AA:BB:CC" -> (24, 0xAABBCC) | "AA:BB:CC:D0:00:00/28" -> (28, 0xAABBCCD)
+    prefix, _, bits = prefix.partition('/')
+    bits = int(bits) if bits else 24
+    digits = prefix.replace(':', '').replace('-', '').ljust(12, '0')
+    return bits, int(digits, 16) >> (48 - bits)
+
+def write_oui_database(filepath, entries, list_version=0):
+    # 'entries': [(bits, prefix, manufacturer)]
+    strings = sorted({manuf for _, _, manuf in entries})
+    string_ids = {manuf: i for i, manuf in enumerate(strings)}
+
+    tables = {bits: {} for bits in PREFIX_LENGTHS}
+    for bits, prefix, manuf in entries:
+        if bits in tables:
+            tables[bits][prefix] = manuf
+
+    prefixes = []
+    manufs = []
+    for bits in PREFIX_LENGTHS:
+        for prefix, manuf in sorted(tables[bits].items()):
+            prefixes.append(prefix)
+            manufs.append(string_ids[manuf])
+
+    pool = [manuf.encode('utf-8') for manuf in strings]
+    offsets = [0]
+    for name in pool:
+        offsets.append(offsets[-1] + len(name))
+
+    atomic_write(filepath, b"".join([
+        OUI_DATABASE_HEADER.pack(OUI_DATABASE_MAGIC, OUI_DATABASE_VERSION, *(len(tables[bits]) for bits in PREFIX_LENGTHS), len(strings), list_version),
+        struct.pack(f"<{len(prefixes)}Q", *prefixes),
+        struct.pack(f"<{len(manufs)}I", *manufs),
+        struct.pack(f"<{len(offsets)}I", *offsets),
+        *pool]))
+
+class OuiDatabase:
+    # Read-only view of a binary OUI database
+
+    def __init__(self, filepath):
+        if sys.byteorder != "little":
+            raise ValueError("The binary OUI database is little endian.")
+
+        with open(filepath, "rb") as file:
+            self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(self.map) < OUI_DATABASE_HEADER.size:
+            raise ValueError(f"'{filepath}' isn't a version {OUI_DATABASE_VERSION} OUI database.")
+
+        magic, version, *counts, n_strings, self.list_version = OUI_DATABASE_HEADER.unpack_from(self.map, 0)
+        if magic != OUI_DATABASE_MAGIC or version != OUI_DATABASE_VERSION:
+            raise ValueError(f"'{filepath}' isn't a version {OUI_DATABASE_VERSION} OUI database.")
+
+        n_entries = sum(counts)
+        view = memoryview(self.map)
+
+        prefixes_start = OUI_DATABASE_HEADER.size
+        manufs_start = prefixes_start + 8 * n_entries
+        offsets_start = manufs_start + 4 * n_entries
+        pool_start = offsets_start + 4 * (n_strings + 1)
+        if len(self.map) < pool_start:
+            raise ValueError(f"'{filepath}' is truncated.")
+
+        prefixes = view[prefixes_start:manufs_start].cast('Q')
+        manufs = view[manufs_start:offsets_start].cast('I')
+
+        # Manufacturer names are decoded once: lookups return shared strings
+        offsets = view[offsets_start:pool_start].cast('I')
+        if len(self.map) != pool_start + offsets[n_strings]:
+            raise ValueError(f"'{filepath}' is truncated.")
+        self.strings = [str(self.map[pool_start + offsets[i]:pool_start + offsets[i + 1]], 'utf-8') for i in range(n_strings)]
+
+        # (prefixes, manufacturers, shift) per prefix length, longest first, empty ones left out
+        self.tables = []
+        start = 0
+        for bits, count in zip(PREFIX_LENGTHS, counts):
+            if count:
+                self.tables.insert(0, (prefixes[start:start + count], manufs[start:start + count], 48 - bits))
+            start += count
+
+    def lookup(self, mac):
+        # 'mac': 48-bit source address -> manufacturer, or None
+        for prefixes, manufs, shift in self.tables:
+            prefix = mac >> shift
+            i = bisect.bisect_left(prefixes, prefix)
+            if i < len(prefixes) and prefixes[i] == prefix:
+                return self.strings[manufs[i]]
+        return None
+
+    def prefixes24(self):
+        # 24-bit OUIs of all the entries
+        ouis = set()
+        for prefixes, _, shift in self.tables:
+            ouis.update(prefix >> (24 - shift) for prefix in prefixes)
+        return ouis
@@ -0,0 +1,115 @@
+#           ringCapture.py
+#
+#   Zero-copy capture of frames from a monitor interface through an
+#   mmap'd AF_PACKET ring buffer (PACKET_RX_RING, TPACKET_V3).
+#
+#   The kernel writes the frames straight into a ring of blocks shared
+#   with this process. Each frame is handed to the processing function
+#   as a memoryview slice of the ring, so no copy or Scapy object is
+#   created per frame. The slice is only valid during the call: the
+#   block is returned to the kernel right after its last frame has been
+#   processed, so the processing function must copy whatever it keeps.
+#   'block_done', if given, is called once per block after its last frame
+#   (the pipeline publishes the frames copied to its workers there).
+#
+
+import socket
+import struct
+import select
+import mmap
+
+from scapy.data import ETH_P_ALL
+from snifferFilter import attach_bpf_program
+
+SOL_PACKET = 263
+PACKET_RX_RING = 5
+PACKET_VERSION = 10
+TPACKET_V3 = 2
+
+TP_STATUS_KERNEL = 0
+TP_STATUS_USER = 1
+
+# struct tpacket_req3
+TPACKET_REQ3 = struct.Struct("IIIIIII")
+
+# struct tpacket_block_desc -> (block_status, num_pkts, offset_to_first_pkt) of tpacket_hdr_v1
+BLOCK_STATUS = struct.Struct("I")
+BLOCK_STATUS_OFFSET = 8
+BLOCK_HEADER = struct.Struct("III")
+
+# Socket of the running capture (the sniffer replaces its BPF program when the OUI list is reloaded)
+RING_CAPTURE = {
+    "socket": None,
+}
+
+# struct tpacket3_hdr -> (tp_next_offset, tp_sec, tp_nsec, tp_snaplen, tp_len, tp_status, tp_mac)
+PACKET_HEADER = struct.Struct("IIIIIIH")
+
+
+def open_ring(iface, bpf_program, block_size, block_nr, frame_size, block_timeout_ms):
+
+    sock = socket.socket(socket.AF_PACKET, socket.SOCK_RAW, socket.htons(ETH_P_ALL))
+
+    # The BPF program is attached before binding, so no unfiltered frame reaches the ring
+    attach_bpf_program(sock, bpf_program)
+
+    sock.setsockopt(SOL_PACKET, PACKET_VERSION, TPACKET_V3)
+    sock.setsockopt(SOL_PACKET, PACKET_RX_RING, TPACKET_REQ3.pack(
+        block_size,
+        block_nr,
+        frame_size,
+        (block_size * block_nr) // frame_size,
+        block_timeout_ms,
+        0,
+        0))
+
+    ring = mmap.mmap(sock.fileno(), block_size * block_nr, mmap.MAP_SHARED, mmap.PROT_READ | mmap.PROT_WRITE)
+
+    sock.bind((iface, ETH_P_ALL))
+
+    return sock, ring
+
+def ring_sniff(prn, iface, bpf_program, block_size, block_nr, frame_size, block_timeout_ms, block_done=None):
+
+    sock, ring = open_ring(iface, bpf_program, block_size, block_nr, frame_size, block_timeout_ms)
+    view = memoryview(ring)
+    RING_CAPTURE["socket"] = sock
+
+    poller = select.poll()
+    poller.register(sock, select.POLLIN | select.POLLERR)
+
+    block_status = BLOCK_STATUS
+    block_header = BLOCK_HEADER
+    packet_header = PACKET_HEADER
+
+    block = 0
+
+    try:
+        while True:
+            block_offset = block * block_size
+
+            if not block_status.unpack_from(ring, block_offset + BLOCK_STATUS_OFFSET)[0] & TP_STATUS_USER:
+                poller.poll()                       # Wait until the kernel retires the current block
+                continue
+
+            _, num_pkts, packet_offset = block_header.unpack_from(ring, block_offset + BLOCK_STATUS_OFFSET)
+            packet_offset += block_offset
+
+            for _ in range(num_pkts):
+                next_offset, tp_sec, _, tp_snaplen, _, _, tp_mac = packet_header.unpack_from(ring, packet_offset)
+                frame_start = packet_offset + tp_mac
+
+                prn(view[frame_start:frame_start + tp_snaplen], tp_sec)
+
+                packet_offset += next_offset
+
+            if block_done is not None:
+                block_done()
+
+            # Give the block back to the kernel
+            block_status.pack_into(ring, block_offset + BLOCK_STATUS_OFFSET, TP_STATUS_KERNEL)
+            block = (block + 1) % block_nr
+
+    finally:
+        RING_CAPTURE["socket"] = None
+        sock.close()
@@ -8,6 +8,8 @@ import uuid
 import netifaces as ni
 
 from sensorFunctions import *
+from deviceRecordsDB import DEVICE_RECORDS_DB_FILEPATH, upload_windows, count_sampled_windows_devices, count_sketch_windows_devices, sampling_error_bound
+from snifferSettings import COUNT_MODE, COUNT_SKETCH_PRECISION, COUNT_WINDOWS, LIVE_WINDOW_COUNTER, LIVE_WINDOW_FILEPATH, LIVE_WINDOW_MAX_AGE
 
 # Read sensor configuration from database
 
@@ -42,26 +44,65 @@ dataAtual=dt.datetime.now(pytz.utc)
 dataAnalizar= dataAtual - dt.timedelta(minutes=int(slidingWindow))
 
 
-# Get number of devices detected from database
-try:
+# Get number of devices detected in the sliding window and in the other COUNT_WINDOWS (minutes):
+# current counts of the sniffer's live window counters (liveWindow.py), or from database
+countWindows = upload_windows(slidingWindow, COUNT_WINDOWS)
 
-    conndev= sqlite3.connect('/home/kali/Desktop/MemoryDB/DeviceRecords.db' , timeout=30)
-    cdev = conndev.cursor()
+sampling_rate = 1
+error_bound = None
+window_counts = {}
+window_error_bounds = {}
 
-    # Device counting - Data packets
-    rows_data_packets = cdev.execute("""SELECT COUNT(*) FROM Data_Packets WHERE ((First_Record >= ? and First_Record <= ?) or (Last_Time_Found > ? and Last_Time_Found <= ?))""", (dataAnalizar, dataAtual, dataAnalizar, dataAtual)).fetchall()
+# [(data packets, probe requests, sampling rate)] per window of the exact counting mode (no live counters in the sketch counting mode)
+sampled_counts = None
+if LIVE_WINDOW_COUNTER and COUNT_MODE != "sketch":
+    sampled_counts = read_live_window_counts(LIVE_WINDOW_FILEPATH, [window * 60 for window in countWindows], int(dataAtual.timestamp()), LIVE_WINDOW_MAX_AGE)
 
-    # Device counting - Probe Requests
-    rows_probe_requests = cdev.execute("""SELECT COUNT(*) FROM Probe_Requests WHERE ((First_Record >= ? and First_Record <= ?) or (Last_Time_Found > ? and Last_Time_Found <= ?))""", (dataAnalizar, dataAtual, dataAnalizar, dataAtual)).fetchall()
+if sampled_counts is None:
+    try:
 
-    # Device counting - All
-    detected_devices = rows_data_packets[0][0] + rows_probe_requests[0][0]
+        conndev= sqlite3.connect(DEVICE_RECORDS_DB_FILEPATH , timeout=30)
+        cdev = conndev.cursor()
 
-    cdev.close()
-    conndev.close()
+        # Window limits in epoch seconds, as stored by the sniffer (all windows end now)
+        windowEnd = int(dataAtual.timestamp())
+        windowStarts = [windowEnd - window * 60 for window in countWindows]
 
-except sqlite3.Error as error:
-    print("Failed to read number of devices detected from local database.")
+        # Device counting - Data packets / Probe Requests of every window in one query (each scaled by the overload sampling rate of its window)
+        if COUNT_MODE == "sketch":
+            # Estimated from the per-minute sketches of the windows, with their error bounds (sketches are never sampled)
+            counts = count_sketch_windows_devices(cdev, windowStarts, windowEnd, COUNT_SKETCH_PRECISION)
+
+            for window, (data_packets, probe_requests, bound) in zip(countWindows, counts):
+                window_counts[window] = data_packets + probe_requests
+                window_error_bounds[window] = bound
+
+            error_bound = counts[0][2]
+        else:
+            sampled_counts = count_sampled_windows_devices(cdev, windowStarts, windowEnd)
+
+        cdev.close()
+        conndev.close()
+
+    except sqlite3.Error as error:
+        print("Failed to read number of devices detected from local database.")
+
+# Exact counts, live or from database: under overload each window is scaled by its sampling rate, with the error bound of the sampling
+if sampled_counts is not None:
+    for window, (data_packets, probe_requests, rate) in zip(countWindows, sampled_counts):
+        window_counts[window] = data_packets + probe_requests
+        if rate > 1:
+            window_error_bounds[window] = sampling_error_bound(data_packets + probe_requests, rate)
+
+    sampling_rate = sampled_counts[0][2]
+    error_bound = window_error_bounds.get(int(slidingWindow))
+
+# Device counting - All, in the sliding window
+detected_devices = window_counts.get(int(slidingWindow))
+
+# Other windows, published in the same message
+other_window_counts = {window: devices for window, devices in window_counts.items() if window != int(slidingWindow)}
+other_window_error_bounds = {window: bound for window, bound in window_error_bounds.items() if window != int(slidingWindow)}
 
 
 
@@ -70,18 +111,17 @@ if uploadTechnology.lower() == "wifi" and wifi_connected:
 
     dataAtual_unix = int(dataAtual.timestamp())
 
-    mqtt_confirmation = publish_detections_mqtt_message(dataAtual_unix, detected_devices, f"sttoolkit-test/mqtt/wifi/numdetections/{influxdb_bucket}/{ip_address}/{sensorName}/{sensorUUID}")
+    mqtt_confirmation = publish_detections_mqtt_message(dataAtual_unix, detected_devices, f"sttoolkit-test/mqtt/wifi/numdetections/{influxdb_bucket}/{ip_address}/{sensorName}/{sensorUUID}", sampling_rate, error_bound, other_window_counts, other_window_error_bounds)
 
     if mqtt_confirmation is True:
 
         # Check if exists a pending measurement to send
-        while get_1st_pending_measurement() is not None:
+        while (pending_measurement := get_1st_pending_measurement()) is not None:
 
-            # Send first pending measurement from database, and wait for its confirmation
-            unix_ts = get_1st_pending_measurement()[0]
-            devices_detected = get_1st_pending_measurement()[1]
+            # Send first pending measurement from database (with the sampling rate and error bound of its count, and the other windows), and wait for its confirmation
+            unix_ts, devices_detected, pending_sampling_rate, pending_error_bound, pending_window_counts, pending_window_error_bounds = pending_measurement
 
-            mqtt_pend_confirmation = publish_detections_mqtt_message(unix_ts, devices_detected, f"sttoolkit-test/mqtt/wifi/numdetections/{influxdb_bucket}/{ip_address}/{sensorName}/{sensorUUID}")
+            mqtt_pend_confirmation = publish_detections_mqtt_message(unix_ts, devices_detected, f"sttoolkit-test/mqtt/wifi/numdetections/{influxdb_bucket}/{ip_address}/{sensorName}/{sensorUUID}", pending_sampling_rate, pending_error_bound, pending_window_counts, pending_window_error_bounds)
 
             if mqtt_pend_confirmation is True:
                 # Remove first pending measurement from database
@@ -275,7 +315,7 @@ else:
     print("\nFailed to publish mqtt message.")
     print("\nSaving detection in database to send later, when conection available.")
     #save measurement in database
-    store_pending_measurement(dataAtual_unix, detected_devices)
+    store_pending_measurement(dataAtual_unix, detected_devices, sampling_rate, error_bound, other_window_counts, other_window_error_bounds)
 
 cwifi.close()
 connwifi.close()
\ No newline at end of file
@@ -34,6 +34,17 @@ SENSOR_SEND_LOCATION_FILEPATH = "/home/kali/Desktop/sendSensorLocation.py"
 # Filepath of python script for changing upload technology 
 SENSOR_COMMUNICATION_CHECK_FILEPATH = "/home/kali/Desktop/sensorCommunicationCheck.py"
 
+# Filepath of the measurements waiting to be published (MQTT broker unreachable)
+STORED_MEASUREMENTS_DB_FILEPATH = "/home/kali/Desktop/DB/StoredMeasurements.db"
+
+# Columns of PendingMeasurements added after Timestamp / DevicesDetected (NULL in rows stored by older versions: unknown)
+PENDING_MEASUREMENT_COLUMNS = {
+    "SamplingRate": "INTEGER",
+    "ErrorBound": "INTEGER",
+    "WindowCounts": "TEXT",
+    "WindowErrorBounds": "TEXT",
+}
+
 #Filepath to cronjobs output text file
 DEFAULT_CRONJOBS_FILEPATH = "/home/kali/Desktop/cronjobs_default.txt"
 CONFIGURED_CRONJOBS_FILEPATH = "/home/kali/Desktop/cronjobs_configured.txt"
@@ -399,14 +410,14 @@ def write_crontab_file(status, detection_if, upload_periodicity):
         f.write("# Periodic upload of crowding data to the Cloud Server\n")
         f.write("*/" + str(upload_periodicity) + " * * * * /usr/bin/python3 /home/kali/Desktop/sendCrowdingData.py\n")
         f.write("# Periodic delete of outdated and unnecessary data from local database\n")
-        f.write("0 * * * * /usr/bin/python3 /home/kali/Desktop/dataRetentionManager.py 30\n")
+        f.write("0 * * * * /usr/bin/python3 /home/kali/Desktop/dataRetentionManager.py 60\n")
     elif status == "Disabled":
         f.write("# Wi-Fi detection of devices\n")
         f.write("#@reboot sleep 90 && sudo /usr/bin/python3 /home/kali/Desktop/sensorStartup.py\n")
         f.write("# Periodic upload of crowding data to the Cloud Server\n")
         f.write("#*/" + str(upload_periodicity) + " * * * * /usr/bin/python3 /home/kali/Desktop/sendCrowdingData.py\n")
         f.write("# Periodic delete of outdated and unnecessary data from local database\n")
-        f.write("#0 * * * * /usr/bin/python3 /home/kali/Desktop/dataRetentionManager.py 30\n")
+        f.write("#0 * * * * /usr/bin/python3 /home/kali/Desktop/dataRetentionManager.py 60\n")
     f.write("# Periodic upload of OUI list\n")
     f.write("0 0 * * 0 /usr/bin/python3 /home/kali/Desktop/macOUIupdater.py\n")
 
@@ -517,46 +528,96 @@ def publish_location_mqtt_message(msg_payload, topic):
         print("\nFailed to publish mqtt message.")
         return False
 
-def publish_detections_mqtt_message(unix_timestamp, devices_detected: int, topic):
-    client = connect_mqtt()
-
+# JSON payload of the detections message (also built by benchmarks/sensorBenchmark.py)
+def detections_payload(unix_timestamp, devices_detected: int, sampling_rate=1, error_bound=None, window_counts=None, window_error_bounds=None):
     msg_payload = {
         "timestamp": unix_timestamp,
         "devices_detected": int(devices_detected)
     }
 
-    json_msg_payload = json.dumps(msg_payload, separators=(",", ":"))
+    # 'sampling_rate' > 1 -> the sniffer was overloaded and 'devices_detected' was scaled from 1/sampling_rate of the devices
+    # (None: unknown, for measurements stored by older versions)
+    if sampling_rate is not None:
+        msg_payload["sampling_rate"] = int(sampling_rate)
+
+    # Sketch counting mode (snifferSettings.COUNT_MODE) or 'sampling_rate' > 1: 'devices_detected' is an estimate, within +/- 'error_bound' devices
+    if error_bound is not None:
+        msg_payload["error_bound"] = int(error_bound)
+
+    # Other windows (snifferSettings.COUNT_WINDOWS): {minutes: devices detected}, each scaled by its own sampling rate
+    if window_counts:
+        msg_payload["windows"] = {str(window): int(devices) for window, devices in window_counts.items()}
+
+    if window_error_bounds:
+        msg_payload["window_error_bounds"] = {str(window): int(bound) for window, bound in window_error_bounds.items()}
+
+    return json.dumps(msg_payload, separators=(",", ":"))
+
+def publish_detections_mqtt_message(unix_timestamp, devices_detected: int, topic, sampling_rate=1, error_bound=None, window_counts=None, window_error_bounds=None):
+    client = connect_mqtt()
+
+    json_msg_payload = detections_payload(unix_timestamp, devices_detected, sampling_rate, error_bound, window_counts, window_error_bounds)
 
     result = client.publish(topic, json_msg_payload)
 
     # result: [0, 1]
     status = result[0]
     if status == 0:
-        print(f"Send `{msg_payload}` to topic `{topic}`.")
+        print(f"Send `{json_msg_payload}` to topic `{topic}`.")
         return True
     else:
         print("\nFailed to publish mqtt message.")
         # Save measurement in database
-        store_pending_measurement(unix_timestamp, devices_detected)
+        store_pending_measurement(unix_timestamp, devices_detected, sampling_rate, error_bound, window_counts, window_error_bounds)
         return False
 
-# Insert pending measurement in database
-def store_pending_measurement(unix_timestamp, devices_detected):
-    conn = sqlite3.connect('/home/kali/Desktop/DB/StoredMeasurements.db' , timeout=30)
+# Read the device counts published by the sniffer's live window counters (liveWindow.py)
+def read_live_window_counts(filepath, windows, now, max_age):
+    # [(data packets, probe requests, sampling rate)] per window (seconds), or None if there are no current counts of these windows (sniffer stopped, other windows)
+    try:
+        with open(filepath, "r") as file:
+            live_counts = json.load(file)
+
+        if now - live_counts["timestamp"] > max_age:
+            return None
+
+        counts = []
+        for window in windows:
+            live_count = live_counts["windows"][str(window)]
+            counts.append((live_count["data_packets"], live_count["probe_requests"], live_count["sampling_rate"]))
+        return counts
+
+    except (OSError, ValueError, KeyError):
+        return None
+
+# Add the columns missing in PendingMeasurements tables created by older versions
+def migrate_pending_measurements(cursor):
+    columns = [row[1] for row in cursor.execute("""PRAGMA table_info(PendingMeasurements)""").fetchall()]
+    for column, column_type in PENDING_MEASUREMENT_COLUMNS.items():
+        if column not in columns:
+            cursor.execute(f"""ALTER TABLE PendingMeasurements ADD COLUMN {column} {column_type}""")
+
+# Insert pending measurement in database, with the sampling rate and error bound of its count and the counts of the other windows (JSON)
+def store_pending_measurement(unix_timestamp, devices_detected, sampling_rate=None, error_bound=None, window_counts=None, window_error_bounds=None):
+    conn = sqlite3.connect(STORED_MEASUREMENTS_DB_FILEPATH, timeout=30)
     cursor = conn.cursor()
-    cursor.execute("""INSERT INTO PendingMeasurements VALUES (?, ?) """, (unix_timestamp, devices_detected))
+    migrate_pending_measurements(cursor)
+    cursor.execute("""INSERT INTO PendingMeasurements (Timestamp, DevicesDetected, SamplingRate, ErrorBound, WindowCounts, WindowErrorBounds) VALUES (?, ?, ?, ?, ?, ?) """,
+                   (unix_timestamp, devices_detected, sampling_rate, error_bound,
+                    json.dumps(window_counts) if window_counts else None, json.dumps(window_error_bounds) if window_error_bounds else None))
     conn.commit()
     cursor.close()
     conn.close()
     print(f"Measurement '({unix_timestamp},{devices_detected})' stored in the database.")
 
 
-# Get first pending measurement from database
+# Get first pending measurement from database: (timestamp, devices detected, sampling rate, error bound, window counts, window error bounds), None where unknown
 def get_1st_pending_measurement():
-    conn = sqlite3.connect('/home/kali/Desktop/DB/StoredMeasurements.db' , timeout=30)
+    conn = sqlite3.connect(STORED_MEASUREMENTS_DB_FILEPATH, timeout=30)
     cursor = conn.cursor()
-    
-    first_row = cursor.execute("""SELECT * FROM PendingMeasurements ORDER BY Timestamp ASC LIMIT 1 """).fetchone()
+    migrate_pending_measurements(cursor)
+
+    first_row = cursor.execute("""SELECT Timestamp, DevicesDetected, SamplingRate, ErrorBound, WindowCounts, WindowErrorBounds FROM PendingMeasurements ORDER BY Timestamp ASC LIMIT 1 """).fetchone()
 
     conn.commit()
     cursor.close()
@@ -567,12 +628,14 @@ def get_1st_pending_measurement():
         print("There are no pending measurements, database is empty.")
         return None
     else:
-        return first_row
+        unix_timestamp, devices_detected, sampling_rate, error_bound, window_counts, window_error_bounds = first_row
+        return (unix_timestamp, devices_detected, sampling_rate, error_bound,
+                json.loads(window_counts) if window_counts else None, json.loads(window_error_bounds) if window_error_bounds else None)
         
 
 # Remove first pending measurement from database
 def remove_1st_pending_measurement():
-    conn = sqlite3.connect('/home/kali/Desktop/DB/StoredMeasurements.db' , timeout=30)
+    conn = sqlite3.connect(STORED_MEASUREMENTS_DB_FILEPATH, timeout=30)
     cursor = conn.cursor()
     
     cursor.execute("""DELETE FROM PendingMeasurements WHERE Timestamp IN (SELECT Timestamp FROM PendingMeasurements ORDER BY Timestamp ASC LIMIT 1)""")
@@ -2,18 +2,19 @@ import subprocess
 import os
 import sqlite3
 
+from deviceRecordsDB import *
+
 PID_FILE = "/home/kali/Desktop/sniffer.pid"
 
 os.system("sudo iwconfig wlan1 channel 1")
 os.system("sudo chown kali:kali /home/kali/Desktop/MemoryDB")
 os.system("sudo chmod 755 /home/kali/Desktop/MemoryDB/")
 
-dr_con = sqlite3.connect('/home/kali/Desktop/MemoryDB/DeviceRecords.db', timeout=30)
-dr_cur = dr_con.cursor()
+dr_con = sqlite3.connect(DEVICE_RECORDS_DB_FILEPATH, timeout=30)
 
-dr_cur.execute("CREATE TABLE IF NOT EXISTS Data_Packets (Frame_Type TEXT, ID TEXT, First_Record DATETIME, Last_Time_Found DATETIME, Manufacturer TEXT);")
-dr_cur.execute("CREATE TABLE IF NOT EXISTS Probe_Requests (Frame_Type TEXT, ID TEXT, First_Record DATETIME, Last_Time_Found DATETIME, Manufacturer TEXT);")
-dr_con.commit()
+# Create the device tables, or migrate the existing ones to the current schema
+create_device_records_schema(dr_con)
+dr_con.close()
 
 os.system("sudo chown kali:kali /home/kali/Desktop/MemoryDB/DeviceRecords.db")
 os.system("sudo chmod 664 /home/kali/Desktop/MemoryDB/DeviceRecords.db")
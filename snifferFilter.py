@@ -0,0 +1,207 @@
+#           snifferFilter.py
+#
+#   Capture filter (BPF program) of the sniffer, generated at startup so
+#   that only frames which can be counted reach userspace:
+#   (1) Frame types   -> data frames sent to the DS (to-DS flag) and probe requests;
+#   (2) Signal        -> power filtration of the sensor configuration;
+#   (3) Source        -> randomized MAC (locally administered bit of addr2) or
+#                        OUI of a mobile manufacturer (oui_prefixes, deviceFootprint.py).
+#
+#   (1) and (2) are compiled by libpcap. (3) is appended as a hand-written
+#   block: libpcap needs 4 instructions per OUI and the kernel accepts at
+#   most BPF_MAXINSNS instructions, far less than the mobile manufacturers
+#   list. The block looks up the OUI prefix in a bitmap held in the
+#   instructions: a binary search over the 32-bit bitmap words (about 4
+#   instructions per word, ~15 of them run per frame), ending in a test of
+#   the word, or in comparisons with the prefixes of sparse words. When the
+#   exact bitmap (24-bit prefixes) doesn't fit, shorter prefixes are used:
+#   some non-mobile OUIs then also pass, and are dropped by
+#   'isMobileManufacturer' as before (see BPF_OUI_FILTER, snifferSettings.py).
+#   Without OUIs, or if nothing fits, the program is (1) + (2).
+#
+#   'frame_filter_match' applies (1) and (2) in userspace, for the frames
+#   of the offline replay (snifferReplay.py), which don't go through the
+#   socket filter.
+#
+
+import socket
+
+from scapy.arch.common import compile_filter, free_filter
+from scapy.data import DLT_IEEE802_11_RADIO, SO_ATTACH_FILTER
+from scapy.libs.structures import bpf_insn, sock_fprog
+from frameDissector import *
+
+BPF_MAXINSNS = 4096                 # Kernel limit of a classic BPF socket filter
+
+# Classic BPF opcodes
+BPF_LDB_ABS = 0x30                  # A = pkt[k]
+BPF_LDB_IND = 0x50                  # A = pkt[X + k]
+BPF_LD_IND = 0x40                   # A = pkt[X + k : X + k + 4] (big endian)
+BPF_LD_IMM = 0x00                   # A = k
+BPF_LD_MEM = 0x60                   # A = M[k]
+BPF_ST = 0x02                       # M[k] = A
+BPF_LSH_K = 0x64
+BPF_LSH_X = 0x6c
+BPF_RSH_K = 0x74
+BPF_AND_K = 0x54
+BPF_OR_X = 0x4c
+BPF_TAX = 0x07
+BPF_JA = 0x05
+BPF_JEQ_K = 0x15
+BPF_JGT_K = 0x25
+BPF_JGE_K = 0x35
+BPF_JSET_K = 0x45
+BPF_RET_K = 0x06
+
+BPF_ACCEPT = 262144                 # Snapshot length returned by the libpcap programs
+
+DOT11_LOCALLY_ADMINISTERED = 0x02
+
+FRAME_TYPE_FILTER = "((wlan type data && wlan[1] & 0x01 != 0) || (wlan type mgt subtype probe-req))"
+
+
+def frame_filter(power_filtration):
+    filter_str = FRAME_TYPE_FILTER
+    if power_filtration != 0:
+        filter_str += f" && radio [22] > {256 + power_filtration}"
+    return filter_str
+
+def frame_filter_match(frame, power_filtration):
+    # True if the raw frame passes 'frame_filter(power_filtration)'. Frames truncated within the 802.11 header,
+    # which the BPF program may accept, are rejected: the processing drops them anyway
+    dissection = dissect(frame)
+    if dissection is None:
+        return False
+    frame_type, subtype, flags = dissection[:3]
+
+    if frame_type == DOT11_TYPE_DATA:
+        if not flags & DOT11_FLAG_TO_DS:
+            return False
+    elif not (frame_type == DOT11_TYPE_MANAGEMENT and subtype == DOT11_SUBTYPE_PROBE_REQUEST):
+        return False
+
+    # "radio [22] > 256 + power_filtration" (as in BPF, a load past the end of the frame rejects it)
+    return power_filtration == 0 or (len(frame) > 22 and frame[22] > 256 + power_filtration)
+
+def compile_bpf(filter_str):
+    # (code, jt, jf, k) of each instruction compiled by libpcap for the radiotap link type
+    bpf = compile_filter(filter_str, linktype=DLT_IEEE802_11_RADIO)
+    program = [(insn.code, insn.jt, insn.jf, insn.k & 0xFFFFFFFF) for insn in bpf.bf_insns[:bpf.bf_len]]
+    free_filter(bpf)
+    return program
+
+def oui_prefix_block(ouis, shift):
+    # Accepts if addr2 is locally administered or its (24 - shift)-bit prefix is set in the bitmap
+    words = {}
+    for oui in ouis:
+        prefix = oui >> shift
+        words[prefix >> 5] = words.get(prefix >> 5, 0) | (1 << (prefix & 31))
+
+    block = [
+        (BPF_LDB_ABS, 0, 0, 3),                                 # X = radiotap length (little endian)
+        (BPF_LSH_K, 0, 0, 8),
+        (BPF_TAX, 0, 0, 0),
+        (BPF_LDB_ABS, 0, 0, 2),
+        (BPF_OR_X, 0, 0, 0),
+        (BPF_TAX, 0, 0, 0),
+        (BPF_LDB_IND, 0, 0, 10),                                # addr2[0]
+        (BPF_JSET_K, 0, 1, DOT11_LOCALLY_ADMINISTERED),
+        (BPF_RET_K, 0, 0, BPF_ACCEPT),
+        (BPF_LD_IND, 0, 0, 10),                                 # addr2[0:4] -> OUI prefix
+        (BPF_RSH_K, 0, 0, 8 + shift),
+        (BPF_ST, 0, 0, 0),                                      # M[0] = prefix
+        (BPF_AND_K, 0, 0, 31),
+        (BPF_TAX, 0, 0, 0),
+        (BPF_LD_IMM, 0, 0, 1),
+        (BPF_LSH_X, 0, 0, 0),
+        (BPF_ST, 0, 0, 1),                                      # M[1] = bit of the prefix in its word
+        (BPF_LD_MEM, 0, 0, 0),                                  # A = prefix
+    ]
+
+    return block + close_search(prefix_search(sorted(words.items()), 0, (1 << (24 - shift)) - 1))
+
+def prefix_search(words, lo, hi):
+    # Binary search of the prefix (A, known to be in [lo, hi]) among the bitmap words, [(word, bitmap)] sorted.
+    # Jumps to the returns are left as "accept" / "reject", resolved by 'close_search'
+    if len(words) == 1:
+        return prefix_word_test(words[0][0], words[0][1], lo, hi)
+
+    middle = len(words) // 2
+    split = words[middle][0] << 5
+    left = prefix_search(words[:middle], lo, split - 1)
+    right = prefix_search(words[middle:], split, hi)
+
+    # Subtrees out of reach of their returns (8-bit jump offsets) get their own
+    if len(left) + len(right) + 4 > 255:
+        left = close_search(left)
+        right = close_search(right)
+
+    if len(left) <= 255:
+        return [(BPF_JGE_K, len(left), 0, split)] + left + right
+    return [(BPF_JGE_K, 0, 1, split), (BPF_JA, 0, 0, len(left))] + left + right
+
+def prefix_word_test(word, bitmap, lo, hi):
+    # Tests the prefix (A, in [lo, hi]) against one bitmap word
+    first, last = word << 5, (word << 5) | 31
+    prefixes = [first + bit for bit in range(32) if bitmap >> bit & 1]
+
+    # A few prefixes: compared one by one, whatever the range
+    if len(prefixes) <= 2 or (len(prefixes) == 3 and (lo < first or hi > last)):
+        return [(BPF_JEQ_K, "accept", 0, prefix) for prefix in prefixes[:-1]] + [(BPF_JEQ_K, "accept", "reject", prefixes[-1])]
+
+    test = []
+    if lo < first:
+        test.append((BPF_JGE_K, 0, "reject", first))
+    if hi > last:
+        test.append((BPF_JGT_K, "reject", 0, last))
+    if bitmap == 0xFFFFFFFF:
+        return test + [(BPF_JA, 0, 0, "accept")]
+    return test + [(BPF_LD_MEM, 0, 0, 1), (BPF_JSET_K, "accept", "reject", bitmap)]
+
+def close_search(search):
+    # Appends the returns of a search (sub)tree and resolves its jumps to them
+    accept = len(search)
+    closed = []
+    for i, (code, jt, jf, k) in enumerate(search):
+        offsets = [accept - (i + 1) if target == "accept" else accept + 1 - (i + 1) if target == "reject" else target for target in (jt, jf, k)]
+        if code == BPF_JA:
+            closed.append((code, 0, 0, offsets[2]))
+        else:
+            closed.append((code, offsets[0], offsets[1], k))
+    return closed + [(BPF_RET_K, 0, 0, BPF_ACCEPT), (BPF_RET_K, 0, 0, 0)]
+
+def append_block(program, block):
+    # The accepting returns of the libpcap program jump to the block instead
+    linked = []
+    for i, (code, jt, jf, k) in enumerate(program):
+        if code == BPF_RET_K and k != 0:
+            linked.append((BPF_JA, 0, 0, len(program) - (i + 1)))
+        else:
+            linked.append((code, jt, jf, k))
+    return linked + block
+
+def capture_program(power_filtration, ouis, max_instructions=BPF_MAXINSNS):
+    # 'ouis': 24-bit OUIs (integers). OUIs split in MA-M / MA-S blocks pass whole, the blocks are checked in userspace
+    program = compile_bpf(frame_filter(power_filtration))
+
+    if not ouis:
+        return program
+
+    if any(code & 0x07 == 0x06 and code != BPF_RET_K for code, _, _, _ in program):
+        print("Unexpected capture filter program. OUIs will be checked in userspace.")
+        return program
+
+    for shift in range(0, 20):
+        block = oui_prefix_block(ouis, shift)
+
+        if len(program) + len(block) <= max_instructions:
+            print(f"Capture filter: {len(ouis)} OUIs as {24 - shift}-bit prefixes ({len(program) + len(block)} BPF instructions).")
+            return append_block(program, block)
+
+    print("OUIs don't fit in the capture filter. OUIs will be checked in userspace.")
+    return program
+
+def attach_bpf_program(sock, program):
+    insns = (bpf_insn * len(program))(*[
+        bpf_insn(code, jt, jf, k - (1 << 32) if k >= (1 << 31) else k) for code, jt, jf, k in program])
+    sock.setsockopt(socket.SOL_SOCKET, SO_ATTACH_FILTER, sock_fprog(len(program), insns))
@@ -0,0 +1,166 @@
+#           snifferMetrics.py
+#
+#   Hot-path instrumentation of the sniffer (crowdingSniffer.py), exported
+#   as a Prometheus text file (e.g. on the RAM disk, for the node_exporter
+#   textfile collector or a simple cat).
+#
+#   Nothing is instrumented unless 'install_metrics' is called: it replaces
+#   the processing functions of the sniffer, 'isMobileManufacturer' and the
+#   t1ha0 'lib' used by deviceFootprint.py with counting/timing wrappers.
+#   With METRICS_ENABLED off the hot path is unchanged (zero cost).
+#
+#   Metrics:
+#   sniffer_frames_total                 -> frames received by the processing callback
+#   sniffer_frames_rejected_oui_total    -> frames whose source isn't a mobile manufacturer or a random MAC
+#   sniffer_sightings_total{kind}        -> devices sighted (probe_request / data_packet)
+#   sniffer_stage_seconds{stage}         -> latency histograms:
+#                                           frame (whole callback), footprint (dissection,
+#                                           OUI lookup and hashing), hash (t1ha0), db (queueing
+#                                           of the sighting for the device writer)
+#   sniffer_<source>_<name>              -> gauges of the device writer / pipeline / fingerprint cache / hot MAC / probe burst stats
+#
+#   In pipeline mode (snifferPipeline.py) only the capture process is
+#   instrumented: frames are counted, the footprint stages run in the workers.
+#
+
+import bisect
+import threading
+import time
+
+import deviceFootprint
+from atomicWrite import atomic_write
+
+# Upper bounds of the latency histogram buckets (seconds)
+STAGE_BUCKETS = (1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 5e-3, 1e-2, 1e-1)
+STAGES = ("frame", "footprint", "hash", "db")
+
+SIGHTING_KINDS = {
+    deviceFootprint.PROBE_REQUEST: "probe_request",
+    deviceFootprint.DATA_PACKET: "data_packet",
+}
+
+METRICS = {
+    "frames": 0,
+    "rejected_oui": 0,
+    "sightings": {kind: 0 for kind in SIGHTING_KINDS.values()},
+    "stages": {stage: {"buckets": [0] * (len(STAGE_BUCKETS) + 1), "sum": 0.0, "count": 0} for stage in STAGES},
+}
+
+
+def observe(stage, elapsed_ns):
+    histogram = METRICS["stages"][stage]
+    elapsed = elapsed_ns / 1e9
+
+    histogram["buckets"][bisect.bisect_left(STAGE_BUCKETS, elapsed)] += 1
+    histogram["sum"] += elapsed
+    histogram["count"] += 1
+
+def timed_frame_callback(callback):
+    def instrumented(*args):
+        METRICS["frames"] += 1
+        start = time.perf_counter_ns()
+        callback(*args)
+        observe("frame", time.perf_counter_ns() - start)
+    return instrumented
+
+def timed_footprint(footprint_function):
+    def instrumented(*args):
+        start = time.perf_counter_ns()
+        footprint = footprint_function(*args)
+        observe("footprint", time.perf_counter_ns() - start)
+
+        if footprint:
+            METRICS["sightings"][SIGHTING_KINDS[footprint[0]]] += 1
+        return footprint
+    return instrumented
+
+def counted_manufacturer_lookup(lookup):
+    def instrumented(mac):
+        result = lookup(mac)
+        if not result[0]:
+            METRICS["rejected_oui"] += 1
+        return result
+    return instrumented
+
+def timed_sighting(put_sighting):
+    def instrumented(*args):
+        start = time.perf_counter_ns()
+        put_sighting(*args)
+        observe("db", time.perf_counter_ns() - start)
+    return instrumented
+
+class TimedHashLibrary:
+    # Stands for the t1ha0 'lib' in deviceFootprint.py: the hash functions are timed
+
+    def __init__(self, lib):
+        self.lib = lib
+
+    def __getattr__(self, name):
+        return getattr(self.lib, name)
+
+    def t1ha0(self, *args):
+        start = time.perf_counter_ns()
+        digest = self.lib.t1ha0(*args)
+        observe("hash", time.perf_counter_ns() - start)
+        return digest
+
+    def t1ha0_ie_fingerprint(self, *args):
+        start = time.perf_counter_ns()
+        digest = self.lib.t1ha0_ie_fingerprint(*args)
+        observe("hash", time.perf_counter_ns() - start)
+        return digest
+
+def install_metrics(sniffer_globals, filepath, interval, gauges):
+    # 'sniffer_globals': namespace of crowdingSniffer.py | 'gauges': {source: function returning a stats dict}
+
+    for name in ("frame_processing", "raw_frame_processing", "pipeline_frame"):
+        sniffer_globals[name] = timed_frame_callback(sniffer_globals[name])
+
+    sniffer_globals["put_sighting"] = timed_sighting(sniffer_globals["put_sighting"])
+
+    # The footprint functions are called from crowdingSniffer.py, the lookup and hashing from deviceFootprint.py
+    for name in ("frame_footprint", "raw_frame_footprint"):
+        sniffer_globals[name] = timed_footprint(sniffer_globals[name])
+
+    deviceFootprint.isMobileManufacturer = counted_manufacturer_lookup(deviceFootprint.isMobileManufacturer)
+    deviceFootprint.lib = TimedHashLibrary(deviceFootprint.lib)
+
+    exporter = threading.Thread(target=metrics_exporter, args=(filepath, interval, gauges), name="MetricsExporter", daemon=True)
+    exporter.start()
+
+def metrics_text(gauges):
+    lines = [
+        "# TYPE sniffer_frames_total counter",
+        f"sniffer_frames_total {METRICS['frames']}",
+        "# TYPE sniffer_frames_rejected_oui_total counter",
+        f"sniffer_frames_rejected_oui_total {METRICS['rejected_oui']}",
+        "# TYPE sniffer_sightings_total counter",
+    ]
+    lines += [f'sniffer_sightings_total{{kind="{kind}"}} {count}' for kind, count in METRICS["sightings"].items()]
+
+    lines.append("# TYPE sniffer_stage_seconds histogram")
+    for stage, histogram in METRICS["stages"].items():
+        cumulative = 0
+        for bound, count in zip(STAGE_BUCKETS + ("+Inf",), histogram["buckets"]):
+            cumulative += count
+            lines.append(f'sniffer_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+        lines.append(f'sniffer_stage_seconds_sum{{stage="{stage}"}} {histogram["sum"]}')
+        lines.append(f'sniffer_stage_seconds_count{{stage="{stage}"}} {histogram["count"]}')
+
+    for source, stats in gauges.items():
+        for name, value in stats().items():
+            lines.append(f"# TYPE sniffer_{source}_{name} gauge")
+            lines.append(f"sniffer_{source}_{name} {value}")
+
+    return "\n".join(lines) + "\n"
+
+def write_metrics(filepath, gauges):
+    atomic_write(filepath, metrics_text(gauges))
+
+def metrics_exporter(filepath, interval, gauges):
+    while True:
+        try:
+            write_metrics(filepath, gauges)
+        except OSError as error:
+            print("Failed to write sniffer metrics.", error)
+        time.sleep(interval)
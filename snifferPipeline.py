@@ -0,0 +1,254 @@
+#           snifferPipeline.py
+#
+#   Multi-process pipeline mode of the sniffer:
+#   (1) Capture process -> the process running the capture loop. Each raw
+#       frame is copied into the shared memory ring of one worker, chosen
+#       by a hash of its source address (addr2);
+#   (2) Worker processes -> read their ring, dissect and fingerprint the
+#       frames (deviceFootprint.py) and keep the last time each of their
+#       devices was forwarded, so a device is forwarded at most once per
+#       second;
+#   (3) Merge process -> receives the sightings of all workers and feeds
+#       the device writer (deviceWriter.py), which owns DeviceRecords.db.
+#
+#   On SIGHUP the capture process forwards the reload of the mobile
+#   manufacturers list to the workers, each of which holds its own copy.
+#
+#   A device seen with the same source address always goes to the same
+#   worker. Probe requests of a device with a rotating random MAC can reach
+#   several workers; their sightings are coalesced again in the device table.
+#
+#   Each worker ring is a single producer / single consumer byte ring in
+#   multiprocessing.shared_memory. Records are [length u16][timestamp u32][frame];
+#   a length of 0xFFFF marks the wrap to the start of the ring. The read and
+#   write positions are RawValues, only exchanged under the lock of the ring
+#   (which also orders the accesses to the ring memory between the two
+#   processes): the capture process publishes its write position once per
+#   capture block ('pipeline_publish', called by ring_sniff), and only reads
+#   the read position again when its last copy says the ring is full; a
+#   worker takes the lock once per pass over its ring. Per frame, the capture
+#   process only copies the frame into the ring.
+#
+
+import multiprocessing
+import os
+import signal
+import struct
+import time
+from multiprocessing import shared_memory
+
+from deviceFootprint import *
+from deviceWriter import *
+
+RECORD_HEADER = struct.Struct("<HI")
+RECORD_WRAP = 0xFFFF
+
+WORKER_BATCH_SIZE = 256             # Sightings sent to the merge process at once
+WORKER_BATCH_INTERVAL = 0.1         # Seconds after which a partial batch is sent
+WORKER_IDLE_SLEEP = 0.001           # Seconds a worker sleeps when its ring is empty
+WORKER_FORWARDED_MAX = 200000       # Devices remembered by a worker before its forward table is reset
+
+PIPELINE_STATS = {
+    "frames": 0,
+    "drops": 0,
+}
+
+context = multiprocessing.get_context("fork")
+
+# Per worker: (shared memory, write position, read position, lock)
+rings = []
+
+# Capture process state of each ring: [buffer, capacity, write position, last read position seen, published write position]
+producers = []
+
+workers = []
+merge_process = None
+merge_queue = None
+running = None
+
+
+def start_pipeline(n_workers, ring_size, writer_args):
+    global merge_process, merge_queue, running
+
+    PIPELINE_STATS.update(frames=0, drops=0)
+    running = context.Value('B', 1)
+    merge_queue = context.Queue(4 * n_workers)
+
+    merge_process = context.Process(target=merge_stage, args=(n_workers, writer_args), name="SnifferMerge", daemon=True)
+    merge_process.start()
+
+    for _ in range(n_workers):
+        ring = (shared_memory.SharedMemory(create=True, size=ring_size), context.RawValue('Q', 0), context.RawValue('Q', 0), context.Lock())
+        rings.append(ring)
+        producers.append([ring[0].buf, ring_size, 0, 0, 0])
+
+        worker = context.Process(target=worker_stage, args=ring, name="SnifferWorker", daemon=True)
+        worker.start()
+        workers.append(worker)
+
+def stop_pipeline():
+    pipeline_publish()
+    running.value = 0
+
+    for worker in workers:
+        worker.join()
+    merge_process.join()
+
+    producers.clear()
+    for shm, _, _, _ in rings:
+        shm.close()
+        shm.unlink()
+
+    rings.clear()
+    workers.clear()
+
+def reload_pipeline():
+    # Capture process: the workers reload the mobile manufacturers list (macOUIupdater.py)
+    for worker in workers:
+        os.kill(worker.pid, signal.SIGHUP)
+
+def publish_ring(shard):
+    # Capture process: hand the frames copied since the last publication to the worker, and read its position back
+    producer = producers[shard]
+    _, head, tail, lock = rings[shard]
+
+    with lock:
+        head.value = producer[2]
+        producer[3] = tail.value
+    producer[4] = producer[2]
+
+def pipeline_publish():
+    # Capture process: called once per capture block (and by the replay every few frames)
+    for shard, producer in enumerate(producers):
+        if producer[2] != producer[4]:
+            publish_ring(shard)
+
+def pipeline_frame(frame_view, timestamp, blocking=False):
+    # Capture process: copy the frame into the ring of the worker owning its source address, visible to it at the next 'pipeline_publish'
+    # When the ring is full the frame is dropped, or in blocking mode (offline replay) waits for the worker
+
+    PIPELINE_STATS["frames"] += 1
+
+    frame_len = len(frame_view)
+    addr2 = (frame_view[2] | (frame_view[3] << 8)) + DOT11_ADDR2_OFFSET if frame_len > 4 else 0
+    shard = (frame_view[addr2 + 4] ^ frame_view[addr2 + 5]) % len(producers) if addr2 + 6 <= frame_len else 0
+
+    producer = producers[shard]
+    buf, capacity, write_pos, read_pos = producer[:4]
+
+    index = write_pos % capacity
+    record_len = RECORD_HEADER.size + frame_len
+
+    # Records are never split: skip the end of the ring if the record doesn't fit there
+    skip = capacity - index if capacity - index < record_len else 0
+
+    if frame_len >= RECORD_WRAP or skip + record_len > capacity:
+        PIPELINE_STATS["drops"] += 1
+        return
+
+    # Full according to the last read position seen: publish, which reads the current one
+    while write_pos + skip + record_len - read_pos > capacity:
+        publish_ring(shard)
+        read_pos = producer[3]
+
+        if write_pos + skip + record_len - read_pos <= capacity:
+            break
+        if not blocking:
+            PIPELINE_STATS["drops"] += 1
+            return
+        time.sleep(WORKER_IDLE_SLEEP)
+
+    if skip:
+        if skip >= 2:
+            buf[index:index + 2] = RECORD_WRAP.to_bytes(2, "little")
+        write_pos += skip
+        index = 0
+
+    RECORD_HEADER.pack_into(buf, index, frame_len, timestamp)
+    buf[index + RECORD_HEADER.size:index + record_len] = frame_view
+
+    producer[2] = write_pos + record_len
+
+def worker_stage(shm, head, tail, lock):
+
+    # The capture process stops the pipeline when it receives SIGTERM, and forwards SIGHUP
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGHUP, lambda signum, frame: reload_mobile_manufacturers())
+
+    buf = shm.buf
+    capacity = len(buf)
+
+    forwarded = {}
+    batch = []
+    last_batch = time.monotonic()
+
+    read_pos = 0
+
+    while True:
+
+        with lock:
+            tail.value = read_pos
+            write_pos = head.value
+
+        if read_pos == write_pos:
+            if not running.value:
+                break
+            time.sleep(WORKER_IDLE_SLEEP)
+
+        while read_pos < write_pos:
+            index = read_pos % capacity
+
+            if capacity - index < 2 or int.from_bytes(buf[index:index + 2], "little") == RECORD_WRAP:
+                read_pos += capacity - index
+                continue
+
+            frame_len, timestamp = RECORD_HEADER.unpack_from(buf, index)
+            frame_start = index + RECORD_HEADER.size
+
+            footprint = raw_frame_footprint(buf[frame_start:frame_start + frame_len], timestamp)
+
+            if footprint:
+                frame_kind, footprint_mac, manuf = footprint
+                key = (frame_kind, footprint_mac)
+
+                # Last_Seen has a one-second resolution: forward each device at most once per second
+                if forwarded.get(key) != timestamp:
+                    if len(forwarded) >= WORKER_FORWARDED_MAX:
+                        forwarded.clear()
+                    forwarded[key] = timestamp
+                    batch.append((frame_kind, footprint_mac, manuf, timestamp))
+
+            read_pos += RECORD_HEADER.size + frame_len
+
+        if batch and (len(batch) >= WORKER_BATCH_SIZE or time.monotonic() - last_batch >= WORKER_BATCH_INTERVAL):
+            merge_queue.put(batch)
+            batch = []
+            last_batch = time.monotonic()
+
+    if batch:
+        merge_queue.put(batch)
+    merge_queue.put(None)
+
+    shm.close()
+
+def merge_stage(n_workers, writer_args):
+
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+
+    start_device_writer(*writer_args)
+
+    remaining = n_workers
+    while remaining:
+        batch = merge_queue.get()
+
+        if batch is None:
+            remaining -= 1
+            continue
+
+        for sighting in batch:
+            put_sighting(*sighting)
+
+    stop_device_writer()
@@ -0,0 +1,171 @@
+#           snifferReplay.py
+#
+#   Offline replay of pcap/pcapng files recorded on the monitor interface
+#   (radiotap headers), through the same processing functions as the live
+#   sniffer (crowdingSniffer.py) and the device writer (deviceWriter.py).
+#
+#   The capture timestamps drive the clock: sightings carry the frame
+#   time, so the resulting device tables and window counts only depend on
+#   the replayed files. The writer runs in blocking mode, so no sighting is
+#   dropped when the replay is faster than the database writes.
+#
+#   Frames are replayed as fast as possible, or paced by their capture
+#   timestamps with --speed (1 = real time, 2 = twice as fast, ...).
+#   The frame type and power filtration of the live BPF filter are applied
+#   in userspace ('frame_filter_match', snifferFilter.py), with the power
+#   filtration given by --power (0 = none, as in SensorConfiguration.db).
+#   The OUI block of the live filter isn't needed: the processing checks
+#   the manufacturer of every frame anyway.
+#
+#   With --workers N the raw frames go through the multi-process pipeline
+#   (snifferPipeline.py) as with PIPELINE_WORKERS = N, the capture side
+#   waiting for the workers instead of dropping frames. The device tables
+#   are the same as with the single-process replay.
+#
+#   With --sketch the devices are counted with the per-minute HyperLogLog
+#   sketches (COUNT_MODE = "sketch", COUNT_SKETCH_PRECISION) instead of the
+#   device tables.
+#
+#   Usage: python3 snifferReplay.py [--db DeviceRecords.db] [--speed N] [--power dBm] [--scapy] [--workers N] [--sketch] [--window MINUTES] capture1.pcap [capture2.pcapng ...]
+#
+
+import argparse
+import sqlite3
+import time
+
+from scapy.layers.dot11 import RadioTap
+from scapy.utils import RawPcapReader
+from scapy.data import DLT_IEEE802_11_RADIO
+from crowdingSniffer import *
+
+OUI_LIST_FILEPATH = "/home/kali/Desktop/wireshark-oui-list.txt"
+REPLAY_DB_FILEPATH = "DeviceRecords_replay.db"
+REPLAY_BLOCK_FRAMES = 64            # Frames copied to the pipeline workers between publications (as one capture block)
+
+
+def frame_time(metadata):
+    # pcap: (sec, usec) | pcapng: 64-bit timestamp in 'tsresol' units per second
+    if hasattr(metadata, "sec"):
+        return metadata.sec + metadata.usec / 1000000
+    return ((metadata.tshigh << 32) | metadata.tslow) / metadata.tsresol
+
+def raw_frames(filepath):
+    with RawPcapReader(filepath) as reader:
+        for frame, metadata in reader:
+            if getattr(metadata, "linktype", getattr(reader, "linktype", None)) != DLT_IEEE802_11_RADIO:
+                continue
+            yield frame, frame_time(metadata)
+
+def replay(filepaths, speed, power_filtration, use_scapy, workers):
+    frames = 0
+    first_time = None
+    replay_start = time.monotonic()
+    last_time = None
+
+    for filepath in filepaths:
+        for frame, timestamp in raw_frames(filepath):
+
+            if not frame_filter_match(frame, power_filtration):
+                continue
+
+            if speed:
+                if first_time is None:
+                    first_time = timestamp
+
+                delay = (timestamp - first_time) / speed - (time.monotonic() - replay_start)
+                if delay > 0:
+                    if workers:
+                        pipeline_publish()
+                    time.sleep(delay)
+
+            if use_scapy:
+                packet = RadioTap(frame)
+                packet.time = timestamp
+                try:
+                    frame_processing(packet)
+                except AttributeError:
+                    # Malformed frame which Scapy can't dissect
+                    pass
+            elif workers:
+                pipeline_frame(frame, int(timestamp), blocking=True)
+                if frames % REPLAY_BLOCK_FRAMES == REPLAY_BLOCK_FRAMES - 1:
+                    pipeline_publish()
+            else:
+                raw_frame_processing(frame, int(timestamp))
+
+            frames += 1
+            last_time = timestamp
+
+    return frames, (last_time if frames else None)
+
+
+parser = argparse.ArgumentParser(description="Replay pcap/pcapng files through the crowding sniffer processing.")
+parser.add_argument("pcap", nargs="+", help="pcap/pcapng files recorded on the monitor interface")
+parser.add_argument("--db", default=REPLAY_DB_FILEPATH, help=f"device records database to write (default: {REPLAY_DB_FILEPATH})")
+parser.add_argument("--speed", type=float, default=0, help="pace the replay by the capture timestamps (1 = real time); 0 = as fast as possible (default)")
+parser.add_argument("--power", type=int, default=0, help="power filtration of the capture filter (SensorConfiguration.db Power_Filtration); 0 = none (default)")
+parser.add_argument("--scapy", action="store_true", help="process Scapy packets (frame_processing) instead of raw frames (raw_frame_processing)")
+parser.add_argument("--workers", type=int, default=0, help="process the raw frames in N pipeline worker processes (snifferPipeline.py); 0 = in this process (default)")
+parser.add_argument("--sketch", action="store_true", help="count the devices with per-minute HyperLogLog sketches instead of the device tables")
+parser.add_argument("--window", type=int, default=0, help="print the devices counted in the sliding window (minutes) ending at the last frame")
+parser.add_argument("--oui", default=OUI_LIST_FILEPATH, help=f"OUI list of the mobile manufacturers (default: {OUI_LIST_FILEPATH})")
+args = parser.parse_args()
+
+if args.workers and args.scapy:
+    parser.error("--workers replays raw frames, it can't be combined with --scapy")
+
+load_oui_list(args.oui)
+
+con = sqlite3.connect(args.db, timeout=30)
+create_device_records_schema(con)
+con.close()
+
+if args.sketch:
+    enable_sketch_counting(COUNT_SKETCH_PRECISION)
+
+REPLAY_WRITER_ARGS = (
+    args.db,
+    WRITER_QUEUE_SIZE,
+    WRITER_MAX_BATCH,
+    DEVICE_FLUSH_INTERVAL,
+    DEVICE_FLUSH_CHANGES,
+    DEVICE_IDLE_EXPIRY,
+    True)                           # Blocking writer
+
+replay_start = time.monotonic()
+
+if args.workers:
+    start_pipeline(args.workers, PIPELINE_RING_SIZE, REPLAY_WRITER_ARGS)
+else:
+    start_device_writer(*REPLAY_WRITER_ARGS)
+
+frames, last_time = replay(args.pcap, args.speed, args.power, args.scapy, args.workers)
+
+# Pending frames and sightings are processed and written before the pipeline / writer stops
+if args.workers:
+    stop_pipeline()
+else:
+    stop_device_writer()
+
+elapsed = time.monotonic() - replay_start
+
+print(f"{frames} frames replayed in {elapsed:.2f}s ({frames / elapsed if elapsed else 0:.0f} frames/s), device tables written.")
+if args.workers:
+    print(f"Pipeline ({args.workers} workers): {PIPELINE_STATS}")
+else:
+    print(f"Writer: {writer_stats()}")
+
+if args.window and last_time is not None:
+    window_end = int(last_time)
+    window_start = window_end - args.window * 60
+
+    con = sqlite3.connect(args.db, timeout=30)
+    if args.sketch:
+        data_packets, probe_requests, error_bound = count_sketch_window_devices(con.cursor(), window_start, window_end, COUNT_SKETCH_PRECISION)
+    else:
+        data_packets, probe_requests = count_window_devices(con.cursor(), window_start, window_end)
+    con.close()
+
+    print(f"Devices in the last {args.window} minutes: {data_packets + probe_requests} (data packets {data_packets}, probe requests {probe_requests}).")
+    if args.sketch:
+        print(f"Sketch error bound: +/- {error_bound} devices.")
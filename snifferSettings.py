@@ -0,0 +1,81 @@
+#           snifferSettings.py
+#
+#   Tuning parameters of the crowding sniffer (crowdingSniffer.py)
+#   and of the scripts that read its results.
+#
+#   These parameters are not part of the sensor configuration stored
+#   in SensorConfiguration.db: they only change how frames are
+#   captured and processed, not what is measured.
+#
+
+
+# Monitor interface used for the detection of devices
+SNIFFER_INTERFACE = "wlan1"
+
+# Capture backend:
+#   "scapy" -> scapy.sniff() (one Scapy packet per frame)
+#   "ring"  -> mmap'd AF_PACKET TPACKET_V3 ring buffer (ringCapture.py)
+CAPTURE_BACKEND = "scapy"
+
+# Capture filter (snifferFilter.py): the OUIs of the mobile manufacturers list are checked in the kernel,
+# as the longest prefixes that fit in the BPF program. With the ~6.7k OUIs of the current list: 17-bit prefixes,
+# which also pass ~18% of the other universally administered OUIs (16-bit: ~33%, 18-bit would need ~5.9k instructions)
+BPF_OUI_FILTER = True               # False -> only frame types and power in the kernel, sources checked in userspace
+
+# TPACKET_V3 ring geometry (ring size = RING_BLOCK_SIZE * RING_BLOCK_NR)
+RING_BLOCK_SIZE = 1 << 20           # 1MB per block (multiple of the page size)
+RING_BLOCK_NR = 8
+RING_FRAME_SIZE = 2048
+RING_BLOCK_TIMEOUT_MS = 100         # Time after which the kernel hands over a partially filled block
+
+# Multi-process pipeline (snifferPipeline.py), only with the "ring" capture backend:
+# worker processes dissect and fingerprint the frames, sharded by source address
+PIPELINE_WORKERS = 0                # 0 -> frames are processed in the capture process
+PIPELINE_RING_SIZE = 8 << 20        # Shared memory ring of each worker (bytes)
+
+# Write-behind of the device table (deviceTable.py) to DeviceRecords.db, by the writer thread (deviceWriter.py)
+WRITER_QUEUE_SIZE = 50000           # Sightings waiting for the writer thread (beyond this they are dropped)
+WRITER_MAX_BATCH = 5000             # Sightings taken from the queue per writer cycle
+DEVICE_FLUSH_INTERVAL = 5           # Seconds between writes of the changed devices
+DEVICE_FLUSH_CHANGES = 2000         # Changed devices that trigger an early write
+DEVICE_IDLE_EXPIRY = 3600           # Seconds after which an idle device is dropped from memory
+
+# Counting mode of the devices:
+#   "exact"  -> one row per device (device and per-minute sightings tables)
+#   "sketch" -> one HyperLogLog sketch per minute and frame type (hyperLogLog.py): fixed memory, approximate counts
+COUNT_MODE = "exact"
+COUNT_SKETCH_PRECISION = 12         # 2^p registers (bytes) per sketch, standard error 1.04 / sqrt(2^p): 12 -> 4KB, 1.6%
+
+# Windows counted besides Sliding_Window (minutes), published in the same MQTT message by sendCrowdingData.py
+# dataRetentionManager.py keeps at least the largest window of data, whatever its cron argument
+COUNT_WINDOWS = [1, 5, 15, 60]      # [] -> only Sliding_Window
+
+# Live sliding window counters (liveWindow.py): devices of Sliding_Window and of each COUNT_WINDOWS, read by sendCrowdingData.py
+LIVE_WINDOW_COUNTER = True          # Only with COUNT_MODE = "exact": keeps every device of the largest window in memory
+LIVE_WINDOW_FILEPATH = "/home/kali/Desktop/MemoryDB/live_window.json"
+LIVE_WINDOW_PUBLISH_INTERVAL = 1    # Seconds between writes of the count (at most DEVICE_FLUSH_INTERVAL without sightings)
+LIVE_WINDOW_MAX_AGE = 30            # Seconds after which sendCrowdingData.py counts from DeviceRecords.db instead (sniffer stopped)
+
+# Fingerprint cache (deviceFootprint.py): raw Information Elements of the probe requests -> footprint (LRU)
+FINGERPRINT_CACHE_SIZE = 4096       # Entries (0 -> disabled)
+
+# Hot MACs (deviceFootprint.py): data frames of a source address sighted less than HOT_MAC_REFRESH seconds ago are only counted
+HOT_MAC_REFRESH = 1                 # Seconds (frame time; 0 -> disabled). Last_Seen is exact at 1, lags by up to N - 1 seconds above
+
+# Probe bursts (deviceFootprint.py): probe requests continuing a burst of their source address are folded into one sighting
+PROBE_BURST_WINDOW = 1              # Seconds after the first frame of a burst (frame time; 0 -> disabled)
+PROBE_BURST_SEQ_GAP = 16            # Highest sequence number step between two frames of a burst
+
+# Overload sampling (loadShedding.py): under overload only 1/rate of the devices (by footprint) are recorded
+OVERLOAD_SHEDDING = True            # Only with COUNT_MODE = "exact": sketches always record every device
+OVERLOAD_CHECK_INTERVAL = 5         # Seconds between load checks
+OVERLOAD_QUEUE_HIGH = 0.5           # Writer queue fill (fraction of WRITER_QUEUE_SIZE) that doubles the rate
+OVERLOAD_QUEUE_LOW = 0.1            # Writer queue fill under which the rate is halved...
+OVERLOAD_CPU_HIGH = 95              # CPU usage of the writer process (% of one core) that doubles the rate
+OVERLOAD_CPU_LOW = 70               # ...if the CPU usage is also under this one
+OVERLOAD_MAX_RATE = 64              # Highest sampling rate (power of 2)
+
+# Hot-path instrumentation (snifferMetrics.py), exported as a Prometheus text file
+METRICS_ENABLED = False             # False -> nothing is instrumented
+METRICS_FILEPATH = "/home/kali/Desktop/MemoryDB/sniffer.prom"
+METRICS_INTERVAL = 10               # Seconds between writes of the metrics file
@@ -1 +1,2 @@
-from ._t1ha0_module import ffi, lib
\ No newline at end of file
+from ._t1ha0_module import ffi, lib
+from .batch import pack_records, t1ha0_batch
@@ -0,0 +1,69 @@
+#           batch.py
+#
+#   Batched t1ha0 hashing: the digests of N records are computed in a
+#   single call to the C module (t1ha0_batch.c) instead of one call per
+#   record.
+#
+#   The records are packed in one buffer, with an offsets array of N + 1
+#   entries (record i spans buffer[offsets[i]:offsets[i + 1]]). The
+#   digests are written to a preallocated uint64 array: array('Q') or a
+#   NumPy uint64 array, or any writable buffer of 64-bit unsigned ints.
+#
+#   The C module trusts the offsets, so they are checked first (ValueError):
+#   non-decreasing, within the buffer, and no more records than digests.
+#
+
+from array import array
+
+from ._t1ha0_module import ffi, lib
+
+# Module built before t1ha0_batch.c was added -> one t1ha0() call per record
+NATIVE_BATCH = hasattr(lib, "t1ha0_batch")
+
+
+def pack_records(records):
+    offsets = array('Q', [0])
+    for record in records:
+        offsets.append(offsets[-1] + len(record))
+
+    return b"".join(records), offsets
+
+def check_batch(buffer, offsets, digests):
+    # Number of records of a valid batch, ValueError otherwise
+    offsets_view = memoryview(offsets)
+    if offsets_view.ndim != 1 or offsets_view.itemsize != 8:
+        raise ValueError("t1ha0_batch offsets must be a one-dimensional array of 64-bit unsigned ints.")
+
+    values = offsets_view.tolist()
+    if not values:
+        raise ValueError("t1ha0_batch offsets must hold N + 1 entries, got none.")
+    if values != sorted(values):
+        raise ValueError("t1ha0_batch offsets must be non-decreasing.")
+    if values[-1] > memoryview(buffer).nbytes:
+        raise ValueError(f"t1ha0_batch offsets end at {values[-1]}, past the end of the {memoryview(buffer).nbytes}-byte buffer.")
+
+    n = len(values) - 1
+    if digests is not None and memoryview(digests).nbytes // 8 < n:
+        raise ValueError(f"t1ha0_batch digests can hold {memoryview(digests).nbytes // 8} digests, {n} records given.")
+    return n
+
+def t1ha0_batch(buffer, offsets, seed, digests=None):
+    n = check_batch(buffer, offsets, digests)
+
+    if digests is None:
+        digests = array('Q', bytes(8 * n))
+
+    if NATIVE_BATCH:
+        lib.t1ha0_batch(
+            ffi.from_buffer(buffer),
+            ffi.from_buffer("uint64_t[]", offsets),
+            n,
+            seed,
+            ffi.from_buffer("uint64_t[]", digests, require_writable=True))
+
+    else:
+        data = ffi.from_buffer(buffer)
+        for i in range(n):
+            digests[i] = lib.t1ha0(data + offsets[i], offsets[i + 1] - offsets[i], seed)
+
+    return digests
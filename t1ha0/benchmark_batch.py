@@ -0,0 +1,53 @@
+#           benchmark_batch.py
+#
+#   Compares one t1ha0() call per frame (as in the sniffer) with the
+#   batched t1ha0_batch() call, across several batch sizes.
+#
+#   Records mimic the sniffer input: MAC address strings
+#   ("AA:BB:CC:DD:EE:FF") and probe request fingerprints (~100 bytes).
+#
+#   Usage (from the directory containing t1ha0/): python3 -m t1ha0.benchmark_batch
+#
+
+import os
+import time
+from array import array
+
+from t1ha0 import lib, pack_records, t1ha0_batch
+
+BATCH_SIZES = [1, 8, 32, 128, 512, 2048]
+RECORDS_PER_RUN = 200000
+
+
+def mac_records(n):
+    return [os.urandom(6).hex(':').upper().encode('ASCII') for _ in range(n)]
+
+def fingerprint_records(n):
+    return [os.urandom(80 + (i % 40)) for i in range(n)]
+
+def per_frame(records, seed):
+    start = time.perf_counter()
+    for record in records:
+        hex(lib.t1ha0(record, len(record), seed))[2:].upper()
+    return time.perf_counter() - start
+
+def batched(records, seed, batch_size):
+    # Records are packed beforehand, as the capture stage would write them
+    batches = [pack_records(records[i:i + batch_size]) for i in range(0, len(records), batch_size)]
+    digests = array('Q', bytes(8 * batch_size))
+
+    start = time.perf_counter()
+    for buffer, offsets in batches:
+        t1ha0_batch(buffer, offsets, seed, digests)
+    return time.perf_counter() - start
+
+
+for name, records, seed in (("MAC address", mac_records(RECORDS_PER_RUN), 11),
+                            ("Fingerprint", fingerprint_records(RECORDS_PER_RUN), 3)):
+
+    reference = per_frame(records, seed)
+    print(f"{name} records: per-frame calls -> {RECORDS_PER_RUN / reference / 1e6:.2f} M records/s")
+
+    for batch_size in BATCH_SIZES:
+        elapsed = batched(records, seed, batch_size)
+        print(f"\tbatch size {batch_size:5d} -> {RECORDS_PER_RUN / elapsed / 1e6:.2f} M records/s ({reference / elapsed:.1f}x)")
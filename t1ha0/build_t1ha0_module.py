@@ -6,14 +6,18 @@ ffi = cffi.FFI()
 # Define the C interface for t1ha0
 ffi.cdef("""
 uint64_t t1ha0(const void *data, size_t len, uint64_t seed);
+uint64_t t1ha0_ie_fingerprint(const void *ies, size_t len, const void *rules, uint8_t mask_byte, uint64_t seed);
+void t1ha0_batch(const void *data, const uint64_t *offsets, size_t n, uint64_t seed, uint64_t *digests);
 """)
 
 # Compile the module
 ffi.set_source("_t1ha0_module",
     """
     #include "t1ha.h"
+    #include "ie_fingerprint.h"
+    #include "t1ha0_batch.h"
     """,
-    sources=["t1ha0.c","t1ha1.c"],  # Path to t1ha0.c and t1ha1.c source file
+    sources=["t1ha0.c","t1ha1.c","ie_fingerprint.c","t1ha0_batch.c"],  # Path to t1ha0.c, t1ha1.c, ie_fingerprint.c and t1ha0_batch.c source files
     include_dirs=["."],   # Directory containing t1ha.h
 )
 
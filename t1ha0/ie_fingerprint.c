@@ -0,0 +1,72 @@
+/*
+ * ie_fingerprint.c
+ *
+ * See ie_fingerprint.h
+ */
+
+#include <stdlib.h>
+#include <string.h>
+
+#include "t1ha.h"
+#include "ie_fingerprint.h"
+
+/* Enough for the body of any probe request seen in practice */
+#define IE_FINGERPRINT_STACK_SIZE 4096
+
+uint64_t t1ha0_ie_fingerprint(const void *ies, size_t len, const void *rules, uint8_t mask_byte, uint64_t seed)
+{
+    const uint8_t *body = (const uint8_t *)ies;
+    const uint8_t *rule_table = (const uint8_t *)rules;
+    uint8_t stack_buffer[IE_FINGERPRINT_STACK_SIZE];
+    uint8_t *fingerprint = stack_buffer;
+    size_t offset = 0;
+    size_t n = 0;
+    uint64_t digest;
+
+    /* Each element adds at most as many bytes as it takes in the body */
+    if (len > sizeof(stack_buffer)) {
+        fingerprint = (uint8_t *)malloc(len);
+        if (fingerprint == NULL)
+            return 0;
+    }
+
+    while (offset + 2 <= len) {
+        const uint8_t ie_id = body[offset];
+        const uint8_t ie_len = body[offset + 1];
+        const uint8_t *rule = rule_table + (size_t)ie_id * IE_RULE_SIZE;
+        const size_t info_start = offset + 2;
+
+        offset = info_start + ie_len;
+
+        if (!(rule[0] & IE_RULE_INCLUDE))
+            continue;
+
+        fingerprint[n++] = ie_id;
+
+        if (rule[0] & IE_RULE_INCLUDE_LENGTH)
+            fingerprint[n++] = ie_len;
+
+        if (rule[0] & IE_RULE_INCLUDE_INFO) {
+            /* A truncated element keeps only the available info bytes */
+            const size_t info_len = (offset <= len ? offset : len) - info_start;
+            uint8_t i;
+
+            memcpy(fingerprint + n, body + info_start, info_len);
+
+            for (i = 0; i < rule[1]; i++) {
+                if (rule[2 + i] >= info_len)
+                    break;
+                fingerprint[n + rule[2 + i]] = mask_byte;
+            }
+
+            n += info_len;
+        }
+    }
+
+    digest = t1ha0(fingerprint, n, seed);
+
+    if (fingerprint != stack_buffer)
+        free(fingerprint);
+
+    return digest;
+}
@@ -0,0 +1,29 @@
+/*
+ * ie_fingerprint.h
+ *
+ * Probe request fingerprint computed in C: walks the Information
+ * Elements of the frame body, applies the rules compiled from
+ * fingerprintSpec.py and returns the t1ha0 digest of the result.
+ *
+ * Rules table: 256 entries of IE_RULE_SIZE bytes, indexed by IE ID.
+ *   byte 0     -> flags (IE_RULE_INCLUDE, IE_RULE_INCLUDE_LENGTH, IE_RULE_INCLUDE_INFO)
+ *   byte 1     -> number of masked info bytes (at most IE_RULE_MAX_MASKS)
+ *   byte 2...  -> masked info byte offsets, in ascending order
+ */
+
+#ifndef IE_FINGERPRINT_H
+#define IE_FINGERPRINT_H
+
+#include <stddef.h>
+#include <stdint.h>
+
+#define IE_RULE_SIZE 8
+#define IE_RULE_MAX_MASKS (IE_RULE_SIZE - 2)
+
+#define IE_RULE_INCLUDE 0x01
+#define IE_RULE_INCLUDE_LENGTH 0x02
+#define IE_RULE_INCLUDE_INFO 0x04
+
+uint64_t t1ha0_ie_fingerprint(const void *ies, size_t len, const void *rules, uint8_t mask_byte, uint64_t seed);
+
+#endif /* IE_FINGERPRINT_H */
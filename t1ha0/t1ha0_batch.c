@@ -0,0 +1,17 @@
+/*
+ * t1ha0_batch.c
+ *
+ * See t1ha0_batch.h
+ */
+
+#include "t1ha.h"
+#include "t1ha0_batch.h"
+
+void t1ha0_batch(const void *data, const uint64_t *offsets, size_t n, uint64_t seed, uint64_t *digests)
+{
+    const uint8_t *records = (const uint8_t *)data;
+    size_t i;
+
+    for (i = 0; i < n; i++)
+        digests[i] = t1ha0(records + offsets[i], (size_t)(offsets[i + 1] - offsets[i]), seed);
+}
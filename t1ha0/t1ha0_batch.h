@@ -0,0 +1,19 @@
+/*
+ * t1ha0_batch.h
+ *
+ * t1ha0 digests of many records in a single call.
+ *
+ * The records are packed one after the other in 'data'. Record i spans
+ * data[offsets[i]] .. data[offsets[i + 1] - 1], so 'offsets' holds
+ * n + 1 entries. The digest of record i is written to digests[i].
+ */
+
+#ifndef T1HA0_BATCH_H
+#define T1HA0_BATCH_H
+
+#include <stddef.h>
+#include <stdint.h>
+
+void t1ha0_batch(const void *data, const uint64_t *offsets, size_t n, uint64_t seed, uint64_t *digests);
+
+#endif /* T1HA0_BATCH_H */
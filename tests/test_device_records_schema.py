@@ -0,0 +1,73 @@
+#           test_device_records_schema.py
+#
+#   Device records schema (deviceRecordsDB.py): a database created by
+#   older versions (text tables) is migrated in place, and the
+#   Data_Packets / Probe_Requests views give back its rows in the
+#   original text format.
+#
+
+import sqlite3
+
+import pytest
+
+from deviceRecordsDB import *
+
+TEXT_ROWS = {
+    "Data_Packets": [
+        ("Data Packet", "1A2B3C4D5E6F7081", "2024-02-08 10:00:00", "2024-02-08 10:05:00", "Apple"),
+        ("Data Packet", "FFEEDDCCBBAA9988", "2024-02-08 10:01:00", "2024-02-08 10:01:00", None),
+    ],
+    "Probe_Requests": [
+        # Device written twice by older versions: merged into one row
+        ("Probe Request", "0000000000000ABC", "2024-02-08 09:00:00", "2024-02-08 09:10:00", "Samsung"),
+        ("Probe Request", "0000000000000ABC", "2024-02-08 09:30:00", "2024-02-08 09:40:00", "Samsung"),
+    ],
+}
+
+
+@pytest.fixture
+def con(tmp_path):
+    # Tables of sensorStartup.py before the integer schema
+    con = sqlite3.connect(str(tmp_path / "DeviceRecords.db"))
+    for table, rows in TEXT_ROWS.items():
+        con.execute("CREATE TABLE " + table + " (Frame_Type TEXT, ID TEXT, First_Record DATETIME, Last_Time_Found DATETIME, Manufacturer TEXT);")
+        con.executemany("INSERT INTO " + table + " VALUES (?, ?, ?, ?, ?);", rows)
+    con.commit()
+    yield con
+    con.close()
+
+def view_rows(con, view):
+    return con.execute("SELECT Frame_Type, ID, First_Record, Last_Time_Found, Manufacturer FROM " + view + " ORDER BY ID;").fetchall()
+
+
+def test_text_tables_are_migrated_to_views(con):
+    create_device_records_schema(con)
+
+    for view in TEXT_ROWS:
+        assert con.execute("SELECT type FROM sqlite_master WHERE name = ?;", (view,)).fetchone() == ("view",)
+
+    assert view_rows(con, "Data_Packets") == [
+        ("Data Packet", "1A2B3C4D5E6F7081", "2024-02-08 10:00:00", "2024-02-08 10:05:00", "Apple"),
+        ("Data Packet", "FFEEDDCCBBAA9988", "2024-02-08 10:01:00", "2024-02-08 10:01:00", "Unknown"),
+    ]
+    assert view_rows(con, "Probe_Requests") == [
+        ("Probe Request", "ABC", "2024-02-08 09:00:00", "2024-02-08 09:40:00", "Samsung"),
+    ]
+
+    # The migrated devices are counted from their last sighting
+    assert con.execute("SELECT Minute, ID, First, Last FROM Data_Packet_Sightings ORDER BY ID;").fetchall() == [
+        (1707386460 // 60, footprint_to_db(0xFFEEDDCCBBAA9988), 1707386460, 1707386460),
+        (1707386700 // 60, 0x1A2B3C4D5E6F7081, 1707386700, 1707386700),
+    ]
+
+def test_schema_is_kept_when_created_again(con):
+    create_device_records_schema(con)
+    con.execute("INSERT INTO Sampling_Rate VALUES (1707386400, 4);")
+    con.commit()
+
+    create_device_records_schema(con)
+
+    assert len(view_rows(con, "Data_Packets")) == 2
+    assert len(view_rows(con, "Probe_Requests")) == 1
+    assert con.execute("SELECT * FROM Sampling_Rate;").fetchall() == [(1707386400, 4)]
+    assert count_window_devices(con.cursor(), 1707386400, 1707386760) == (2, 0)
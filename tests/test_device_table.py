@@ -0,0 +1,94 @@
+#           test_device_table.py
+#
+#   Write-behind device table (deviceTable.py): sightings only change the
+#   in-memory entries, and a flush writes each changed device once, with
+#   the same First_Seen / Last_Seen the sniffer wrote frame by frame.
+#
+
+import sqlite3
+
+import pytest
+
+pytest.importorskip("t1ha0._t1ha0_module")
+
+from deviceTable import *
+
+FOOTPRINT = 0xFEDCBA9876543210      # Above 2^63: stored as a negative SQLite integer
+
+
+@pytest.fixture
+def con():
+    con = sqlite3.connect(":memory:")
+    create_device_records_schema(con)
+    load_device_table(con)
+    yield con
+    con.close()
+
+def device_row(con, frame_kind, footprint):
+    return con.execute("SELECT First_Seen, Last_Seen, m.Name FROM " + DEVICE_TABLES[frame_kind] + " d JOIN Manufacturers m ON m.Manufacturer_ID = d.Manufacturer_ID WHERE ID = ?;",
+                       (footprint_to_db(footprint),)).fetchone()
+
+
+def test_sightings_are_written_at_flush(con):
+    record_device(PROBE_REQUEST, FOOTPRINT, "Apple", 1000)
+    record_device(PROBE_REQUEST, FOOTPRINT, "Apple", 1000)
+    record_device(PROBE_REQUEST, FOOTPRINT, "Apple", 1030)
+    record_device(DATA_PACKET, 7, "Samsung", 1010)
+
+    # Nothing is written before the flush
+    assert pending_device_changes() == 2
+    assert device_row(con, PROBE_REQUEST, FOOTPRINT) is None
+
+    flush_devices(con, 3600, 1030)
+
+    assert pending_device_changes() == 0
+    assert device_row(con, PROBE_REQUEST, FOOTPRINT) == (1000, 1030, "Apple")
+    assert device_row(con, DATA_PACKET, 7) == (1010, 1010, "Samsung")
+    assert con.execute("SELECT Minute, First, Last FROM Probe_Request_Sightings;").fetchall() == [(16, 1000, 1000), (17, 1030, 1030)]
+
+    # The views keep the original text format
+    assert con.execute("SELECT Frame_Type, ID, First_Record, Manufacturer FROM Probe_Requests;").fetchone() == (
+        "Probe Request", "FEDCBA9876543210", "1970-01-01 00:16:40", "Apple")
+
+def test_out_of_order_sightings_keep_first_and_last(con):
+    record_device(PROBE_REQUEST, 1, "Apple", 1050)
+    flush_devices(con, 3600, 1050)
+
+    # Sightings merged late (pipeline workers) never move Last_Seen back
+    record_device(PROBE_REQUEST, 1, "Apple", 1040)
+    record_device(PROBE_REQUEST, 1, "Apple", 1020)
+    flush_devices(con, 3600, 1050)
+
+    assert device_row(con, PROBE_REQUEST, 1) == (1020, 1050, "Apple")
+
+def test_deleted_device_is_inserted_again(con):
+    record_device(DATA_PACKET, 1, "Apple", 1000)
+    flush_devices(con, 3600, 1000)
+
+    # Row deleted by dataRetentionManager.py: inserted again with its first sighting since the flush
+    con.execute("DELETE FROM Data_Packet_Devices;")
+    record_device(DATA_PACKET, 1, "Apple", 5000)
+    record_device(DATA_PACKET, 1, "Apple", 5010)
+    flush_devices(con, 3600, 5010)
+
+    assert device_row(con, DATA_PACKET, 1) == (5000, 5010, "Apple")
+
+def test_failed_flush_keeps_changes_pending(con):
+    record_device(PROBE_REQUEST, 1, "Apple", 1000)
+
+    con.execute("DROP TABLE Probe_Request_Sightings;")
+    with pytest.raises(sqlite3.Error):
+        flush_devices(con, 3600, 1000)
+    assert pending_device_changes() == 1
+
+    con.execute("CREATE TABLE Probe_Request_Sightings (Minute INTEGER NOT NULL, ID INTEGER NOT NULL, First INTEGER NOT NULL, Last INTEGER NOT NULL, PRIMARY KEY (Minute, ID)) WITHOUT ROWID;")
+    flush_devices(con, 3600, 1000)
+    assert device_row(con, PROBE_REQUEST, 1) == (1000, 1000, "Apple")
+
+def test_idle_devices_are_forgotten(con):
+    record_device(PROBE_REQUEST, 1, "Apple", 1000)
+    record_device(PROBE_REQUEST, 2, "Apple", 4000)
+    flush_devices(con, 600, 4000)
+
+    assert set(DEVICES[PROBE_REQUEST]) == {2}
+    assert device_row(con, PROBE_REQUEST, 1) == (1000, 1000, "Apple")
@@ -0,0 +1,71 @@
+#           test_device_writer.py
+#
+#   Writer thread (deviceWriter.py): the sightings queued by the capture
+#   are coalesced and written in group commits, none is lost in blocking
+#   mode, and the sightings of a full queue are dropped and counted in
+#   non-blocking mode.
+#
+
+import sqlite3
+
+import pytest
+
+pytest.importorskip("t1ha0._t1ha0_module")
+
+import deviceWriter
+from deviceWriter import *
+
+
+@pytest.fixture
+def db_filepath(tmp_path):
+    db_filepath = str(tmp_path / "DeviceRecords.db")
+    con = sqlite3.connect(db_filepath)
+    create_device_records_schema(con)
+    con.close()
+    return db_filepath
+
+def device_count(db_filepath, table):
+    con = sqlite3.connect(db_filepath)
+    count = con.execute("SELECT COUNT(*) FROM " + table + ";").fetchone()[0]
+    con.close()
+    return count
+
+
+def test_sightings_are_written_in_one_group_commit(db_filepath):
+    commits = WRITER_STATS["commits"]
+
+    # Flushes only triggered by the stop: every sighting goes in the same transaction
+    start_device_writer(db_filepath, 100, 50, 3600, 100000, 3600, True)
+    for second in range(10):
+        for footprint in range(300):
+            put_sighting(PROBE_REQUEST if footprint % 3 else DATA_PACKET, footprint, "Apple", 1000 + second)
+    stop_device_writer()
+
+    assert WRITER_STATS["commits"] == commits + 1
+    assert WRITER_STATS["last_batch_size"] == 3000
+    assert WRITER_STATS["last_rows_written"] == 300
+    assert device_count(db_filepath, "Probe_Request_Devices") == 200
+    assert device_count(db_filepath, "Data_Packet_Devices") == 100
+
+def test_flush_changes_triggers_early_commits(db_filepath):
+    commits = WRITER_STATS["commits"]
+
+    start_device_writer(db_filepath, 100, 50, 3600, 100, 3600, True)
+    for footprint in range(1000):
+        put_sighting(PROBE_REQUEST, footprint, "Apple", 1000)
+    stop_device_writer()
+
+    assert WRITER_STATS["commits"] - commits >= 10
+    assert device_count(db_filepath, "Probe_Request_Devices") == 1000
+
+def test_full_queue_drops_sightings(db_filepath):
+    drops = WRITER_STATS["drops"]
+
+    # Queue without a writer thread draining it
+    deviceWriter.sightings = queue.Queue(10)
+    deviceWriter.sightings_blocking = False
+    for footprint in range(25):
+        put_sighting(PROBE_REQUEST, footprint, "Apple", 1000)
+
+    assert WRITER_STATS["drops"] == drops + 15
+    assert writer_stats()["queue_depth"] == 10
@@ -0,0 +1,59 @@
+#           test_frame_dissector.py
+#
+#   The raw dissector path ('raw_frame_footprint') must count the same
+#   frames, with the same footprints, as the Scapy path ('frame_footprint'),
+#   on synthetic frames (benchmarks/frameGenerator.py) and on management
+#   frames other than probe requests sent from randomized MACs.
+#
+
+import os
+import random
+
+import pytest
+
+pytest.importorskip("t1ha0._t1ha0_module")
+
+from scapy.layers.dot11 import RadioTap
+from deviceFootprint import *
+from benchmarks.frameGenerator import synthetic_frames, load_ouis, beacon, random_mac
+
+OUI_LIST_FILEPATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "wireshark-oui-list.txt")
+
+RADIOTAP_LEN = 10                   # Radiotap header length of the generated frames
+DOT11_PROBE_RESPONSE = 0x50         # Frame control of a probe response (management, subtype 5)
+
+
+def la_management_frames():
+    # Beacon and probe response sent from locally administered MACs
+    rng = random.Random(3)
+    la_beacon = beacon(rng, random_mac(rng, True), 1, -40)
+    probe_response = bytearray(beacon(rng, random_mac(rng, True), 2, -40))
+    probe_response[RADIOTAP_LEN] = DOT11_PROBE_RESPONSE
+    return [la_beacon, bytes(probe_response)]
+
+
+@pytest.fixture(scope="module", autouse=True)
+def oui_list():
+    load_oui_list(OUI_LIST_FILEPATH)
+
+def test_raw_footprint_matches_scapy():
+    ouis = load_ouis(OUI_LIST_FILEPATH)
+    frames = [frame for frame, _ in synthetic_frames(3000, 300, ouis, seed=5)] + la_management_frames()
+
+    counted = 0
+    for frame in frames:
+        try:
+            scapy_footprint = frame_footprint(RadioTap(frame))
+        except AttributeError:
+            # Malformed frame which Scapy can't dissect (also not counted by the live sniffer)
+            continue
+
+        assert raw_frame_footprint(frame) == scapy_footprint
+        counted += scapy_footprint is not None
+
+    assert counted > 0
+
+def test_la_management_frames_not_counted():
+    for frame in la_management_frames():
+        assert raw_frame_footprint(frame) is None
+        assert frame_footprint(RadioTap(frame)) is None
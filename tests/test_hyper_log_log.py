@@ -0,0 +1,72 @@
+#           test_hyper_log_log.py
+#
+#   HyperLogLog sketches (hyperLogLog.py): estimates of random footprints
+#   stay within their error bound, merged sketches count the union, and
+#   the window counts of the sketches tables (deviceRecordsDB.py) merge
+#   the minutes of each window.
+#
+
+import random
+import sqlite3
+
+import pytest
+
+from hyperLogLog import *
+from deviceRecordsDB import *
+
+PRECISION = 12
+NOW = 1707400000
+
+
+def sketch_of(footprints, precision=PRECISION):
+    registers = new_sketch(precision)
+    for footprint in footprints:
+        add_to_sketch(registers, precision, footprint)
+    return registers
+
+
+@pytest.mark.parametrize("devices", [50, 3000, 100000])
+def test_estimate_within_error_bound(devices):
+    rng = random.Random(devices)
+    registers = sketch_of(rng.getrandbits(64) for _ in range(devices))
+    assert abs(estimate_cardinality(registers) - devices) <= COUNT_ERROR_BOUND * standard_error(PRECISION) * devices
+
+def test_duplicates_are_not_counted():
+    rng = random.Random(1)
+    footprints = [rng.getrandbits(64) for _ in range(2000)]
+    registers = sketch_of(footprints)
+    assert not any(add_to_sketch(registers, PRECISION, footprint) for footprint in footprints)
+    assert registers == sketch_of(footprints * 3)
+
+def test_merge_counts_union():
+    rng = random.Random(2)
+    footprints = [rng.getrandbits(64) for _ in range(6000)]
+    merged = merge_sketches([sketch_of(footprints[:4000]), sketch_of(footprints[2000:])])
+    assert merged == sketch_of(footprints)
+    assert merge_sketches([]) is None
+
+def test_precision_is_checked():
+    with pytest.raises(ValueError):
+        new_sketch(MAX_PRECISION + 1)
+    with pytest.raises(ValueError):
+        merge_sketches([new_sketch(10), new_sketch(12)])
+    assert sketch_precision(new_sketch(14)) == 14
+
+def test_window_counts_merge_minutes():
+    # 500 devices per minute for 30 minutes, each also seen in the next minute
+    con = sqlite3.connect(":memory:")
+    create_device_records_schema(con)
+    rng = random.Random(3)
+    minutes = [rng.getrandbits(64) for _ in range(500 * 31)]
+    last_minute = NOW // 60
+    for i in range(30):
+        footprints = minutes[500 * i:500 * (i + 2)]
+        con.execute(upsert_sketch_sql("Probe_Request_Sketches"), (last_minute - i, bytes(sketch_of(footprints))))
+    con.commit()
+
+    counts = count_sketch_windows_devices(con.cursor(), [NOW - 300, NOW - 1800], NOW, PRECISION)
+    for (data_packets, probe_requests, error_bound), devices in zip(counts, [500 * 7, 500 * 31]):
+        assert data_packets == 0
+        assert abs(probe_requests - devices) <= error_bound
+    assert counts[1] == count_sketch_window_devices(con.cursor(), NOW - 1800, NOW, PRECISION)
+    con.close()
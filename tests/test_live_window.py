@@ -0,0 +1,86 @@
+#           test_live_window.py
+#
+#   Live sliding window counters (liveWindow.py): on a replay, the counts
+#   kept by the writer thread must equal the database counts of the same
+#   windows, and counters seeded from the database after a restart must
+#   give the same counts again.
+#
+
+import os
+import sqlite3
+
+import pytest
+
+pytest.importorskip("t1ha0._t1ha0_module")
+
+from crowdingSniffer import *
+from benchmarks.frameGenerator import synthetic_frames, load_ouis
+
+OUI_LIST_FILEPATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "wireshark-oui-list.txt")
+
+WINDOWS = [60, 300, 900]            # Seconds
+
+
+def database_counts(cur, now):
+    # Database counts, less the devices seen only once exactly at the start of the window (already expired in the live counters)
+    counts = count_windows_devices(cur, [now - window for window in WINDOWS], now, [0] * len(WINDOWS))
+    results = []
+    for window, (data_packets, probe_requests) in zip(WINDOWS, counts):
+        once_at_start = [cur.execute("SELECT COUNT(*) FROM " + table + " WHERE First_Seen = ? and Last_Seen = ?;", (now - window, now - window)).fetchone()[0]
+                         for table in ("Data_Packet_Devices", "Probe_Request_Devices")]
+        results.append((data_packets - once_at_start[0], probe_requests - once_at_start[1], 1))
+    return results
+
+def live_counts(now):
+    expire_live_window(now)
+    return [live_window_counts(now, window) for window in WINDOWS]
+
+@pytest.fixture
+def replay(tmp_path):
+    # Frames of 20 minutes through the writer with the live counters enabled: (database path, time of the last frame)
+    load_oui_list(OUI_LIST_FILEPATH)
+    set_hot_mac_refresh(HOT_MAC_REFRESH)
+    set_probe_burst_coalescing(PROBE_BURST_WINDOW, PROBE_BURST_SEQ_GAP)
+    frames = synthetic_frames(6000, 800, load_ouis(OUI_LIST_FILEPATH), seed=4, rate=5)
+
+    db_filepath = str(tmp_path / "DeviceRecords.db")
+    con = sqlite3.connect(db_filepath)
+    create_device_records_schema(con)
+    con.close()
+
+    enable_live_window(WINDOWS, str(tmp_path / "live_window.json"), 1)
+    start_device_writer(db_filepath, WRITER_QUEUE_SIZE, WRITER_MAX_BATCH, DEVICE_FLUSH_INTERVAL, DEVICE_FLUSH_CHANGES, DEVICE_IDLE_EXPIRY, True)
+    for frame, timestamp in frames:
+        raw_frame_processing(memoryview(frame), int(timestamp))
+    stop_device_writer()
+
+    yield db_filepath, int(frames[-1][1])
+    LIVE_WINDOW["enabled"] = False
+
+def test_live_counts_match_database(replay):
+    db_filepath, now = replay
+    con = sqlite3.connect(db_filepath)
+
+    counts = live_counts(now)
+    assert counts[0][0] + counts[0][1] > 0
+    assert counts == database_counts(con.cursor(), now)
+
+def test_seeded_counts_match_before_restart(replay):
+    db_filepath, now = replay
+    before_restart = live_counts(now)
+
+    con = sqlite3.connect(db_filepath)
+    enable_live_window(WINDOWS, LIVE_WINDOW["filepath"], 1)
+    seed_live_window(con, now)
+    assert live_counts(now) == before_restart
+
+def test_seeded_sampling_rate(replay):
+    # A rate change within the 5-minute window scales it (and the 15-minute one), not the last minute
+    db_filepath, now = replay
+    con = sqlite3.connect(db_filepath)
+    log_sampling_rate(con, now - 200, 4)
+    log_sampling_rate(con, now - 100, 1)
+
+    enable_live_window(WINDOWS, LIVE_WINDOW["filepath"], 1)
+    seed_live_window(con, now)
+    assert [rate for _, _, rate in live_counts(now)] == [1, 4, 4]
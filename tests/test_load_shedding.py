@@ -0,0 +1,92 @@
+#           test_load_shedding.py
+#
+#   Overload sampling (loadShedding.py): the sampling rate follows the
+#   load, and the counts of the kept hash slice, scaled by the highest
+#   rate of each window, stay within their error bound of the device
+#   counts (deviceRecordsDB.py).
+#
+
+import random
+import sqlite3
+
+import pytest
+
+from loadShedding import *
+from deviceRecordsDB import *
+
+NOW = 1707400000
+
+
+@pytest.fixture
+def shedding():
+    enable_load_shedding(5, 0.5, 0.1, 95, 70, 64)
+    yield
+    SHEDDING["enabled"] = False
+    set_sampling_rate(1)
+
+@pytest.fixture
+def con():
+    con = sqlite3.connect(":memory:")
+    create_device_records_schema(con)
+    yield con
+    con.close()
+
+def add_devices(con, footprints, timestamp):
+    con.executemany(upsert_device_sql("Probe_Request_Devices"), [(footprint_to_db(footprint), timestamp, timestamp, None) for footprint in footprints])
+    con.executemany(upsert_sighting_sql("Probe_Request_Sightings"), [(timestamp // 60, footprint_to_db(footprint), timestamp, timestamp) for footprint in footprints])
+    con.commit()
+
+
+def test_rate_follows_load(shedding):
+    assert next_sampling_rate(1, 0.6, 10, 0) == 2
+    assert next_sampling_rate(4, 0.2, 99, 0) == 8
+    assert next_sampling_rate(4, 0.2, 10, 3) == 8
+    assert next_sampling_rate(64, 0.9, 10, 0) == 64
+    assert next_sampling_rate(8, 0.05, 10, 0) == 4
+    assert next_sampling_rate(1, 0.05, 10, 0) == 1
+    assert next_sampling_rate(8, 0.3, 80, 0) == 8
+
+def test_check_overload_waits_for_interval(shedding):
+    assert check_overload(0.9, 0) is None
+
+    LOAD["last_check"] -= SHEDDING["check_interval"]
+    assert check_overload(0.9, 0) == 2
+
+    # Not applied by the caller: proposed again at the next check
+    LOAD["last_check"] -= SHEDDING["check_interval"]
+    assert check_overload(0.9, 0) == 2
+
+def test_set_sampling_rate_mask(shedding):
+    set_sampling_rate(8)
+    assert SAMPLING == {"rate": 8, "mask": 7}
+
+def test_windows_scaled_by_their_own_rate(con):
+    rng = random.Random(1)
+    footprints = [rng.getrandbits(64) for _ in range(4000)]
+    add_devices(con, footprints[:2000], NOW - 1200)
+    add_devices(con, footprints[2000:], NOW - 60)
+
+    # Rate 4 for 10 minutes, from 25 minutes ago: only the 30-minute window is scaled by it
+    log_sampling_rate(con, NOW - 1500, 4)
+    log_sampling_rate(con, NOW - 900, 1)
+
+    counts = count_sampled_windows_devices(con.cursor(), [NOW - 300, NOW - 1800], NOW)
+    assert counts[0] == (0, 2000, 1)
+
+    kept = sum(1 for footprint in footprints if footprint & 3 == 0)
+    assert counts[1] == (0, kept * 4, 4)
+    assert counts[1] == count_sampled_window_devices(con.cursor(), NOW - 1800, NOW)
+    assert abs(counts[1][1] - 4000) <= sampling_error_bound(counts[1][1], 4)
+
+def test_error_bound_covers_sampled_counts():
+    # ~95% of the scaled counts of random devices are within COUNT_ERROR_BOUND standard errors
+    rng = random.Random(2)
+    rate, devices, trials = 8, 2000, 200
+
+    within = 0
+    for _ in range(trials):
+        scaled = rate * sum(1 for _ in range(devices) if rng.getrandbits(64) & (rate - 1) == 0)
+        within += abs(scaled - devices) <= sampling_error_bound(scaled, rate)
+
+    assert within >= 0.9 * trials
+    assert sampling_error_bound(devices, 1) == 0
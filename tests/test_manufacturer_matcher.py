@@ -0,0 +1,39 @@
+#           test_manufacturer_matcher.py
+#
+#   Aho-Corasick matching of the manufacturer names (manufacturerMatcher.py):
+#   the automaton must select the same manufacturers as one substring
+#   search per name of the mobile manufacturers list.
+#
+
+import os
+import random
+
+from manufacturerMatcher import *
+
+MOBILE_MANUFACTURERS_FILEPATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Mobile_device_manufacturers.txt")
+
+
+def test_overlapping_patterns():
+    automaton = build_automaton(["HE", "SHE", "HIS", "HERS"])
+
+    assert matches_any(automaton, "USHERS")
+    assert matches_any(automaton, "AHISX")
+    assert matches_any(automaton, "SSSHE")
+    assert not matches_any(automaton, "HSIHS")
+    assert not matches_any(automaton, "")
+
+    # A pattern found through a failure link only
+    assert matches_any(build_automaton(["ABCD", "BC"]), "ABCX")
+    assert not matches_any(build_automaton([]), "APPLE")
+
+def test_matches_like_substring_search():
+    with open(MOBILE_MANUFACTURERS_FILEPATH) as file:
+        patterns = {line.strip().upper() for line in file if line.strip()}
+    automaton = build_automaton(patterns)
+
+    # Manufacturer names built from pieces of the patterns, so that partial matches are frequent
+    rng = random.Random(6)
+    pieces = [pattern[start:start + rng.randint(1, 6)] for pattern in patterns for start in (0, len(pattern) // 2)]
+    for _ in range(3000):
+        text = " ".join(rng.choice(pieces) for _ in range(rng.randint(1, 4)))
+        assert matches_any(automaton, text) == any(pattern in text for pattern in patterns), text
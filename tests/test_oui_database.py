@@ -0,0 +1,57 @@
+#           test_oui_database.py
+#
+#   Binary OUI database (ouiDatabase.py): a database written from MA-L,
+#   MA-M and MA-S entries gives the manufacturer of the longest matching
+#   prefix, and damaged files are rejected.
+#
+
+import pytest
+
+from ouiDatabase import *
+
+ENTRIES = [
+    (*parse_oui_prefix("00:00:F0"), "Samsung Electronics Co.,Ltd"),
+    (*parse_oui_prefix("70:B3:D5"), "Apple, Inc."),
+    (*parse_oui_prefix("70:B3:D5:40:00:00/28"), "Xiaomi Communications Co Ltd"),
+    (*parse_oui_prefix("70:B3:D5:4A:B0:00/36"), "Huawei Technologies Co.,Ltd"),
+    (*parse_oui_prefix("FC:FC:48"), "Apple, Inc."),
+]
+
+
+@pytest.fixture
+def database_filepath(tmp_path):
+    filepath = str(tmp_path / "wireshark-oui-list.bin")
+    write_oui_database(filepath, ENTRIES, 1707400000)
+    return filepath
+
+
+def test_parse_oui_prefix():
+    assert parse_oui_prefix("70:B3:D5") == (24, 0x70B3D5)
+    assert parse_oui_prefix("70:B3:D5:40:00:00/28") == (28, 0x70B3D54)
+    assert parse_oui_prefix("70-B3-D5-4A-B0-00/36") == (36, 0x70B3D54AB)
+
+def test_longest_prefix_lookup(database_filepath):
+    database = OuiDatabase(database_filepath)
+
+    assert database.list_version == 1707400000
+    assert database.lookup(0x0000F0123456) == "Samsung Electronics Co.,Ltd"
+    assert database.lookup(0x70B3D54AB123) == "Huawei Technologies Co.,Ltd"
+    assert database.lookup(0x70B3D54AC123) == "Xiaomi Communications Co Ltd"
+    assert database.lookup(0x70B3D5500000) == "Apple, Inc."
+    assert database.lookup(0xFCFC48FFFFFF) == "Apple, Inc."
+    assert database.lookup(0x0000F1000000) is None
+    assert database.prefixes24() == {0x0000F0, 0x70B3D5, 0xFCFC48}
+
+    # Names are stored once
+    assert database.strings == sorted({manuf for _, _, manuf in ENTRIES})
+
+def test_damaged_files_are_rejected(database_filepath, tmp_path):
+    with open(database_filepath, "rb") as file:
+        data = file.read()
+
+    for name, damaged in [("magic", b"X" + data[1:]), ("truncated", data[:-3]), ("header", data[:10])]:
+        filepath = str(tmp_path / name)
+        with open(filepath, "wb") as file:
+            file.write(damaged)
+        with pytest.raises(ValueError):
+            OuiDatabase(filepath)
@@ -0,0 +1,47 @@
+#           test_pending_measurements.py
+#
+#   Pending measurements (sensorFunctions.py): a measurement stored while
+#   the MQTT broker is unreachable must be resent with the sampling rate
+#   and error bound of its count, and with the counts of the other windows.
+#
+
+import json
+import sqlite3
+
+import pytest
+
+pytest.importorskip("netifaces")
+pytest.importorskip("paho.mqtt")
+
+import sensorFunctions
+from sensorFunctions import detections_payload, store_pending_measurement, get_1st_pending_measurement, remove_1st_pending_measurement
+
+
+@pytest.fixture
+def stored_measurements_db(tmp_path, monkeypatch):
+    # Table as created by older versions: (Timestamp, DevicesDetected)
+    filepath = str(tmp_path / "StoredMeasurements.db")
+    con = sqlite3.connect(filepath)
+    con.execute("CREATE TABLE PendingMeasurements(Timestamp DATETIME, DevicesDetected INTEGER)")
+    con.execute("INSERT INTO PendingMeasurements VALUES (?, ?)", (1000, 12))
+    con.commit()
+    con.close()
+    monkeypatch.setattr(sensorFunctions, "STORED_MEASUREMENTS_DB_FILEPATH", filepath)
+    return filepath
+
+
+def test_pending_measurement_keeps_sampling_rate_and_error_bound(stored_measurements_db):
+    store_pending_measurement(2000, 480, 4, 37, {60: 900, 1: 30}, {60: 52, 1: 9})
+
+    # Row stored by an older version: sampling rate unknown, left out of the payload
+    assert get_1st_pending_measurement() == (1000, 12, None, None, None, None)
+    payload = json.loads(detections_payload(*get_1st_pending_measurement()))
+    assert "sampling_rate" not in payload and "error_bound" not in payload and "windows" not in payload
+    remove_1st_pending_measurement()
+
+    payload = json.loads(detections_payload(*get_1st_pending_measurement()))
+    assert payload == json.loads(detections_payload(2000, 480, 4, 37, {60: 900, 1: 30}, {60: 52, 1: 9}))
+    assert payload["windows"] == {"60": 900, "1": 30} and payload["window_error_bounds"] == {"60": 52, "1": 9}
+    remove_1st_pending_measurement()
+
+    assert get_1st_pending_measurement() is None
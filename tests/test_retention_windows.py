@@ -0,0 +1,54 @@
+#           test_retention_windows.py
+#
+#   The data retention (dataRetentionManager.py) must keep the devices of
+#   every window counted by sendCrowdingData.py, also when its cron
+#   argument is shorter than the largest of COUNT_WINDOWS.
+#
+
+import sqlite3
+
+from deviceRecordsDB import *
+
+NOW = 1700000000
+COUNT_WINDOWS = [1, 5, 15, 60]      # Minutes
+REQUESTED_RETENTION = 30            # Minutes, as in the former cron job
+
+
+def device_records(sightings):
+    # In-memory DeviceRecords.db with one data packet device per (footprint, sighting time)
+    con = sqlite3.connect(":memory:")
+    create_device_records_schema(con)
+    cur = con.cursor()
+    manuf = manufacturer_id(cur, "Apple")
+
+    for footprint, sighting in sightings:
+        cur.execute(upsert_device_sql("Data_Packet_Devices"), (footprint_to_db(footprint), sighting, sighting, manuf))
+        cur.execute(upsert_sighting_sql(SIGHTING_TABLES["Data_Packet_Devices"]), (sighting // 60, footprint_to_db(footprint), sighting, sighting))
+
+    con.commit()
+    return con
+
+def window_counts(cur):
+    counts = count_sampled_windows_devices(cur, [NOW - window * 60 for window in COUNT_WINDOWS], NOW)
+    return [data_packets + probe_requests for data_packets, probe_requests, _ in counts]
+
+def test_retention_covers_largest_window():
+    assert retention_period(REQUESTED_RETENTION, COUNT_WINDOWS) == 60
+    assert retention_period(120, COUNT_WINDOWS) == 120
+    assert retention_period("30", []) == 30
+
+def test_window_longer_than_requested_retention():
+    # Seen 45 minutes ago: only in the 60-minute window, and older than the requested retention
+    con = device_records([(0x1000, NOW - 45 * 60), (0x2000, NOW - 30)])
+    cur = con.cursor()
+    assert window_counts(cur) == [1, 1, 1, 2]
+
+    retention = retention_period(REQUESTED_RETENTION, COUNT_WINDOWS)
+    delete_expired_devices(cur, NOW - retention * 60, NOW)
+    con.commit()
+
+    assert window_counts(cur) == [1, 1, 1, 2]
+
+    # With the requested retention alone, the 60-minute window would lose the device
+    delete_expired_devices(cur, NOW - REQUESTED_RETENTION * 60, NOW)
+    assert window_counts(cur) == [1, 1, 1, 1]
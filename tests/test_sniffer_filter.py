@@ -0,0 +1,74 @@
+#           test_sniffer_filter.py
+#
+#   Capture filter (snifferFilter.py): the OUI block of the mobile
+#   manufacturers list must fit in the kernel limit, and the kernel must
+#   accept exactly the probe requests whose source is locally administered
+#   or has a prefix of a mobile OUI. The program is attached to one end of
+#   a datagram socket pair, which runs it on each received datagram.
+#
+
+import os
+import random
+import socket
+
+import pytest
+
+from snifferFilter import *
+from benchmarks.frameGenerator import probe_request, random_mac, load_ouis
+
+OUI_LIST_FILEPATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "wireshark-oui-list.txt")
+
+
+@pytest.fixture(scope="module")
+def ouis():
+    return sorted(int(oui.replace(':', ''), 16) for oui in load_ouis(OUI_LIST_FILEPATH))
+
+@pytest.fixture(scope="module")
+def filtered_socket(ouis):
+    try:
+        program = capture_program(0, ouis)
+    except Exception as error:
+        pytest.skip(f"libpcap unavailable: {error}")
+
+    receiver, sender = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+    try:
+        attach_bpf_program(receiver, program)
+    except OSError as error:
+        pytest.skip(f"socket filters unavailable: {error}")
+    yield program, receiver, sender
+    receiver.close()
+    sender.close()
+
+def prefix_shift(ouis):
+    # Shift of the prefixes chosen by 'capture_program' (longest prefixes that fit)
+    base = len(compile_bpf(frame_filter(0)))
+    return next(shift for shift in range(20) if base + len(oui_prefix_block(ouis, shift)) <= BPF_MAXINSNS)
+
+def accepted(receiver, sender, frame):
+    sender.send(frame)
+    try:
+        return receiver.recv(4096, socket.MSG_DONTWAIT) == frame
+    except BlockingIOError:
+        return False
+
+
+def test_oui_block_fits_longest_prefixes(ouis, filtered_socket):
+    shift = prefix_shift(ouis)
+    # The binary search fits the mobile manufacturers list as 17-bit prefixes (the linear chain: 16-bit)
+    assert shift <= 7
+    assert all(jt <= 255 and jf <= 255 for _, jt, jf, _ in oui_prefix_block(ouis, shift))
+
+def test_kernel_accepts_mobile_prefixes(ouis, filtered_socket):
+    program, receiver, sender = filtered_socket
+    shift = prefix_shift(ouis)
+    prefixes = {oui >> shift for oui in ouis}
+
+    rng = random.Random(5)
+    macs = [oui.to_bytes(3, "big") + rng.randbytes(3) for oui in rng.sample(ouis, 500)]
+    macs += [random_mac(rng, False) for _ in range(2000)] + [random_mac(rng, True) for _ in range(200)]
+    # Neighbours of the prefixes, around the bounds of the bitmap words
+    macs += [(((oui >> shift) + step) << shift).to_bytes(3, "big") + b'\x00\x00\x01' for oui in ouis[::50] for step in (-1, 1)]
+
+    for seq, mac in enumerate(macs):
+        expected = bool(mac[0] & DOT11_LOCALLY_ADMINISTERED) or int.from_bytes(mac[:3], "big") >> shift in prefixes
+        assert accepted(receiver, sender, probe_request(mac, seq, b'', -40)) == expected, mac.hex()
@@ -0,0 +1,68 @@
+#           test_sniffer_pipeline.py
+#
+#   The multi-process pipeline (snifferPipeline.py) must write the same
+#   device records as the frames processed in the capture process, also
+#   when its rings wrap and fill up (blocking mode, as in the replay).
+#
+
+import os
+import sqlite3
+
+import pytest
+
+pytest.importorskip("t1ha0._t1ha0_module")
+
+from crowdingSniffer import *
+from benchmarks.frameGenerator import synthetic_frames, load_ouis
+
+OUI_LIST_FILEPATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "wireshark-oui-list.txt")
+
+SMALL_RING_SIZE = 4096              # A few frames per ring: wraps and full rings on every block
+BLOCK_FRAMES = 64
+
+
+def writer_args(db_filepath):
+    return (db_filepath, WRITER_QUEUE_SIZE, WRITER_MAX_BATCH, DEVICE_FLUSH_INTERVAL, DEVICE_FLUSH_CHANGES, DEVICE_IDLE_EXPIRY, True)
+
+def device_records(db_filepath):
+    con = sqlite3.connect(db_filepath)
+    records = {view: sorted(con.execute("SELECT * FROM " + view + ";").fetchall()) for view in DEVICE_RECORD_TABLES}
+    con.close()
+    return records
+
+def replay(frames, db_filepath, n_workers, ring_size):
+    con = sqlite3.connect(db_filepath)
+    create_device_records_schema(con)
+    con.close()
+
+    set_hot_mac_refresh(HOT_MAC_REFRESH)
+    set_probe_burst_coalescing(PROBE_BURST_WINDOW, PROBE_BURST_SEQ_GAP)
+
+    if n_workers:
+        start_pipeline(n_workers, ring_size, writer_args(db_filepath))
+        for i, (frame, timestamp) in enumerate(frames):
+            pipeline_frame(memoryview(frame), int(timestamp), blocking=True)
+            if i % BLOCK_FRAMES == BLOCK_FRAMES - 1:
+                pipeline_publish()
+        stop_pipeline()
+    else:
+        start_device_writer(*writer_args(db_filepath))
+        for frame, timestamp in frames:
+            raw_frame_processing(memoryview(frame), int(timestamp))
+        stop_device_writer()
+
+    return device_records(db_filepath)
+
+@pytest.fixture(scope="module")
+def frames():
+    load_oui_list(OUI_LIST_FILEPATH)
+    return synthetic_frames(4000, 400, load_ouis(OUI_LIST_FILEPATH), seed=9, rate=50)
+
+@pytest.mark.parametrize("n_workers, ring_size", [(1, PIPELINE_RING_SIZE), (3, PIPELINE_RING_SIZE), (2, SMALL_RING_SIZE)])
+def test_pipeline_matches_capture_process(frames, tmp_path, n_workers, ring_size):
+    expected = replay(frames, str(tmp_path / "in_process.db"), 0, ring_size)
+    assert sum(map(len, expected.values())) > 0
+
+    assert replay(frames, str(tmp_path / "pipeline.db"), n_workers, ring_size) == expected
+    assert PIPELINE_STATS["drops"] == 0
+    assert PIPELINE_STATS["frames"] == len(frames)
@@ -0,0 +1,51 @@
+#           test_t1ha0_batch.py
+#
+#   Batched t1ha0 hashing (t1ha0/batch.py): same digests as one t1ha0()
+#   call per record, and invalid batches rejected before the C call.
+#
+
+from array import array
+
+import pytest
+
+pytest.importorskip("t1ha0._t1ha0_module")
+
+from t1ha0 import lib, pack_records, t1ha0_batch
+
+SEED = 11
+RECORDS = [b"AA:BB:CC:DD:EE:FF", b"", b"\x00" * 100, b"02:11:22:33:44:55"]
+
+
+def test_digests_match_per_record_calls():
+    buffer, offsets = pack_records(RECORDS)
+    assert list(t1ha0_batch(buffer, offsets, SEED)) == [lib.t1ha0(record, len(record), SEED) for record in RECORDS]
+
+def test_empty_batch():
+    buffer, offsets = pack_records([])
+    assert len(t1ha0_batch(buffer, offsets, SEED)) == 0
+
+def test_decreasing_offsets_rejected():
+    buffer, offsets = pack_records(RECORDS)
+    offsets[1], offsets[2] = offsets[2] + 1, offsets[1]
+    with pytest.raises(ValueError):
+        t1ha0_batch(buffer, offsets, SEED)
+
+def test_offsets_past_buffer_rejected():
+    buffer, offsets = pack_records(RECORDS)
+    offsets[-1] += 1
+    with pytest.raises(ValueError):
+        t1ha0_batch(buffer, offsets, SEED)
+
+def test_short_digests_rejected():
+    buffer, offsets = pack_records(RECORDS)
+    with pytest.raises(ValueError):
+        t1ha0_batch(buffer, offsets, SEED, array('Q', bytes(8 * (len(RECORDS) - 1))))
+
+def test_missing_offsets_rejected():
+    with pytest.raises(ValueError):
+        t1ha0_batch(b"", array('Q'), SEED)
+
+def test_offsets_of_other_item_size_rejected():
+    buffer, offsets = pack_records(RECORDS)
+    with pytest.raises(ValueError):
+        t1ha0_batch(buffer, array('I', offsets), SEED)